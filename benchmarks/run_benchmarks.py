@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Benchmarks of the wake model versions on the bundled wind farms
+
+For every model version and wind farm, the benchmark measures:
+    - single: the latency of one flow case (cold first call, and the warm
+      calls repeated)
+    - cases_N: the throughput of N random flow cases, solved in one call by
+      the versions handling several flow cases and one by one otherwise
+      (see fusedwake.parallel.solve_cases)
+and the peak memory allocated during each of them, measured in a separate
+run so that it does not slow down the timings: with tracemalloc, or on
+Python 2 as the increase of the peak resident memory of a forked process
+running the case (resource.getrusage).
+
+The results are written in a JSON file, with the commit and the versions of
+the environment, so that runs on different commits can be compared:
+
+    $ python benchmarks/run_benchmarks.py -o before.json
+    $ git checkout other_branch
+    $ python benchmarks/run_benchmarks.py -o after.json
+    $ python benchmarks/run_benchmarks.py compare before.json after.json
+"""
+from __future__ import print_function
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2: the peak memory is measured in a forked process
+    tracemalloc = None
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Method measuring the peak memory, None when it can not be measured
+if tracemalloc is not None:
+    MEMORY = 'tracemalloc'
+elif resource is not None and hasattr(os, 'fork'):
+    MEMORY = 'maxrss'
+else:
+    MEMORY = None
+# Unit of ru_maxrss [bytes]
+MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+bench_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(bench_dir, '..'))
+
+from fusedwake.WindFarm import WindFarm
+from fusedwake.parallel import solve_cases
+
+FARMS = ['hornsrev', 'lillgrund', 'middelgrunden']
+
+MODELS = {
+    'GCL': ['py_gcl_v0', 'py_gcl_v1', 'py_gcl_v2', 'fort_gcl_s', 'fort_gcl_s_sp',
+            'fort_gcl', 'fort_gcl_av'],
+    'NOJ': ['fort_noj_s', 'fort_noj', 'fort_noj_av', 'fort_mod_noj_s',
+            'fort_mod_noj', 'fort_mod_noj_av'],
+    'GAU': ['fort_gau_s', 'fort_gau', 'fort_gau_av'],
+}
+
+def get_model_class(name):
+    if name == 'GCL':
+        from fusedwake.gcl import GCL
+        return GCL
+    if name == 'NOJ':
+        from fusedwake.noj import NOJ
+        return NOJ
+    if name == 'GAU':
+        from fusedwake.gau import GAU
+        return GAU
+
+def metadata():
+    """Description of the code and of the environment of the run"""
+    def git(*args):
+        try:
+            return subprocess.check_output(('git',) + args, cwd=bench_dir,
+                stderr=subprocess.STDOUT).decode().strip()
+        except Exception:
+            return None
+    import scipy
+    return {
+        'date': datetime.datetime.now().isoformat(),
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'node': platform.node(),
+        'cpu_count': os.cpu_count() if hasattr(os, 'cpu_count') else None,
+        'memory': MEMORY,
+    }
+
+def flow_cases(n, seed=0):
+    """Random flow cases, the same for every version and commit"""
+    rng = np.random.RandomState(seed)
+    WS = rng.uniform(4.0, 25.0, n)
+    WD = rng.uniform(0.0, 360.0, n)
+    TI = rng.uniform(0.04, 0.12, n)
+    return WS, WD, TI
+
+if hasattr(time, 'perf_counter'):
+    _clock = time.perf_counter
+else:
+    _clock = time.time
+
+def timed(f):
+    t0 = _clock()
+    f()
+    return _clock() - t0
+
+def peak_memory(f):
+    """Peak memory allocated while running f [bytes]"""
+    if MEMORY == 'maxrss':
+        return peak_rss(f)
+    tracemalloc.start()
+    try:
+        f()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def peak_rss(f):
+    """Increase of the peak resident memory of a forked process running f
+    [bytes]. The child process starts with the resident memory of the
+    benchmark, and sends the increase of its peak back through a pipe.
+    """
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(r)
+            rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            f()
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            os.write(w, str(rss - rss0).encode())
+        finally:
+            os._exit(0)
+    os.close(w)
+    try:
+        out = os.read(r, 64)
+    finally:
+        os.close(r)
+        os.waitpid(pid, 0)
+    if not out:
+        raise RuntimeError('The case failed in the forked process')
+    return int(out) * MAXRSS_UNIT
+
+def bench_version(WF, model_class, version, n_cases, repeat, max_time, memory):
+    """Runs the benchmarks of a version on a wind farm"""
+    results = []
+    # A new model instance per benchmark, the models keep state between calls
+    model = model_class(version=version)
+    run = lambda WS, WD, TI: solve_cases(WF, model, WS, WD, TI)
+
+    case = (np.array([8.0]), np.array([270.0]), np.array([0.07]))
+    res = {'benchmark': 'single', 'n_cases': 1}
+    res['first'] = timed(lambda: run(*case))
+    res['times'] = [timed(lambda: run(*case)) for i in range(repeat)]
+    res['min'] = min(res['times'])
+    res['median'] = float(np.median(res['times']))
+    if memory:
+        res['peak_memory'] = peak_memory(lambda: run(*case))
+    results.append(res)
+
+    batched = version in model.batch_versions
+    for n in n_cases:
+        res = {'benchmark': 'cases_%d' % n, 'n_cases': n}
+        # The versions solving the flow cases one by one are skipped when
+        # they would take too long
+        estimate = res['estimate'] = results[0]['median'] * n
+        if not batched and estimate > max_time:
+            res['skipped'] = 'estimated time %.1f s > max_time' % estimate
+            results.append(res)
+            continue
+        cases = flow_cases(n)
+        model = model_class(version=version)
+        res['time'] = timed(lambda: run(*cases))
+        res['cases_per_s'] = n / res['time']
+        if memory:
+            model = model_class(version=version)
+            res['peak_memory'] = peak_memory(lambda: run(*cases))
+        results.append(res)
+    return results
+
+def run_benchmarks(args):
+    out = {'meta': metadata(), 'args': vars(args).copy(), 'results': []}
+    for farm in args.farms:
+        WF = WindFarm(yml=os.path.join(bench_dir, '..', 'examples', farm + '.yml'))
+        for name in args.models:
+            try:
+                model_class = get_model_class(name)
+            except Exception as e:
+                print('%s can not be imported: %s' % (name, e))
+                continue
+            for version in MODELS[name]:
+                if args.versions and version not in args.versions:
+                    continue
+                base = {'farm': farm, 'nWT': WF.nWT, 'model': name, 'version': version}
+                try:
+                    memory = not args.no_memory and MEMORY is not None
+                    results = bench_version(WF, model_class, version, args.cases,
+                                            args.repeat, args.max_time, memory)
+                except Exception as e:
+                    results = [{'error': '%s: %s' % (type(e).__name__, str(e)[:500])}]
+                for res in results:
+                    res.update(base)
+                    out['results'].append(res)
+                    print(summary(res))
+    return out
+
+def summary(res):
+    line = '%-14s %-16s %-10s' % (res['farm'], res['version'], res.get('benchmark', ''))
+    if 'error' in res:
+        return line + ' error: ' + res['error'][:80]
+    if 'skipped' in res:
+        return line + ' skipped: ' + res['skipped']
+    if res['benchmark'] == 'single':
+        line += ' first %9.4f s  median %9.4f s' % (res['first'], res['median'])
+    else:
+        line += ' %9.3f s  %10.1f cases/s' % (res['time'], res['cases_per_s'])
+    if 'peak_memory' in res:
+        line += '  peak %8.1f MB' % (res['peak_memory'] / 2.0**20)
+    return line
+
+def compare(file_a, file_b):
+    """Prints the ratio of the timings of two runs (b/a)"""
+    runs = []
+    for f in [file_a, file_b]:
+        with open(f) as fid:
+            runs.append(json.load(fid))
+    key = lambda r: (r['farm'], r['version'], r.get('benchmark'))
+    a = dict((key(r), r) for r in runs[0]['results'])
+    print('a: %s (%s)' % (runs[0]['meta']['commit'], file_a))
+    print('b: %s (%s)' % (runs[1]['meta']['commit'], file_b))
+    for r in runs[1]['results']:
+        ra = a.get(key(r))
+        if ra is None:
+            continue
+        t = 'median' if r.get('benchmark') == 'single' else 'time'
+        if t in r and t in ra:
+            line = '%-14s %-16s %-10s time b/a %6.3f' % (key(r) + (r[t] / ra[t],))
+            if 'peak_memory' in r and 'peak_memory' in ra and ra['peak_memory']:
+                line += '  memory b/a %6.3f' % (r['peak_memory'] / float(ra['peak_memory']))
+            print(line)
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ['compare']:
+        parser = argparse.ArgumentParser(prog='run_benchmarks.py compare')
+        parser.add_argument('a')
+        parser.add_argument('b')
+        args = parser.parse_args(argv[1:])
+        return compare(args.a, args.b)
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-o', '--output', default=None,
+                        help='JSON file of the results (default: results/<commit>.json)')
+    parser.add_argument('--farms', nargs='+', default=FARMS, choices=FARMS)
+    parser.add_argument('--models', nargs='+', default=sorted(MODELS), choices=sorted(MODELS))
+    parser.add_argument('--versions', nargs='+', default=None,
+                        help='Only run these versions')
+    parser.add_argument('--cases', nargs='*', type=int, default=[1000, 10000],
+                        help='Number of flow cases of the throughput benchmarks')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of warm single case calls')
+    parser.add_argument('--max-time', type=float, default=120.0,
+                        help='Skip the case by case runs estimated longer than this [s]')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Do not measure the peak memory')
+    args = parser.parse_args(argv)
+
+    out = run_benchmarks(args)
+    output = args.output
+    if output is None:
+        commit = (out['meta']['commit'] or 'unknown')[:10]
+        output = os.path.join(bench_dir, 'results', commit + '.json')
+    if os.path.dirname(output) and not os.path.isdir(os.path.dirname(output)):
+        os.makedirs(os.path.dirname(output))
+    with open(output, 'w') as fid:
+        json.dump(out, fid, indent=1)
+    print('Results written in %s' % output)
+
+if __name__ == '__main__':
+    main()
@@ -1,28 +1,28 @@
-from numpy import linspace
-from fusedwind.plant_flow.asym import AEPMultipleWindRoses
-from gclarsen.fusedwasp import PlantFromWWH
-from gclarsen.fused import FGCLarsen
+import numpy as np
+from fusedwake.WindFarm import WindFarm
+from fusedwake.gcl import GCL
+from fusedwake import aep
 import cProfile
 
 __author__ = 'pire'
 
 def prof():
     ### Single wind rose type
-    hrAEP = AEPMultipleWindRoses()
-    hrAEP.add('wf', FGCLarsen())
-    hrAEP.configure()
-    #hrAEP.connect('wt_layout', 'wf.wt_layout')
-    wt_layout = PlantFromWWH(filename='hornsrev1_turbine_nodescription.wwh').wt_layout
-    hrAEP.wf.wt_layout = wt_layout  ## <- to speed things up
-    hrAEP.wt_layout = wt_layout
-    hrAEP.wind_directions = linspace(0.0, 360.0, 36)[:-1]
-    hrAEP.wind_speeds =linspace(4.0, 25.0, 22)
-    hrAEP.run()
-    print hrAEP.net_aep
-    print hrAEP.wt_aep
-cProfile.run('print prof(); print', 'restats')
+    wf = WindFarm(name='Horns Rev 1', yml='hornsrev.yml')
+    gcl = GCL(version='fort_gcl')
+    wind_directions = np.linspace(0.0, 360.0, 36)[:-1]
+    wind_speeds = np.linspace(4.0, 25.0, 22)
+    # Uniform Weibull wind climate in all the sectors
+    n = len(wind_directions)
+    frequency = aep.weibull_frequency(wind_speeds, A=9.0*np.ones(n),
+                                      k=2.0*np.ones(n), f=np.ones(n))
+    net_aep, gross_aep, wt_aep = aep.get_AEP(wf, gcl, wind_directions,
+                                             wind_speeds, frequency, TI=0.07)
+    print(net_aep)
+    print(wt_aep)
+cProfile.run('prof()', 'restats')
 
 import pstats
 p = pstats.Stats('restats')
 p.sort_stats('cumulative').print_stats(100)
-print 'done'
\ No newline at end of file
+print('done')
@@ -3,7 +3,10 @@
 @moduleauthor:: Juan P. Murcia <jumu@dtu.dk>
 
 """
+import itertools
 import numpy as np
+from collections import OrderedDict, namedtuple
+from scipy.spatial import cKDTree
 MATPLOTLIB = True
 try:
     import matplotlib.pyplot as plt
@@ -11,7 +14,7 @@ except Exception as e:
     MATPLOTLIB = False
     print("WARNING: Matplotlib isn't installed correctly:", e)
 
-from .WindTurbine import WindTurbineDICT
+from .WindTurbine import WindTurbineDICT, CurveTable
 from windIO.Plant import WTLayout
 
 class WindTurbineList(list):
@@ -33,7 +36,24 @@ class WindTurbineList(list):
         return [getattr(w, 'name') for w in self]
 
 
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
 class WindFarm(object):
+    # Maximum number of wind directions kept in the geometry cache
+    cache_size = 128
+    # Resolution of the wind directions used as keys of the cache [deg]
+    wd_resolution = 1.0E-6
+    # Maximum memory used by the geometry cache [bytes]
+    cache_max_nbytes = 2**28
+    # Floating point type of the turbine to turbine vectors
+    geometry_dtype = np.float64
+    # Number of turbines (rows) processed at once in the turbine to
+    # turbine geometry
+    chunk_size = 256
+    # Wind speed resolution of the power and thrust coefficient tables [m/s]
+    curve_resolution = 0.01
+
     def __init__(self, name=None, yml=None, coordFile=None, array=None, WT=None):
     #def __init__(self, name, yml=None, coordFile, WT):
         """Initializes a WindFarm object.
@@ -55,7 +75,6 @@ class WindFarm(object):
         if (coordFile):
             coordArray = np.loadtxt(coordFile)
             self.pos = coordArray.T  # np.array(2 x nWT)
-            self.pos = coordArray  # np.array(2 x nWT)
             self.nWT = self.pos.shape[1]
             self.WT = WindTurbineList([WT for i in range(self.nWT)])
             if name:
@@ -86,14 +105,181 @@ class WindFarm(object):
 
         # We generate a wind turbine list
 
+        # Geometry cache of the wind directions (LRU)
+        self.layout_version = 0
+        self._dir_cache = OrderedDict()
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+        # Power and thrust coefficient tables, built when first needed
+        self._curve_table = None
+
+        self.set_layout(self.pos)
+
+    def set_layout(self, pos):
+        """Sets the horizontal position of the turbines. All the geometry
+        depending on the layout is recomputed or invalidated.
+
+        Parameters
+        ----------
+        pos: ndarray
+            Turbines position (2, nWT) [m]
+        """
+        self.pos = np.asarray(pos, dtype=float)
+
         # XYZ position of the rotors
         #self.H = np.ones(self.nWT)*self.H[0]
         self.xyz = np.vstack([self.pos, self.H])
 
-        # Vector from iWT to jWT: self.vectWTtoWT[:,i,j] [3, nWT, nWT]
-        self.vectWTtoWT = np.swapaxes([self.xyz -
-            np.repeat(np.atleast_2d(self.xyz[:, i]).T, self.nWT, axis=1)
-            for i in range(self.nWT)], 0, 1)
+        # Turbine to turbine vectors, built when first needed
+        self._vectWTtoWT = None
+
+        # Spatial index of the turbine positions, built when first needed
+        self._kdtree = None
+
+        self.layout_version += 1
+        self._dir_cache.clear()
+
+    def move(self, indices, pos):
+        """Moves some of the turbines. Only the rows and columns of the
+        turbine to turbine vectors of the moved turbines are recomputed, the
+        other geometry depending on the layout is invalidated.
+
+        Parameters
+        ----------
+        indices: int or array_like
+            Indices of the moved turbines (nMoved)
+        pos: array_like
+            New horizontal position of the moved turbines (2, nMoved) [m]
+        """
+        indices = np.atleast_1d(indices)
+        # Copied, as set_layout can keep the array given by the user
+        self.pos = np.array(self.pos, dtype=float)
+        self.pos[:, indices] = np.reshape(pos, (2, -1))
+        self.xyz[:2, indices] = self.pos[:, indices]
+
+        if self._vectWTtoWT is not None:
+            vect = self.xyz[:, None, :] - self.xyz[:, indices, None]
+            self._vectWTtoWT[:, indices, :] = vect
+            self._vectWTtoWT[:, :, indices] = -vect.transpose((0, 2, 1))
+
+        self._kdtree = None
+        self.layout_version += 1
+        self._dir_cache.clear()
+
+    @property
+    def vectWTtoWT(self):
+        """Vector from iWT to jWT: self.vectWTtoWT[:,i,j] [3, nWT, nWT],
+        stored with geometry_dtype"""
+        if (self._vectWTtoWT is None or
+                self._vectWTtoWT.dtype != self.geometry_dtype):
+            self._vectWTtoWT = np.empty([3, self.nWT, self.nWT],
+                                        dtype=self.geometry_dtype)
+            for rows, vect in self.T2T_chunks():
+                self._vectWTtoWT[:, rows, :] = vect
+        return self._vectWTtoWT
+
+    def T2T_chunks(self, chunk_size=None, dtype=None):
+        """Iterates over the turbine to turbine vectors by chunks of rows,
+        so that only chunk_size x nWT vectors are in memory at once.
+
+        Parameters
+        ----------
+        chunk_size: int, optional
+            Number of rows per chunk. Default to self.chunk_size
+        dtype: dtype, optional
+            Floating point type of the vectors. Default to self.geometry_dtype
+
+        Yields
+        ------
+        rows: slice
+            Indices of the turbines iWT of the chunk
+        vect: ndarray
+            Vector from iWT to jWT: vect[:, i - rows.start, j] [3, nRows, nWT]
+        """
+        chunk_size = chunk_size or self.chunk_size
+        dtype = dtype or self.geometry_dtype
+        for i0 in range(0, self.nWT, chunk_size):
+            rows = slice(i0, min(i0 + chunk_size, self.nWT))
+            vect = self.xyz[:, None, :] - self.xyz[:, rows, None]
+            yield rows, vect.astype(dtype, copy=False)
+
+    def __getstate__(self):
+        """The caches are not pickled, they are rebuilt when needed"""
+        state = self.__dict__.copy()
+        state.update(_vectWTtoWT=None, _kdtree=None, _dir_cache=OrderedDict(),
+                     _curve_table=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    @property
+    def curve_table(self):
+        """Power and thrust coefficient curves of the turbines resampled on
+        a uniform wind speed grid (CurveTable), built when first needed
+        """
+        if (self._curve_table is None or
+                self._curve_table.du != self.curve_resolution):
+            self._curve_table = CurveTable(self.WT, du=self.curve_resolution)
+        return self._curve_table
+
+    def get_P_CT(self, U):
+        """Computes the power and thrust coefficient of all the turbines
+        for several flow cases in one call
+
+        Parameters
+        ----------
+        U: ndarray
+            Undisturbed wind speeds at the turbines (nCases, nWT) [m/s]
+
+        Returns
+        -------
+        P: ndarray
+            Power of the turbines (nCases, nWT)
+        CT: ndarray
+            Thrust coefficient of the turbines (nCases, nWT) [-]
+        """
+        return self.curve_table(U)
+
+    def cache_info(self):
+        """Statistics of the geometry cache of the wind directions
+
+        Returns
+        -------
+        info: CacheInfo
+            hits, misses, maximum and current number of directions cached
+        """
+        return CacheInfo(self._cache_hits, self._cache_misses,
+                         self.cache_size, len(self._dir_cache))
+
+    def cache_clear(self):
+        """Empties the geometry cache of the wind directions and resets its
+        statistics"""
+        self._dir_cache.clear()
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    def _cached(self, wd, name, compute):
+        """Returns the geometry `name` of the wind direction wd from the
+        cache, computing it with compute(wd) if needed. The least recently
+        used directions are dropped when the cache is full, either in number
+        of directions or in memory.
+        """
+        key = int(round((wd % 360.) / self.wd_resolution))
+        geo = self._dir_cache.pop(key, {})
+        self._dir_cache[key] = geo
+        if name in geo:
+            self._cache_hits += 1
+        else:
+            self._cache_misses += 1
+            geo[name] = compute(wd)
+        value = geo[name]
+        nbytes = lambda g: sum(a.nbytes for v in g.values() for a in v)
+        while (len(self._dir_cache) > self.cache_size or
+               sum(nbytes(g) for g in self._dir_cache.values()) > self.cache_max_nbytes):
+            self._dir_cache.popitem(last=False)
+        return value
 
 
     def rep_str(self):
@@ -110,7 +296,10 @@ class WindFarm(object):
 
     def turbineDistance(self, wd):
         """Computes the WT to WT distance in flow coordinates
-        ranks the most of most upstream turbines
+        ranks the most of most upstream turbines. The results are cached
+        per wind direction and should not be modified. The distances are
+        dense (2 x nWT x nWT per direction), turbineFlowCoord and
+        wake_candidates are linear in nWT.
 
         Parameters
         ----------
@@ -120,17 +309,52 @@ class WindFarm(object):
         Returns
         -------
         distFlowCoord: Vector from iWT to jWT: self.vectWTtoWT[:,i,j]
+        nDownstream: ndarray(int)
+            Number of turbines upstream of each turbine
         idWT: ndarray(int)
             turbine index array
         """
+        return self._cached(wd, 'distance', self._turbineDistance)
+
+    def _turbineDistance(self, wd):
         angle = np.radians(270.-wd)
         ROT = np.array([[np.cos(angle), np.sin(angle)],
                         [-np.sin(angle), np.cos(angle)]])
-        distFlowCoord = np.einsum('ij,jkl->ikl', ROT, self.vectWTtoWT[:2, :, :])
-        nDownstream = [(distFlowCoord[0, i, :] < 0).sum() for i in range(self.nWT)]
+        distFlowCoord = np.empty([2, self.nWT, self.nWT], dtype=self.geometry_dtype)
+        for rows, vect in self.T2T_chunks():
+            distFlowCoord[:, rows, :] = np.einsum('ij,jkl->ikl', ROT, vect[:2, :, :])
+        nDownstream = (distFlowCoord[0] < 0).sum(axis=1)
         ID0 = np.argsort(nDownstream)
+        for a in [distFlowCoord, nDownstream, ID0]:
+            a.flags.writeable = False
         return distFlowCoord, nDownstream, ID0
 
+    def turbineFlowCoord(self, wd):
+        """Computes the position of the turbines in flow coordinates and
+        ranks them from the most upstream one. The results are cached per wind
+        direction and should not be modified.
+
+        Parameters
+        ----------
+        wd: float
+            Wind direction in degrees
+
+        Returns
+        -------
+        xyFlowCoord: ndarray
+            Turbines position in flow coordinates (2, nWT)
+        idWT: ndarray(int)
+            turbine index array
+        """
+        return self._cached(wd, 'flow_coord', self._turbineFlowCoord)
+
+    def _turbineFlowCoord(self, wd):
+        xyFlowCoord = self.toFlowCoord(wd, self.xyz[:2, :])
+        ID0 = np.argsort(xyFlowCoord[0], kind='mergesort')
+        for a in [xyFlowCoord, ID0]:
+            a.flags.writeable = False
+        return xyFlowCoord, ID0
+
 
     def toFlowCoord(self, wd, vect):
         """Rotates a 2xN np.array to flow coordinates
@@ -154,6 +378,83 @@ class WindFarm(object):
         return np.dot(ROT, vect)
 
 
+    @property
+    def kdtree(self):
+        """k-d tree of the horizontal positions of the turbines"""
+        if self._kdtree is None:
+            self._kdtree = cKDTree(self.xyz[:2, :].T)
+        return self._kdtree
+
+    def wake_candidates(self, wd, envelope, key=None):
+        """Finds the turbines that can be affected by the wake of each
+        turbine, using the spatial index of the wind farm.
+
+        The region downstream of a turbine is covered by a chain of balls
+        along the wake centerline, which are queried in the k-d tree. The
+        candidates are then checked against the wake envelope in flow
+        coordinates. The cost is O(log(nWT) + k) per turbine, k being the
+        number of candidates.
+
+        Parameters
+        ----------
+        wd: float
+            Wind direction in degrees
+        envelope: function
+            envelope(x, i) returns the bounding wake radius [m] of the turbine
+            i at the downstream distances x [m] (ndarray). It should not
+            decrease with x.
+        key: hashable, optional
+            Identifies the envelope. When given, the candidates are cached
+            per wind direction and key, and should not be modified.
+
+        Returns
+        -------
+        indptr: ndarray(int32)
+            Row pointers (nWT+1)
+        indices: ndarray(int32)
+            The candidates in the wake of the turbine i are
+            indices[indptr[i]:indptr[i+1]], sorted
+        """
+        if key is None:
+            return self._wake_candidates(wd, envelope)
+        return self._cached(wd, ('wake_candidates', key),
+                            lambda wd: self._wake_candidates(wd, envelope))
+
+    def _wake_candidates(self, wd, envelope):
+        angle = np.radians(270.-wd)
+        e_flow = np.array([np.cos(angle), np.sin(angle)])
+        (x, y), ID0 = self.turbineFlowCoord(wd)
+        R = np.array(self.R, dtype=float)
+        x_max = x.max()
+
+        # int32, the integer kind of the Fortran kernels
+        indptr = np.zeros(self.nWT + 1, dtype=np.int32)
+        indices = []
+        for i in range(self.nWT):
+            ids = np.zeros(0, dtype=np.int32)
+            L = x_max - x[i]
+            if L > 0.:
+                W = envelope(np.array([L]), i)[0] + R.max()
+                if np.isfinite(W) and W > 0.:
+                    # Balls of radius sqrt(2)W covering the rectangle
+                    # [0, L] x [-W, W] in flow coordinates
+                    s = (2.0 * np.arange(np.ceil(0.5 * L / W)) + 1.0) * W
+                    centers = self.xyz[:2, i] + s[:, None] * e_flow
+                    balls = self.kdtree.query_ball_point(centers, np.sqrt(2.) * W)
+                    ids = np.unique(np.fromiter(itertools.chain.from_iterable(balls),
+                                                dtype=np.int32))
+                    dx = x[ids] - x[i]
+                    ids = ids[dx > 0.]
+                    dx = dx[dx > 0.]
+                    ids = ids[np.abs(y[ids] - y[i]) < envelope(dx, i) + R[ids]]
+            indices.append(ids)
+            indptr[i + 1] = indptr[i] + len(ids)
+
+        indices = np.concatenate(indices)
+        for a in [indptr, indices]:
+            a.flags.writeable = False
+        return indptr, indices
+
     def get_T2T_gl_coord(self):
         """
         Function to calculated the turbine to turbine distances in the global
@@ -171,21 +472,14 @@ class WindFarm(object):
 
         """
         # Compute the turbine to turbine vector in global coordinates
-        x_g = np.zeros([self.nWT, self.nWT])
-        y_g = np.zeros([self.nWT, self.nWT])
-        z_g = np.zeros([self.nWT, self.nWT])
-        for i in range(self.nWT):
-            for j in range(self.nWT):
-                x_g[i,j] = self.xyz[0,j] - self.xyz[0,i]
-                y_g[i,j] = self.xyz[1,j] - self.xyz[1,i]
-                z_g[i,j] = self.xyz[2,j] - self.xyz[2,i]
+        x_g, y_g, z_g = self.xyz[:, None, :] - self.xyz[:, :, None]
 
         return x_g,y_g,z_g
 
     def get_T2T_gl_coord2(self):
         """
         Function to calculated the turbine to turbine distances in the global
-        coordinate system. (faster).
+        coordinate system. (faster, returns views of self.vectWTtoWT).
 
         Parameters
         ----------
@@ -261,3 +555,102 @@ class WindFarm(object):
         # Detect the edge case if key is 'WT'
         if not key in ['WT', 'nWT']:
             return [getattr(wt, key) for wt in self.WT]
+
+
+class PreparedFarm(object):
+    """Inputs of the wake models that only depend on the wind farm: the
+    turbine positions, rotor diameters, power and thrust coefficient curves,
+    cut-in, cut-out and idle thrust coefficients, and the turbine to turbine
+    distances. They are stored in float64 arrays, in Fortran order for the 2D
+    arrays, so that they are given to the Fortran kernels without copies.
+
+    A PreparedFarm is built for a wind farm and a version of its layout. The
+    wake models keep it between their calls and only rebuild it when the
+    wind farm or its layout changes (see WindFarm.set_layout).
+    """
+    def __init__(self, WF):
+        """Initializes a PreparedFarm object
+
+        Parameters
+        ----------
+        WF: WindFarm
+            Windfarm instance
+
+        Returns
+        -------
+        PreparedFarm (PreparedFarm)
+        """
+        self.WF = WF
+        self.layout_version = WF.layout_version
+        self.x_t, self.y_t, self.z_t = np.array(WF.xyz, dtype=np.float64)
+        self.dt = np.array(WF.rotor_diameter, dtype=np.float64)
+        self.p_c = self._curves(WF.power_curve)
+        self.ct_c = self._curves(WF.c_t_curve)
+        self.ws_ci = np.array(WF.cut_in_wind_speed, dtype=np.float64)
+        self.ws_co = np.array(WF.cut_out_wind_speed, dtype=np.float64)
+        self.ct_idle = np.array(WF.c_t_idle, dtype=np.float64)
+        self._T2T = None
+
+    @staticmethod
+    def _curves(curves):
+        """Stacks the curves of the turbines in a (nWT, nPoints, 2) array.
+        Curves of different lengths can not be stacked, they are kept as a
+        list (the Fortran versions need curves of the same length).
+        """
+        try:
+            return np.asfortranarray(np.array(curves, dtype=np.float64))
+        except ValueError:
+            return curves
+
+    def is_valid(self, WF):
+        """The PreparedFarm can be used for WF: it is the wind farm it was
+        built for, with the same layout"""
+        return self.WF is WF and self.layout_version == WF.layout_version
+
+    def update(self, WF):
+        """Updates the PreparedFarm to the current layout of the wind farm it
+        was built for, recomputing only the positions and the rows and
+        columns of the turbine to turbine distances of the turbines that
+        moved (see WindFarm.move)
+
+        Parameters
+        ----------
+        WF: WindFarm
+            Windfarm instance
+
+        Returns
+        -------
+        updated: bool
+            False when the PreparedFarm can not be updated (other wind farm,
+            or most of the turbines moved), and should be rebuilt
+        """
+        if self.WF is not WF or len(self.x_t) != WF.nWT:
+            return False
+        xyz = np.array(WF.xyz, dtype=np.float64)
+        moved = np.nonzero((xyz != [self.x_t, self.y_t, self.z_t]).any(axis=0))[0]
+        if 2 * len(moved) > WF.nWT:
+            return False
+        self.x_t[moved], self.y_t[moved], self.z_t[moved] = xyz[:, moved]
+        if self._T2T is not None:
+            for a, c in zip(self._T2T, xyz):
+                a[moved, :] = c[None, :] - c[moved, None]
+                a[:, moved] = c[None, moved] - c[:, None]
+        self.layout_version = WF.layout_version
+        return True
+
+    @property
+    def T2T(self):
+        """Turbine to turbine distances (x_g, y_g, z_g) in global coordinates
+        (see WindFarm.get_T2T_gl_coord2), built when first needed. They are
+        filled in Fortran order from WindFarm.T2T_chunks, without the
+        vectWTtoWT of the wind farm, and take 3 x nWT x nWT float64: the
+        memory of the versions using x_g, y_g, z_g (all the Fortran and
+        Numba versions but fort_gcl_s_sp) is still quadratic in nWT.
+        """
+        if self._T2T is None:
+            nWT = len(self.x_t)
+            self._T2T = tuple(np.empty([nWT, nWT], order='F') for i in range(3))
+            for rows, vect in self.WF.T2T_chunks(dtype=np.float64):
+                for a, v in zip(self._T2T, vect):
+                    a[rows, :] = v
+        return self._T2T
@@ -220,8 +220,139 @@ class WindTurbineDICT(WindTurbine):
         parameters: list
             The parameter list of the turbines
         """
+        # Special attributes (e.g. looked up when unpickling) are not data
+        if key.startswith('__') or 'data' not in self.__dict__:
+            raise AttributeError(key)
         return self.data[key]
 
+class CurveTable(object):
+    """Power and thrust coefficient curves of a list of wind turbines
+
+    The curves are resampled on a uniform wind speed grid and stored in
+    contiguous tables, with one row per distinct turbine type. The power and
+    thrust coefficient of all the turbines for many flow cases are then
+    evaluated in one vectorized call, with the operational rules of
+    WindTurbine.get_P and WindTurbine.get_CT.
+
+    """
+    def __init__(self, WT, du=0.01):
+        """Initializes a CurveTable object
+
+        Parameters
+        ----------
+        WT: list
+            WindTurbine instances, one per column of the wind speed arrays
+        du: float, optional
+            Wind speed resolution of the tables [m/s]
+
+        Returns
+        -------
+        CurveTable (CurveTable)
+        """
+        self.du = du
+        # Turbines with the same curves share the same row of the tables
+        rows, keys = [], {}
+        self.type = np.zeros(len(WT), dtype=int)
+        for i, wt in enumerate(WT):
+            key = tuple(np.asarray(a, dtype=float).tobytes() for a in
+                        [wt.PCI.x, wt.PCI.y, wt.CTCI.x, wt.CTCI.y])
+            if key not in keys:
+                keys[key] = len(rows)
+                rows.append(wt)
+            self.type[i] = keys[key]
+
+        self.u_cutin = np.array([wt.u_cutin for wt in WT], dtype=float)
+        self.u_cutout = np.array([wt.u_cutout for wt in WT], dtype=float)
+        self.CT_idle = np.array([wt.CT_idle for wt in WT], dtype=float)
+
+        # Uniform wind speed grid covering the curves of all the types
+        self.u0 = min(min(wt.PCI.x[0], wt.CTCI.x[0]) for wt in rows)
+        u_max = max(max(wt.PCI.x[-1], wt.CTCI.x[-1]) for wt in rows)
+        self.n = int(np.ceil((u_max - self.u0) / du - 1.0E-6)) + 1
+        self.u = self.u0 + du * np.arange(self.n)
+
+        # Values and slopes of the curves on each interval of the grid
+        self.P = np.array([wt.PCI(np.clip(self.u, wt.PCI.x[0], wt.PCI.x[-1]))
+                           for wt in rows], dtype=float)
+        self.CT = np.array([wt.CTCI(np.clip(self.u, wt.CTCI.x[0], wt.CTCI.x[-1]))
+                            for wt in rows], dtype=float)
+        self.dP = np.zeros_like(self.P)
+        self.dP[:, :-1] = np.diff(self.P, axis=1)
+        self.dCT = np.zeros_like(self.CT)
+        self.dCT[:, :-1] = np.diff(self.CT, axis=1)
+
+    def __call__(self, U, cols=None):
+        """Computes the power and thrust coefficient of the turbines
+
+        Parameters
+        ----------
+        U: ndarray
+            Undisturbed wind speeds (..., nCols) [m/s]
+        cols: int, slice or ndarray(int), optional
+            Turbines of the columns of U. Default to all the turbines.
+
+        Returns
+        -------
+        P: ndarray
+            Power (..., nCols), NaN where U is not finite
+        CT: ndarray
+            Thrust coefficient (..., nCols) [-], NaN where U is not finite
+        """
+        U = np.asarray(U, dtype=float)
+        if cols is None:
+            cols = slice(None)
+        typ = self.type[cols]
+
+        # Linear interpolation in the tables, the non finite wind speeds
+        # being looked up at the first point and set to NaN afterwards
+        finite = np.isfinite(U)
+        U = np.where(finite, U, self.u0)
+        t = np.clip((U - self.u0) / self.du, 0.0, self.n - 1.0)
+        i = t.astype(int)
+        f = t - i
+        P = self.P[typ, i] + f * self.dP[typ, i]
+        CT = self.CT[typ, i] + f * self.dCT[typ, i]
+
+        inside = (U >= self.u_cutin[cols]) & (U <= self.u_cutout[cols])
+        P = np.where(finite, np.where(inside, P, 0.0), np.nan)
+        CT = np.where(finite, np.where(inside, CT, self.CT_idle[cols]), np.nan)
+        return P, CT
+
+    def slopes(self, U, cols=None):
+        """Computes the derivatives of the power and thrust coefficient of the
+        turbines with respect to the wind speed, on the interpolated curves
+
+        Parameters
+        ----------
+        U: ndarray
+            Undisturbed wind speeds (..., nCols) [m/s]
+        cols: int, slice or ndarray(int), optional
+            Turbines of the columns of U. Default to all the turbines.
+
+        Returns
+        -------
+        dP: ndarray
+            Derivative of the power (..., nCols) [/(m/s)], NaN where U is not
+            finite
+        dCT: ndarray
+            Derivative of the thrust coefficient (..., nCols) [/(m/s)], NaN
+            where U is not finite
+        """
+        U = np.asarray(U, dtype=float)
+        if cols is None:
+            cols = slice(None)
+        typ = self.type[cols]
+
+        finite = np.isfinite(U)
+        U = np.where(finite, U, self.u0)
+        t = (U - self.u0) / self.du
+        i = np.clip(t, 0.0, self.n - 1.0).astype(int)
+        inside = ((U >= self.u_cutin[cols]) & (U <= self.u_cutout[cols]) &
+                  (t >= 0.0) & (t <= self.n - 1.0))
+        dP = np.where(finite, np.where(inside, self.dP[typ, i] / self.du, 0.0), np.nan)
+        dCT = np.where(finite, np.where(inside, self.dCT[typ, i] / self.du, 0.0), np.nan)
+        return dP, dCT
+
 '''
 v80 = WindTurbine('Vestas v80 2MW offshore','V80_2MW_offshore.dat',70,40)
 v80.display_windTurbine()
@@ -0,0 +1,144 @@
+"""Annual energy production of a wind farm
+
+The wind climate is a table of frequencies of the wind direction x wind
+speed bins. It can be built from a sectorized Weibull distribution with
+`weibull_frequency`, or given directly as a binned frequency table. All the
+flow cases of the table are solved in a single call of the batched version
+of the wake model (see the `batch_versions` of GCL, NOJ and GAU), or split
+among worker processes with `n_workers`.
+
+Example
+-------
+    > gcl = GCL(version='py_gcl_v2')
+    > WS = np.arange(4.0, 26.0)
+    > freq = weibull_frequency(WS, A, k, f)
+    > net, gross, wt_aep = get_AEP(WF, gcl, WD, WS, freq, TI=0.07)
+"""
+import numpy as np
+
+# Number of hours in a year
+HOURS_PER_YEAR = 8760.0
+
+def ws_bin_edges(WS):
+    """Edges of the wind speed bins centered on WS
+    Parameters
+    ----------
+    WS: ndarray
+        Increasing wind speeds [m/s] (nWS)
+    Returns
+    -------
+    edges: ndarray
+        Bin edges, half way between the wind speeds [m/s] (nWS+1)
+    """
+    WS = np.atleast_1d(np.asarray(WS, dtype=float))
+    if len(WS) == 1:
+        return np.array([WS[0] - 0.5, WS[0] + 0.5]).clip(0.0)
+    edges = np.hstack([WS[0] - 0.5 * (WS[1] - WS[0]),
+                       0.5 * (WS[1:] + WS[:-1]),
+                       WS[-1] + 0.5 * (WS[-1] - WS[-2])])
+    return edges.clip(0.0)
+
+def weibull_frequency(WS, A, k, f):
+    """Frequencies of the wind speed bins of a sectorized Weibull wind
+    climate
+    Parameters
+    ----------
+    WS: ndarray
+        Center of the wind speed bins [m/s] (nWS)
+    A: ndarray
+        Weibull scale parameter of each sector [m/s] (nWD)
+    k: ndarray
+        Weibull shape parameter of each sector [-] (nWD)
+    f: ndarray
+        Frequency of each sector, normalized to a sum of 1 (nWD)
+    Returns
+    -------
+    frequency: ndarray
+        Frequency of each wind direction x wind speed bin (nWD, nWS)
+    """
+    A, k, f = [np.atleast_1d(np.asarray(v, dtype=float))[:, None]
+               for v in [A, k, f]]
+    edges = ws_bin_edges(WS)[None, :]
+    cdf = 1.0 - np.exp(-(edges / A)**k)
+    return f / f.sum() * np.diff(cdf, axis=1)
+
+def get_power(WF, model, WS, WD, TI, n_workers=None):
+    """Power of the turbines of a wind farm for a list of flow cases
+    Parameters
+    ----------
+    WF: WindFarm
+        Windfarm instance
+    model: GCL, NOJ or GAU
+        Wake model instance, with its version set
+    WS: ndarray
+        Undisturbed wind speed at hub height [m/s] (nF)
+    WD: ndarray
+        Undisturbed wind direction at hub height [deg] (nF)
+    TI: ndarray
+        Ambient turbulence intensity [-] (nF)
+    n_workers: int, optional
+        Number of worker processes (see parallel.run_parallel). By default
+        the flow cases are solved in the current process.
+    Returns
+    -------
+    P_WT: ndarray
+        Power production of the wind turbines (nF, nWT) [W]
+    """
+    # The process pool is only needed (and importable) for several workers
+    if n_workers is not None and n_workers > 1:
+        from .parallel import run_parallel
+        return run_parallel(WF, model, WS, WD, TI, n_workers=n_workers)[0]
+    from .parallel import solve_cases
+    return solve_cases(WF, model, WS, WD, TI)[0]
+
+def get_AEP(WF, model, WD, WS, frequency, TI=0.07, hours=HOURS_PER_YEAR,
+            n_workers=None):
+    """Computes the annual energy production of a wind farm
+    Parameters
+    ----------
+    WF: WindFarm
+        Windfarm instance
+    model: GCL, NOJ or GAU
+        Wake model instance, with its version set
+    WD: ndarray
+        Wind directions of the bins [deg] (nWD)
+    WS: ndarray
+        Wind speeds of the bins [m/s] (nWS)
+    frequency: ndarray
+        Frequency of each wind direction x wind speed bin (nWD, nWS)
+    TI: float or ndarray, optional
+        Ambient turbulence intensity, broadcastable to (nWD, nWS) [-]
+    hours: float, optional
+        Number of hours in a year
+    n_workers: int, optional
+        Number of worker processes solving the flow cases
+    Returns
+    -------
+    net_aep: float
+        Annual energy production of the wind farm [Wh]
+    gross_aep: float
+        Annual energy production without wake losses, the turbines being in
+        the undisturbed wind speed [Wh]
+    wt_aep: ndarray
+        Annual energy production of each turbine [Wh] (nWT)
+    """
+    WD = np.atleast_1d(np.asarray(WD, dtype=float))
+    WS = np.atleast_1d(np.asarray(WS, dtype=float))
+    frequency = np.asarray(frequency, dtype=float)
+    if frequency.shape != (len(WD), len(WS)):
+        raise ValueError('The frequency table should have the shape (nWD, nWS)=%s, got %s'%(
+            (len(WD), len(WS)), frequency.shape))
+    WD_g, WS_g = np.meshgrid(WD, WS, indexing='ij')
+    TI_g = np.broadcast_to(TI, WD_g.shape)
+
+    # Only the bins with a frequency and a wind speed above the lowest cut-in
+    # wind speed produce power
+    run = (frequency > 0.0) & (WS_g >= WF.curve_table.u_cutin.min())
+    P_WT = np.zeros(WD_g.shape + (WF.nWT,))
+    P_WT[run] = get_power(WF, model, WS_g[run], WD_g[run], TI_g[run],
+                          n_workers=n_workers)
+
+    wt_aep = hours * np.einsum('ij,ijk->k', frequency, P_WT)
+    P_free = WF.get_P_CT(np.repeat(WS[:, None], WF.nWT, axis=1))[0]
+    gross_aep = hours * np.einsum('j,jk->', frequency.sum(axis=0), P_free)
+    return wt_aep.sum(), gross_aep, wt_aep
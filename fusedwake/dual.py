@@ -0,0 +1,198 @@
+"""Forward mode automatic differentiation with dual numbers
+
+A Dual array carries the values of a variable and their derivatives with
+respect to nP parameters. The numpy ufuncs and the arithmetic operators
+applied to Dual arrays propagate the derivatives, so that the functions of
+the wake models written with numpy (e.g. gcl.get_Rw, gcl.get_dU) give their
+derivatives without being modified. Comparisons are made on the values.
+
+Example
+-------
+    > x = Dual.variable(np.array([1.0, 2.0]), 0, 1)
+    > y = np.sqrt(x) * 3.0
+    > y.value, y.der[:, 0]
+    (array([3., 4.24264069]), array([1.5, 1.06066017]))
+"""
+import numpy as np
+
+
+def _value(a):
+    """Values of a Dual array, or the constant itself"""
+    return a.value if isinstance(a, Dual) else np.asarray(a, dtype=float)
+
+def _der(a):
+    """Derivatives of a Dual array, None for a constant"""
+    return a.der if isinstance(a, Dual) else None
+
+def _scale(d, f):
+    """Derivatives d scaled by the values f (broadcasted), None stays None"""
+    return None if d is None else d * np.asarray(f)[..., None]
+
+def _sum(*terms):
+    terms = [t for t in terms if t is not None]
+    return sum(terms[1:], terms[0]) if terms else None
+
+
+# Derivatives of the results of the ufuncs: rule(value, x, d), x being the
+# values of the inputs and d their derivatives (None for the constants)
+_RULES = {
+    np.add: lambda v, x, d: _sum(d[0], d[1]),
+    np.subtract: lambda v, x, d: _sum(d[0], _scale(d[1], -1.0)),
+    np.multiply: lambda v, x, d: _sum(_scale(d[0], x[1]), _scale(d[1], x[0])),
+    np.true_divide: lambda v, x, d: _sum(_scale(d[0], 1.0 / x[1]),
+                                         _scale(d[1], -v / x[1])),
+    np.power: lambda v, x, d: _sum(_scale(d[0], np.where(x[1] == 0.0, 0.0,
+                                                         x[1] * x[0]**(x[1] - 1.0))),
+                                   _scale(d[1], v * np.log(x[0]))),
+    np.negative: lambda v, x, d: _scale(d[0], -1.0),
+    np.positive: lambda v, x, d: d[0],
+    np.sqrt: lambda v, x, d: _scale(d[0], np.where(v > 0.0, 0.5 / v, 0.0)),
+    np.square: lambda v, x, d: _scale(d[0], 2.0 * x[0]),
+    np.exp: lambda v, x, d: _scale(d[0], v),
+    np.log: lambda v, x, d: _scale(d[0], 1.0 / x[0]),
+    np.sin: lambda v, x, d: _scale(d[0], np.cos(x[0])),
+    np.cos: lambda v, x, d: _scale(d[0], -np.sin(x[0])),
+    np.absolute: lambda v, x, d: _scale(d[0], np.sign(x[0])),
+    np.sign: lambda v, x, d: _scale(d[0], 0.0),
+    np.maximum: lambda v, x, d: _sum(_scale(d[0], x[0] >= x[1]),
+                                     _scale(d[1], x[0] < x[1])),
+    np.minimum: lambda v, x, d: _sum(_scale(d[0], x[0] <= x[1]),
+                                     _scale(d[1], x[0] > x[1])),
+}
+if np.divide is not np.true_divide: # python 2
+    _RULES[np.divide] = _RULES[np.true_divide]
+
+# Ufuncs applied to the values only
+_COMPARISONS = [np.less, np.less_equal, np.greater, np.greater_equal,
+                np.equal, np.not_equal, np.isnan, np.isfinite]
+
+
+class Dual(object):
+    """Array of values and of their derivatives with respect to nP parameters
+
+    Attributes
+    ----------
+    value: ndarray
+        Values (shape)
+    der: ndarray
+        Derivatives of the values with respect to the parameters (shape, nP)
+    """
+    # The operators of numpy arrays with Dual arrays are left to Dual
+    __array_priority__ = 1000
+
+    def __init__(self, value, der):
+        """Initializes a Dual object
+
+        Parameters
+        ----------
+        value: float or ndarray
+            Values (shape)
+        der: ndarray
+            Derivatives, broadcasted to (shape, nP)
+        """
+        self.value = np.array(value, dtype=float)
+        der = np.asarray(der, dtype=float)
+        shape = self.value.shape + der.shape[-1:]
+        if der.shape != shape:
+            der = np.broadcast_to(der, shape).copy()
+        self.der = der
+
+    @classmethod
+    def variable(cls, value, i, nP):
+        """Parameter i of nP: its derivative is one with respect to itself"""
+        value = np.asarray(value, dtype=float)
+        der = np.zeros(value.shape + (nP,))
+        der[..., i] = 1.0
+        return cls(value, der)
+
+    @classmethod
+    def constant(cls, value, nP):
+        """Values without derivatives"""
+        value = np.asarray(value, dtype=float)
+        return cls(value, np.zeros(value.shape + (nP,)))
+
+    @property
+    def shape(self):
+        return self.value.shape
+
+    @property
+    def ndim(self):
+        return self.value.ndim
+
+    @property
+    def size(self):
+        return self.value.size
+
+    @property
+    def nP(self):
+        return self.der.shape[-1]
+
+    def __len__(self):
+        return len(self.value)
+
+    def __repr__(self):
+        return 'Dual(%r, %r)' % (self.value, self.der)
+
+    def __getitem__(self, key):
+        return Dual(self.value[key], self.der[key])
+
+    def __setitem__(self, key, a):
+        self.value[key] = _value(a)
+        d = _der(a)
+        self.der[key] = 0.0 if d is None else d
+
+    def copy(self):
+        return Dual(self.value.copy(), self.der.copy())
+
+    def sum(self, axis=None, **kwargs):
+        if axis is None:
+            return Dual(self.value.sum(), self.der.reshape((-1, self.nP)).sum(axis=0))
+        axis = axis % self.ndim # The derivatives have one more axis
+        return Dual(self.value.sum(axis=axis), self.der.sum(axis=axis))
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__' or kwargs:
+            return NotImplemented
+        values = [_value(a) for a in inputs]
+        if ufunc in _COMPARISONS:
+            return ufunc(*values)
+        if ufunc not in _RULES:
+            return NotImplemented
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if ufunc is np.power and values[0].ndim == values[1].ndim == 0:
+                # Same as the power of the numpy scalars, not computed by the ufunc
+                value = np.float64(values[0]) ** np.float64(values[1])
+            else:
+                value = ufunc(*values)
+            der = _RULES[ufunc](value, values, [_der(a) for a in inputs])
+        return Dual(value, der)
+
+    # Operators
+    __add__ = lambda self, a: np.add(self, a)
+    __radd__ = lambda self, a: np.add(a, self)
+    __sub__ = lambda self, a: np.subtract(self, a)
+    __rsub__ = lambda self, a: np.subtract(a, self)
+    __mul__ = lambda self, a: np.multiply(self, a)
+    __rmul__ = lambda self, a: np.multiply(a, self)
+    __truediv__ = __div__ = lambda self, a: np.true_divide(self, a)
+    __rtruediv__ = __rdiv__ = lambda self, a: np.true_divide(a, self)
+    def __pow__(self, a):
+        # Same fast paths as the numpy arrays, for the same values
+        if np.ndim(a) == 0 and self.ndim > 0:
+            if a == 2.0:
+                return np.square(self)
+            elif a == 0.5:
+                return np.sqrt(self)
+        return np.power(self, a)
+
+    __rpow__ = lambda self, a: np.power(a, self)
+    __neg__ = lambda self: np.negative(self)
+    __pos__ = lambda self: self
+    __abs__ = lambda self: np.absolute(self)
+    __lt__ = lambda self, a: np.less(self, a)
+    __le__ = lambda self, a: np.less_equal(self, a)
+    __gt__ = lambda self, a: np.greater(self, a)
+    __ge__ = lambda self, a: np.greater_equal(self, a)
+    __eq__ = lambda self, a: np.equal(self, a)
+    __ne__ = lambda self, a: np.not_equal(self, a)
+    __hash__ = None
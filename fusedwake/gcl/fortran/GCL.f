@@ -40,6 +40,56 @@ cf2py real(kind=8) intent(out) :: R96
       end subroutine get_R96
 
 
+c ----------------------------------------------------------------------
+c get_wake_c(D,CT,TI)
+c ----------------------------------------------------------------------
+c Computes the wake shape coefficients. They only depend on the state of
+c the wake generating turbine, and are computed once per turbine
+c
+c Inputs
+c ----------
+c D (float): Wind turbine diameter
+c TI (float): Ambient turbulence intensity
+c CT (float): Outputs WindTurbine object's thrust coefficient
+c
+c Outputs
+c ----------
+c xT_st (float): Distance from rotor disc to origin of wake expansion
+c                (wake becomes zero)
+c c1(float): Integration constant
+      subroutine get_wake_c(D,CT,TI,a1,a2,a3,a4,b1,b2,xT_st,c1)
+
+      implicit none
+      real(kind=8) :: D,CT,TI,a1,a2,a3,a4,b1,b2,xT_st,c1
+cf2py real(kind=8) intent(in) :: D,CT,TI
+cf2py real(kind=8) optional,intent(in) :: a1=0.435449861
+cf2py real(kind=8) optional,intent(in) :: a2=0.797853685
+cf2py real(kind=8) optional,intent(in) :: a3=-0.124807893
+cf2py real(kind=8) optional,intent(in) :: a4=0.136821858
+cf2py real(kind=8) optional,intent(in) :: b1=15.6298
+cf2py real(kind=8) optional,intent(in) :: b2=1.0
+cf2py real(kind=8) intent(out) :: xT_st, c1
+      ! internal variables
+      real(kind=8), parameter :: pi=3.1415926535897932384626433832795d0
+      real(kind=8) :: Area,a,k,R96,tm1,tm2,tm3
+
+      Area=pi*D*D/4.0d0
+      ! axial velocity deficit at rotor disc
+      a=(1.0d0-(sqrt(1.0d0-CT)))/2.0d0
+      ! Near wake expansion ratio: k = D0/D from momentum balance
+      k=sqrt((1.0d0-a)/(1.0d0-2.0d0*a))
+      call get_R96(D,CT,TI,a1,a2,a3,a4,b1,b2,R96)
+      ! Distance from rotor disc to origin of wake expansion, where the
+      ! wake becomes zero; assuming wake expansion RW ~ (x+xT_st)**(1/3)
+      xT_st=(9.6d0*D)/(((2.0d0*R96/(k*D))**3.0d0)-1.0d0)
+      ! Integration constant from first order asymptotic solution of
+      ! axis-symmetrical momentum balance in the wake
+      tm1=(k*D/2.0d0)**(2.5d0)
+      tm2=(105.0d0/(2.0d0*pi))**(-0.5d0)
+      tm3=(CT*Area*xT_st)**(-5.0d0/6.0d0)
+      c1=tm1*tm2*tm3
+      end subroutine get_wake_c
+
 c ----------------------------------------------------------------------
 c get_RW(x,D,CT,TI)
 c ----------------------------------------------------------------------
@@ -75,38 +125,54 @@ cf2py real(kind=8) optional,intent(in) :: b1=15.6298
 cf2py real(kind=8) optional,intent(in) :: b2=1.0
 cf2py real(kind=8) intent(out), depend(n),dimension(n) :: RW
 cf2py real(kind=8) intent(out) :: xT_st, c1
+
+      call get_wake_c(D,CT,TI,a1,a2,a3,a4,b1,b2,xT_st,c1)
+      call get_RW_c(n,x,D,CT,xT_st,c1,RW)
+      end subroutine get_RW
+
+c ----------------------------------------------------------------------
+c get_RW_c(x,D,CT,xT_st,c1)
+c ----------------------------------------------------------------------
+c Computes the wake radius at a location from the wake shape
+c coefficients (see get_wake_c)
+c
+c Inputs
+c ----------
+c x (float): Distance between turbines in the stream-wise direction
+c D (float): Wind turbine diameter
+c CT (float): Outputs WindTurbine object's thrust coefficient
+c xT_st (float): Distance from rotor disc to origin of wake expansion
+c c1(float): Integration constant
+c
+c Outputs
+c ----------
+c Rw (float): Wake radius at a location
+      subroutine get_RW_c(n,x,D,CT,xT_st,c1,RW)
+
+      implicit none
+      integer :: n
+      real(kind=8) :: x(n),D,CT,xT_st,c1,RW(n)
+cf2py integer intent(hide),depend(x) :: n=len(x)
+cf2py real(kind=8) intent(in),dimension(n) :: x
+cf2py real(kind=8) intent(in) :: D,CT,xT_st,c1
+cf2py real(kind=8) intent(out), depend(n),dimension(n) :: RW
       ! internal variables
       real(kind=8), parameter :: pi=3.1415926535897932384626433832795d0
       integer :: i
-      real(kind=8) :: Area,a,k,R96,tm1,tm2,tm3,tm4,tm5
+      real(kind=8) :: Area,tm4,tm5
 
       Area=pi*D*D/4.0d0
-      ! axial velocity deficit at rotor disc
-      a=(1.0d0-(sqrt(1.0d0-CT)))/2.0d0
-      ! Near wake expansion ratio: k = D0/D from momentum balance
-      k=sqrt((1.0d0-a)/(1.0d0-2.0d0*a))
-      call get_R96(D,CT,TI,a1,a2,a3,a4,b1,b2,R96)
-      ! Distance from rotor disc to origin of wake expansion, where the
-      ! wake becomes zero; assuming wake expansion RW ~ (x+xT_st)**(1/3)
-      xT_st=(9.6d0*D)/(((2.0d0*R96/(k*D))**3.0d0)-1.0d0)
+      tm4=(105.0d0*c1*c1/(2.0d0*pi))**(0.2d0)
       do i = 1, n
         if ((x(i)+xT_st) <= 0) then
           ! Null wake radius for locations in front of the rotor disc
           RW(i) = 0.0d0
         else
-          ! Integration constant from first order asymptotic solution of
-          ! axis-symmetrical momentum balance in the wake
-          tm1=(k*D/2.0d0)**(2.5d0)
-          tm2=(105.0d0/(2.0d0*pi))**(-0.5d0)
-          tm3=(CT*Area*xT_st)**(-5.0d0/6.0d0)
-          c1=tm1*tm2*tm3
-
-          tm4=(105.0d0*c1*c1/(2.0d0*pi))**(0.2d0)
           tm5=(CT*Area*(x(i)+xT_st))**(1.0d0/3.0d0)
           RW(i)=tm4*tm5
         end if
       end do
-      end subroutine get_RW
+      end subroutine get_RW_c
 
 c ----------------------------------------------------------------------
 c get_dU(x,r,D,CT,TI)
@@ -140,18 +206,52 @@ cf2py real(kind=8) optional,intent(in) :: a3=-0.124807893
 cf2py real(kind=8) optional,intent(in) :: a4=0.136821858
 cf2py real(kind=8) optional,intent(in) :: b1=15.6298
 cf2py real(kind=8) optional,intent(in) :: b2=1.0
+cf2py real(kind=8) intent(out),depend(n),dimension(n) :: dU
+      ! internal variables
+      real(kind=8) :: xT_st,c1
+      real(kind=8), dimension(n) :: RW
+
+      call get_RW(n,x,D,CT,TI,a1,a2,a3,a4,b1,b2,RW,xT_st,c1)
+      call get_dU_c(n,x,r,RW,D,CT,xT_st,c1,dU)
+      end subroutine get_dU
+
+c ----------------------------------------------------------------------
+c get_dU_c(x,r,RW,D,CT,xT_st,c1)
+c ----------------------------------------------------------------------
+c Computes the wake velocity deficit at a location from the wake radius
+c and the wake shape coefficients (see get_wake_c)
+c
+c Inputs
+c ----------
+c x (float): Distance between turbines in the stream-wise direction
+c r (array): Radial distance between the turbine and the location
+c RW (array): Wake radius at the location
+c D (float): Wind turbine diameter
+c CT (float): Outputs WindTurbine object's thrust coefficient
+c xT_st (float): Distance from rotor disc to origin of wake expansion
+c c1(float): Integration constant
+c
+c Outputs
+c ----------
+c dU (float): Wake velocity deficit at a location normalized
+c             by rotor averaged (equivalent) inflow velocity
+      subroutine get_dU_c(n,x,r,RW,D,CT,xT_st,c1,dU)
+
+      implicit none
+      integer :: n
+      real(kind=8) :: x(n),r(n),RW(n),D,CT,xT_st,c1,dU(n)
+cf2py integer intent(hide),depend(x) :: n=len(x)
+cf2py real(kind=8) intent(in),dimension(n) :: x
+cf2py real(kind=8) intent(in),depend(n),dimension(n) :: r,RW
+cf2py real(kind=8) intent(in) :: D,CT,xT_st,c1
 cf2py real(kind=8) intent(out),depend(n),dimension(n) :: dU
       ! internal variables
       real(kind=8), parameter :: pi=3.1415926535897932384626433832795d0
       integer :: i
       real(kind=8) :: Area
-      real(kind=8) :: tm10,tm20,tm30,tm31,tm32,tm40,tm41,tm42,xT_st,c1
-      real(kind=8), dimension(n) :: RW
+      real(kind=8) :: tm10,tm20,tm30,tm31,tm32,tm40,tm41,tm42
 
       Area=pi*D*D/4.0d0
-
-      call get_RW(n,x,D,CT,TI,a1,a2,a3,a4,b1,b2,RW,xT_st,c1)
-
       do i = 1, n
         if ((x(i) <= 0).or.(r(i) >= RW(i))) then
           ! Null deficit for locations in front of the rotor disc
@@ -169,58 +269,35 @@ cf2py real(kind=8) intent(out),depend(n),dimension(n) :: dU
           dU(i)=-tm10*tm20*(tm30-tm40)**(2.0d0)
         end if
       end do
-      end subroutine get_dU
+      end subroutine get_dU_c
 
 c ----------------------------------------------------------------------
-c get_dUeq(x,y,z,DT,D,CT,TI)
+c gl_rule(Ng)
 c ----------------------------------------------------------------------
-c Computes the rotor averaged (equivalent) wake velocity deficit at
-c different turbine locations and diameters
+c Gauss-Legendre quadrature points and weights on [-1,1]. Tabulated for
+c Ng = 4 to 8, computed by Newton iterations on the Legendre polynomial
+c for other orders.
 c
 c Inputs
 c ----------
-c x (array): Distance between turbines in the stream-wise direction
-c y (array): Distance between turbines in the cross-flow direction
-c z (array): Distance between turbines in the vertical direction
-c DT (array): Wake operating turbines diameter
-c D (float): Wake generating turbine diameter
-c TI (float): Ambient turbulence intensity [-]
-c CT (float): Outputs WindTurbine object's thrust coefficient
-c Ng (int): Polynomial order for Gauss-Legendre quadrature integration
-c           in both radial and angular positions
+c Ng (int): Number of quadrature points
 c
 c Outputs
 c ----------
-c dUeq (float): Wake velocity deficit at a location normalized by
-c               inflow velocity
-      subroutine get_dUeq(n,x,y,z,DT,D,CT,TI,a1,a2,a3,a4,b1,b2,Ng,dUeq)
+c root (array): Quadrature points
+c weight (array): Quadrature weights
+      subroutine gl_rule(Ng,root,weight)
 
       implicit none
-      integer :: n,Ng
-      real(kind=8) :: x(n),y(n),z(n),DT(n),D,CT,TI
-      real(kind=8) :: a1,a2,a3,a4,b1,b2,dUeq(n)
-cf2py integer intent(hide),depend(x) :: n = len(x)
-cf2py real(kind=8) intent(in),dimension(n) :: x
-cf2py real(kind=8) intent(in),depend(n),dimension(n) :: y,z,DT
-cf2py real(kind=8) intent(in) :: D,CT,TI
-cf2py real(kind=8) optional,intent(in) :: a1=0.435449861
-cf2py real(kind=8) optional,intent(in) :: a2=0.797853685
-cf2py real(kind=8) optional,intent(in) :: a3=-0.124807893
-cf2py real(kind=8) optional,intent(in) :: a4=0.136821858
-cf2py real(kind=8) optional,intent(in) :: b1=15.6298
-cf2py real(kind=8) optional,intent(in) :: b2=1.0
-cf2py integer optional intent(in) :: Ng = 4
-cf2py real(kind=8) intent(out),depend(n),dimension(n) :: dUeq
+      integer :: Ng
+      real(kind=8) :: root(Ng),weight(Ng)
+cf2py integer intent(in) :: Ng
+cf2py real(kind=8) intent(out),depend(Ng),dimension(Ng) :: root,weight
       ! internal variables
       real(kind=8), parameter :: pi=3.1415926535897932384626433832795d0
-      integer :: i,j,k
-      real(kind=8) :: tm1,tm2,tm3,tm4
-      real(kind=8), dimension(Ng) :: root,weight,r_pr,th_pr
-      real(kind=8), dimension(1) :: x_e,r_e,dU
-      real(kind=8), dimension(n) :: RT,r_R,th_R
+      integer :: i,j,it
+      real(kind=8) :: p1,p2,p3,dp,xr
 
-      RT = DT/2.0d0
-      ! Gauss-Legendre quadrature points and weights
       select case (ng)
        case ( 4 )
           root(1) = -0.3399810435848563d0
@@ -292,8 +369,138 @@ cf2py real(kind=8) intent(out),depend(n),dimension(n) :: dUeq
           weight(6) = 0.313706645877888d0
           weight(7) = 0.222381034453375d0
           weight(8) = 0.101228536290374d0
+       case default
+          do i=1,Ng
+            xr = cos(pi*(i-0.25d0)/(Ng+0.5d0))
+            do it=1,100
+              ! Legendre polynomial P_Ng(xr) and its derivative
+              p1 = 1.0d0
+              p2 = 0.0d0
+              do j=1,Ng
+                p3 = p2
+                p2 = p1
+                p1 = ((2.0d0*j-1.0d0)*xr*p2-(j-1.0d0)*p3)/j
+              end do
+              dp = Ng*(xr*p1-p2)/(xr*xr-1.0d0)
+              xr = xr-p1/dp
+              if (abs(p1/dp) < 1.0d-15) exit
+            end do
+            root(i) = xr
+            weight(i) = 2.0d0/((1.0d0-xr*xr)*dp*dp)
+          end do
       end select
 
+      end subroutine gl_rule
+
+c ----------------------------------------------------------------------
+c get_dUeq(x,y,z,DT,D,CT,TI)
+c ----------------------------------------------------------------------
+c Computes the rotor averaged (equivalent) wake velocity deficit at
+c different turbine locations and diameters
+c
+c Inputs
+c ----------
+c x (array): Distance between turbines in the stream-wise direction
+c y (array): Distance between turbines in the cross-flow direction
+c z (array): Distance between turbines in the vertical direction
+c DT (array): Wake operating turbines diameter
+c D (float): Wake generating turbine diameter
+c TI (float): Ambient turbulence intensity [-]
+c CT (float): Outputs WindTurbine object's thrust coefficient
+c Ng (int): Polynomial order for Gauss-Legendre quadrature integration
+c           in both radial and angular positions
+c
+c Outputs
+c ----------
+c dUeq (float): Wake velocity deficit at a location normalized by
+c               inflow velocity
+      subroutine get_dUeq(n,x,y,z,DT,D,CT,TI,a1,a2,a3,a4,b1,b2,Ng,dUeq)
+
+      implicit none
+      integer :: n,Ng
+      real(kind=8) :: x(n),y(n),z(n),DT(n),D,CT,TI
+      real(kind=8) :: a1,a2,a3,a4,b1,b2,dUeq(n)
+cf2py integer intent(hide),depend(x) :: n = len(x)
+cf2py real(kind=8) intent(in),dimension(n) :: x
+cf2py real(kind=8) intent(in),depend(n),dimension(n) :: y,z,DT
+cf2py real(kind=8) intent(in) :: D,CT,TI
+cf2py real(kind=8) optional,intent(in) :: a1=0.435449861
+cf2py real(kind=8) optional,intent(in) :: a2=0.797853685
+cf2py real(kind=8) optional,intent(in) :: a3=-0.124807893
+cf2py real(kind=8) optional,intent(in) :: a4=0.136821858
+cf2py real(kind=8) optional,intent(in) :: b1=15.6298
+cf2py real(kind=8) optional,intent(in) :: b2=1.0
+cf2py integer optional intent(in) :: Ng = 4
+cf2py real(kind=8) intent(out),depend(n),dimension(n) :: dUeq
+      ! internal variables
+      real(kind=8), dimension(Ng) :: root,weight
+
+      ! Gauss-Legendre quadrature points and weights
+      call gl_rule(Ng,root,weight)
+      call get_dUeq_q(n,x,y,z,DT,D,CT,TI,a1,a2,a3,a4,b1,b2,Ng,root,
+     &weight,dUeq)
+
+      end subroutine get_dUeq
+
+c ----------------------------------------------------------------------
+c get_dUeq_q(x,y,z,DT,D,CT,TI)
+c ----------------------------------------------------------------------
+c Same as get_dUeq, with the Gauss-Legendre quadrature rule as input
+c (see gl_rule), so that it is computed once per flow case
+c
+c Inputs
+c ----------
+c x (array): Distance between turbines in the stream-wise direction
+c y (array): Distance between turbines in the cross-flow direction
+c z (array): Distance between turbines in the vertical direction
+c DT (array): Wake operating turbines diameter
+c D (float): Wake generating turbine diameter
+c TI (float): Ambient turbulence intensity [-]
+c CT (float): Outputs WindTurbine object's thrust coefficient
+c Ng (int): Polynomial order for Gauss-Legendre quadrature integration
+c           in both radial and angular positions
+c root (array): Gauss-Legendre quadrature points
+c weight (array): Gauss-Legendre quadrature weights
+c
+c Outputs
+c ----------
+c dUeq (float): Wake velocity deficit at a location normalized by
+c               inflow velocity
+      subroutine get_dUeq_q(n,x,y,z,DT,D,CT,TI,a1,a2,a3,a4,b1,b2,Ng,
+     &root,weight,dUeq)
+
+      implicit none
+      integer :: n,Ng
+      real(kind=8) :: x(n),y(n),z(n),DT(n),D,CT,TI
+      real(kind=8) :: a1,a2,a3,a4,b1,b2,dUeq(n),root(Ng),weight(Ng)
+cf2py integer intent(hide),depend(x) :: n = len(x)
+cf2py real(kind=8) intent(in),dimension(n) :: x
+cf2py real(kind=8) intent(in),depend(n),dimension(n) :: y,z,DT
+cf2py real(kind=8) intent(in) :: D,CT,TI
+cf2py real(kind=8) optional,intent(in) :: a1=0.435449861
+cf2py real(kind=8) optional,intent(in) :: a2=0.797853685
+cf2py real(kind=8) optional,intent(in) :: a3=-0.124807893
+cf2py real(kind=8) optional,intent(in) :: a4=0.136821858
+cf2py real(kind=8) optional,intent(in) :: b1=15.6298
+cf2py real(kind=8) optional,intent(in) :: b2=1.0
+cf2py integer intent(hide),depend(root) :: Ng = len(root)
+cf2py real(kind=8) intent(in),dimension(Ng) :: root
+cf2py real(kind=8) intent(in),depend(Ng),dimension(Ng) :: weight
+cf2py real(kind=8) intent(out),depend(n),dimension(n) :: dUeq
+      ! internal variables
+      real(kind=8), parameter :: pi=3.1415926535897932384626433832795d0
+      integer :: i,j,k
+      real(kind=8) :: tm1,tm2,tm3,tm4
+      real(kind=8), dimension(Ng) :: r_pr,th_pr
+      real(kind=8) :: xT_st,c1
+      real(kind=8), dimension(1) :: x_e,r_e,RW_e,dU
+      real(kind=8), dimension(n) :: RT,r_R,th_R,RW
+
+      RT = DT/2.0d0
+      ! Wake shape coefficients and wake radius at the turbines
+      call get_wake_c(D,CT,TI,a1,a2,a3,a4,b1,b2,xT_st,c1)
+      call get_RW_c(n,x,D,CT,xT_st,c1,RW)
+
       ! Location of the turbines in wake coordinates
       r_R  = (y**(2.0d0) + z**(2.0d0))**(0.5d0)
       th_R = modulo(atan2(z,y),2.0d0*pi)
@@ -310,11 +517,12 @@ cf2py real(kind=8) intent(out),depend(n),dimension(n) :: dUeq
           do j = 1, Ng
             do k = 1, Ng
               x_e = x(i)
+              RW_e = RW(i)
               tm1 = (r_R(i))**(2.0d0)
               tm2 = (r_pr(k))**(2.0d0)
               tm3 = 2d0*r_R(i)*r_pr(k)*cos(th_R(i) - th_pr(j))
               r_e = sqrt( tm1+tm2+tm3)
-              call get_dU(1,x_e,r_e,D,CT,TI,a1,a2,a3,a4,b1,b2,dU)
+              call get_dU_c(1,x_e,r_e,RW_e,D,CT,xT_st,c1,dU)
               tm4 = weight(j)*weight(k)*dU(1)*(root(k)+1d0)/4d0
               dUeq(i)=dUeq(i)+tm4
             end do
@@ -322,7 +530,7 @@ cf2py real(kind=8) intent(out),depend(n),dimension(n) :: dUeq
         end if
       end do
 
-      end subroutine get_dUeq
+      end subroutine get_dUeq_q
 
 
 c ----------------------------------------------------------------------
@@ -385,41 +593,247 @@ cf2py real(kind=8) optional,intent(in) :: rho=1.225
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CI=4.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CO=25.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: CT_idle=0.053
+cf2py real(kind=8) optional,intent(in,out),depend(n),
+cf2py&  dimension(n) :: P,T,U
+      ! internal variables
+      real(kind=8), dimension(Ng) :: root,weight
+      integer :: idT(n),ptr_c(n+1)
+      integer, allocatable :: idx_c(:)
+      real(kind=8), allocatable :: x_l(:,:),y_l(:,:)
+
+      allocate(x_l(n,n),y_l(n,n),idx_c(0))
+      ! Rotates the global coordinates to local flow coordinates,
+      ! with the turbines ordered from the most upstream one
+      call flow_geometry(n,x_g,y_g,WD,x_l,y_l,idT)
+      ! Turbines in the wake of each turbine, idx_c being enlarged
+      ! to their number
+      do
+        call wake_pairs(n,nCT,1,1,(/1/),x_l,y_l,DT,CT_c,CT_idle,(/TI/),
+     &    (/a1/),(/a2/),(/a3/),(/a4/),(/b1/),(/b2/),size(idx_c),ptr_c,
+     &    idx_c)
+        if (ptr_c(n+1) <= size(idx_c)) exit
+        deallocate(idx_c)
+        allocate(idx_c(ptr_c(n+1)))
+      end do
+      ! Gauss-Legendre quadrature points and weights
+      call gl_rule(Ng,root,weight)
+      call gcl_s_loc(n,nP,nCT,x_l,y_l,z_g,idT,ptr_c,size(idx_c),idx_c,
+     &DT,P_c,CT_c,WS,TI,a1,a2,a3,a4,b1,b2,Ng,root,weight,rho,WS_CI,
+     &WS_CO,CT_idle,P,T,U)
+      deallocate(x_l,y_l,idx_c)
+
+      end subroutine gcl_s
+
+c ----------------------------------------------------------------------
+c gcl_s_loc(x_l,y_l,z_g,idT,ptr,idx,DT,P_c,CT_c,WS,TI)
+c ----------------------------------------------------------------------
+c SINGLE FLOW CASE IN LOCAL FLOW COORDINATES
+c Same as gcl_s, with the flow coordinates, the order of the turbines
+c (see flow_geometry) and their wake candidates (see wake_pairs) given,
+c so that they are shared by the flow cases with the same wind
+c direction. The wake of each turbine is only evaluated at its wake
+c candidates.
+c
+c Inputs
+c ----------
+c x_l (array): Distance between turbines in the stream-wise direction
+c y_l (array): Distance between turbines in the cross-flow direction
+c z_g (array): Distance between turbines in the global coordinates
+c idT (array): Indexes of the turbines from the most upstream one
+c ptr (array): Row pointers of the wake candidates (n+1), 0-based
+c idx (array): Indices of the wake candidates, 0-based
+c
+c Other inputs and outputs as in gcl_s, with the Gauss-Legendre
+c quadrature rule (see gl_rule)
+      subroutine gcl_s_loc(n,nP,nCT,x_l,y_l,z_g,idT,ptr,nnz,idx,DT,P_c,
+     &CT_c,WS,TI,a1,a2,a3,a4,b1,b2,Ng,root,weight,rho,WS_CI,WS_CO,
+     &CT_idle,P,T,U)
+
+      implicit none
+      integer :: n,nP,nCT,Ng,idT(n),ptr(n+1),nnz,idx(nnz)
+      real(kind=8) :: x_l(n,n),y_l(n,n),z_g(n,n),DT(n),P_c(n,nP,2)
+      real(kind=8) :: CT_c(n,nCT,2),WS,TI,a1,a2,a3,a4,b1,b2
+      real(kind=8) :: root(Ng),weight(Ng)
+      real(kind=8) :: rho,WS_CI(n),WS_CO(n),CT_idle(n),P(n),T(n),U(n)
+cf2py integer intent(hide),depend(DT) :: n = len(DT)
+cf2py integer intent(hide),depend(P_c) :: nP = size(P_c,2)
+cf2py integer intent(hide),depend(CT_c) :: nCT = size(CT_c,2)
+cf2py real(kind=8) intent(in),dimension(n) :: DT
+cf2py real(kind=8) intent(in),depend(n),dimension(n,n) :: x_l,y_l,z_g
+cf2py integer intent(in),depend(n),dimension(n) :: idT
+cf2py integer intent(in),depend(n),dimension(n+1) :: ptr
+cf2py integer intent(hide),depend(idx) :: nnz = len(idx)
+cf2py integer intent(in),dimension(nnz) :: idx
+cf2py real(kind=8) intent(in),dimension(n,nP,2) :: P_c
+cf2py real(kind=8) intent(in),dimension(n,nCT,2) :: CT_c
+cf2py real(kind=8) intent(in) :: WS,TI,a1,a2,a3,a4,b1,b2
+cf2py integer intent(hide),depend(root) :: Ng = len(root)
+cf2py real(kind=8) intent(in),dimension(Ng) :: root
+cf2py real(kind=8) intent(in),depend(Ng),dimension(Ng) :: weight
+cf2py real(kind=8) intent(in) :: rho
+cf2py real(kind=8) intent(in),dimension(n) :: WS_CI,WS_CO,CT_idle
 cf2py real(kind=8) intent(out),depend(n),dimension(n) :: P,T,U
       ! internal variables
       real(kind=8), parameter :: pi=3.1415926535897932384626433832795d0
-      integer :: i,j,k,nDownstream(n),idT(n)
-      real(kind=8) :: x(n),y(n),z(n),D,CT,dUeq(n),angle
-      real(kind=8) :: x_l(n,n),y_l(n,n)
+      integer :: i,j,k,l,nc,jc(n)
+      real(kind=8) :: x(n),y(n),z(n),DTc(n),D,CT,dUeq(n),Ui
 
-      ! Rotates the global coordinates to local flow coordinates
-      angle = pi*(270.0d0-WD)/180.0d0
-      do i=1,n
-        do j=1,n
-          x_l(i,j) = cos(angle)*x_g(i,j)+sin(angle)*y_g(i,j)
-          y_l(i,j) = -sin(angle)*x_g(i,j)+cos(angle)*y_g(i,j)
+      ! Initializes the rotor averaged (equivalent) velocity
+      U = WS
+      ! Computes the rotor averaged (equivalent) velocity deficit
+      do j=1,n
+        i=idT(j)
+        nc = ptr(i+1)-ptr(i)
+        if (nc == 0) cycle
+        ! Gathers the wake candidates
+        do l=1,nc
+          k = idx(ptr(i)+l)+1
+          jc(l) = k
+          x(l) = x_l(i,k)
+          y(l) = y_l(i,k)
+          z(l) = z_g(i,k)
+          DTc(l) = DT(k)
+        end do
+        D = DT(i)
+        if ((U(i) >= WS_CI(i)).and.(U(i) <= WS_CO(i))) then
+          call interp_l(CT_c(i,:,1),CT_c(i,:,2),nCT,U(i),CT)
+        else
+          CT = CT_idle(i)
+        end if
+        call get_dUeq_q(nc,x(1:nc),y(1:nc),z(1:nc),DTc(1:nc),D,CT,TI,
+     &                a1,a2,a3,a4,b1,b2,Ng,root,weight,dUeq(1:nc))
+        ! Scatters the deficits to the wake candidates
+        Ui = U(i)
+        do l=1,nc
+          U(jc(l)) = U(jc(l)) + Ui*dUeq(l)
         end do
-        ! counts the number of turbines in front of turbine
-        nDownstream(i) = count(x_l(i,:).lt.0)
       end do
+      ! Calculates the power and thrust
+      do k=1,n
+        if ((U(k) >= WS_CI(k)).and.(U(k) <= WS_CO(k))) then
+          call interp_l(P_c(k,:,1),P_c(k,:,2),nP,U(k),P(k))
+          call interp_l(CT_c(k,:,1),CT_c(k,:,2),nCT,U(k),CT)
+        else
+          P(k)=0.0d0
+          CT = CT_idle(k)
+        end if
+        T(k) = CT*0.5d0*rho*U(k)*U(k)*pi*DT(k)*DT(k)/4.0d0
+      end do
+
+      end subroutine gcl_s_loc
+
+c ----------------------------------------------------------------------
+c gcl_s_sp(x,y,z,DT,P_c,CT_c,WS,WD,TI,ptr,idx)
+c ----------------------------------------------------------------------
+c SINGLE FLOW CASE WITH SPARSE WAKE PAIRS
+c Same as gcl_s, but the wake of each turbine is only evaluated at its
+c wake candidates, given in compressed sparse row format (see
+c WindFarm.wake_candidates). The cost scales with the number of wake
+c candidates instead of n^2.
+c
+c Inputs
+c ----------
+c x_t (array): Turbines position in the global coordinates
+c y_t (array): Turbines position in the global coordinates
+c z_t (array): Turbines hub height
+c DT (array): Turbines diameter
+c P_c (array): Power curves
+c CT_c (array): Thrust coefficient curves
+c WS (float): Undisturbed rotor averaged (equivalent) wind speed at hub
+c             height [m/s]
+c WD (float): Undisturbed wind direction at hub height [deg.]
+c             Meteorological coordinates (N=0,E=90,S=180,W=270)
+c TI (float): Ambient turbulence intensity [-]
+c ptr (array): Row pointers of the wake candidates (n+1), 0-based
+c idx (array): Indices of the wake candidates, 0-based. The candidates
+c              of the turbine i are idx(ptr(i)+1:ptr(i+1))
+c
+c rho (float): Air density at which the power curve is valid [kg/m^3]
+c WS_CI (array): Cut in wind speed [m/s] for each turbine
+c WS_CO (array): Cut out wind speed [m/s] for each turbine
+c CT_idle (array): Thrust coefficient at rest [-] for each turbine
+c
+c Outputs
+c ----------
+c P (array): Power production of the wind turbines (nWT,1) [W]
+c T (array): Thrust force of the wind turbines (nWT,1) [N]
+c U (array): Rotor averaged (equivalent) Wind speed at hub height
+c            (nWT,1) [m/s]
+      subroutine gcl_s_sp(n,nP,nCT,nnz,x_t,y_t,z_t,DT,P_c,CT_c,WS,WD,
+     &TI,ptr,idx,a1,a2,a3,a4,b1,b2,Ng,rho,WS_CI,WS_CO,CT_idle,P,T,U)
+
+      implicit none
+      integer :: n,nP,nCT,nnz,Ng,ptr(n+1),idx(nnz)
+      real(kind=8) :: x_t(n),y_t(n),z_t(n),DT(n),P_c(n,nP,2)
+      real(kind=8) :: CT_c(n,nCT,2),WS,WD,TI,a1,a2,a3,a4,b1,b2
+      real(kind=8) :: rho,WS_CI(n),WS_CO(n),CT_idle(n),P(n),T(n),U(n)
+cf2py integer intent(hide),depend(DT) :: n = len(DT)
+cf2py integer intent(hide),depend(P_c) :: nP = size(P_c,2)
+cf2py integer intent(hide),depend(CT_c) :: nCT = size(CT_c,2)
+cf2py integer intent(hide),depend(idx) :: nnz = len(idx)
+cf2py real(kind=8) intent(in),dimension(n) :: DT
+cf2py real(kind=8) intent(in),depend(n),dimension(n) :: x_t,y_t,z_t
+cf2py real(kind=8) intent(in),dimension(n,nP,2) :: P_c
+cf2py real(kind=8) intent(in),dimension(n,nCT,2) :: CT_c
+cf2py real(kind=8) intent(in) :: WS,WD,TI
+cf2py integer intent(in),depend(n),dimension(n+1) :: ptr
+cf2py integer intent(in),dimension(nnz) :: idx
+cf2py real(kind=8) optional,intent(in) :: a1=0.435449861
+cf2py real(kind=8) optional,intent(in) :: a2=0.797853685
+cf2py real(kind=8) optional,intent(in) :: a3=-0.124807893
+cf2py real(kind=8) optional,intent(in) :: a4=0.136821858
+cf2py real(kind=8) optional,intent(in) :: b1=15.6298
+cf2py real(kind=8) optional,intent(in) :: b2=1.0
+cf2py integer optional intent(in) :: Ng = 4
+cf2py real(kind=8) optional,intent(in) :: rho=1.225
+cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CI=4.0
+cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CO=25.0
+cf2py real(kind=8) optional,intent(in),dimension(n) :: CT_idle=0.053
+cf2py real(kind=8) optional,intent(in,out),depend(n),
+cf2py&  dimension(n) :: P,T,U
+      ! internal variables
+      real(kind=8), dimension(Ng) :: root,weight
+      real(kind=8), parameter :: pi=3.1415926535897932384626433832795d0
+      integer :: i,j,k,l,nc,idT(n),jc(n)
+      real(kind=8) :: x(n),y(n),z(n),DTc(n),x_f(n),D,CT,dUeq(n)
+      real(kind=8) :: angle,Ui
+
+      ! Position of the turbines along the flow
+      angle = pi*(270.0d0-WD)/180.0d0
+      x_f = cos(angle)*x_t+sin(angle)*y_t
       ! Indexes of ordered turbines from most upstream turbine
-      call order_id(n,nDownstream,idT)
+      call order_r(n,x_f,idT)
+      ! Gauss-Legendre quadrature points and weights
+      call gl_rule(Ng,root,weight)
       ! Initializes the rotor averaged (equivalent) velocity
       U = WS
       ! Computes the rotor averaged (equivalent) velocity deficit
       do j=1,n
         i=idT(j)
-        x = x_l(i,:)
-        y = y_l(i,:)
-        z = z_g(i,:)
+        nc = ptr(i+1)-ptr(i)
+        if (nc == 0) cycle
+        ! Gathers the wake candidates in local flow coordinates
+        do l=1,nc
+          k = idx(ptr(i)+l)+1
+          jc(l) = k
+          x(l) = cos(angle)*(x_t(k)-x_t(i))+sin(angle)*(y_t(k)-y_t(i))
+          y(l) = -sin(angle)*(x_t(k)-x_t(i))+cos(angle)*(y_t(k)-y_t(i))
+          z(l) = z_t(k)-z_t(i)
+          DTc(l) = DT(k)
+        end do
         D = DT(i)
         if ((U(i) >= WS_CI(i)).and.(U(i) <= WS_CO(i))) then
           call interp_l(CT_c(i,:,1),CT_c(i,:,2),nCT,U(i),CT)
         else
           CT = CT_idle(i)
         end if
-        call get_dUeq(n,x,y,z,DT,D,CT,TI,a1,a2,a3,a4,b1,b2,Ng,dUeq)
-        U = U + U(i)*dUeq
+        call get_dUeq_q(nc,x(1:nc),y(1:nc),z(1:nc),DTc(1:nc),D,CT,TI,
+     &                a1,a2,a3,a4,b1,b2,Ng,root,weight,dUeq(1:nc))
+        ! Scatters the deficits to the wake candidates
+        Ui = U(i)
+        do l=1,nc
+          U(jc(l)) = U(jc(l)) + Ui*dUeq(l)
+        end do
       end do
       ! Calculates the power and thrust
       do k=1,n
@@ -433,7 +847,7 @@ cf2py real(kind=8) intent(out),depend(n),dimension(n) :: P,T,U
         T(k) = CT*0.5d0*rho*U(k)*U(k)*pi*DT(k)*DT(k)/4.0d0
       end do
 
-      end subroutine gcl_s
+      end subroutine gcl_s_sp
 
 c ----------------------------------------------------------------------
 c gcl(x,y,z,DT,P_c,CT_c,WS,WD,TI)
@@ -461,6 +875,7 @@ c rho (float): Air density at which the power curve is valid [kg/m^3]
 c WS_CI (array): Cut in wind speed [m/s] for each turbine
 c WS_CO (array): Cut out wind speed [m/s] for each turbine
 c CT_idle (array): Thrust coefficient at rest [-] for each turbine
+c n_threads (int): Number of threads solving the flow cases
 c
 c Outputs
 c ----------
@@ -469,14 +884,15 @@ c T (array): Thrust force of the wind turbines (nWT,1) [N]
 c U (array): Rotor averaged (equivalent) Wind speed at hub height
 c            (nWT,1) [m/s]
       subroutine gcl(n,nP,nCT,nF,x_g,y_g,z_g,DT,P_c,CT_c,WS,WD,TI,a1,a2,
-     &a3,a4,b1,b2,Ng,rho,WS_CI,WS_CO,CT_idle,P,T,U)
+     &a3,a4,b1,b2,Ng,rho,WS_CI,WS_CO,CT_idle,P,T,U,n_threads)
 
       implicit none
-      integer :: n,nP,nCT,nF,Ng
+      integer :: n,nP,nCT,nF,Ng,n_threads
       real(kind=8) :: x_g(n,n),y_g(n,n),z_g(n,n),DT(n),P_c(n,nP,2)
       real(kind=8) :: CT_c(n,nCT,2),rho,WS_CI(n),WS_CO(n),CT_idle(n)
       real(kind=8),dimension(nF) :: WS,WD,TI,a1,a2,a3,a4,b1,b2
       real(kind=8) :: P(nF,n),T(nF,n),U(nF,n)
+cf2py threadsafe
 cf2py integer intent(hide),depend(DT) :: n = len(DT)
 cf2py integer intent(hide),depend(P_c) :: nP = size(P_c,2)
 cf2py integer intent(hide),depend(CT_c) :: nCT = size(CT_c,2)
@@ -497,15 +913,51 @@ cf2py real(kind=8) optional,intent(in) :: rho=1.225
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CI=4.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CO=25.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: CT_idle=0.053
-cf2py real(kind=8) intent(out),depend(n),dimension(nF,n) :: P,T,U
+cf2py real(kind=8) optional,intent(in,out),depend(n),
+cf2py&  dimension(nF,n) :: P,T,U
+cf2py integer optional,intent(in) :: n_threads = 1
       ! internal variables
-      integer :: i
+      integer :: i,k,l,nB,idF(nF),ptr(nF+1),idT(n)
+      integer :: ptr_c(n+1)
+      integer, allocatable :: idx_c(:)
+      real(kind=8) :: root(Ng),weight(Ng)
+      real(kind=8), allocatable :: x_l(:,:),y_l(:,:)
 
-      do i=1,nF
-        call gcl_s(n,nP,nCT,x_g,y_g,z_g,DT,P_c,CT_c,WS(i),WD(i),TI(i),
-     &       a1(i),a2(i),a3(i),a4(i),b1(i),b2(i),Ng,rho,WS_CI,WS_CO,
-     &       CT_idle,P(i,:),T(i,:),U(i,:))
+      ! Gauss-Legendre quadrature points and weights
+      call gl_rule(Ng,root,weight)
+      ! Flow cases grouped by wind direction, in 4 blocks per thread at
+      ! least to share the load
+      call group_wd(nF,WD,(nF-1)/(4*max(1,n_threads))+1,idF,ptr,nB)
+      ! The work arrays of the threads are allocated on the heap,
+      ! as the private copies of automatic arrays are on their stack
+!$omp parallel num_threads(n_threads)
+!$omp& private(i,k,x_l,y_l,idT,ptr_c,idx_c)
+      allocate(x_l(n,n),y_l(n,n),idx_c(0))
+!$omp do schedule(dynamic)
+      do l=1,nB
+        ! Flow coordinates and wake candidates shared by the flow cases
+        ! of the block
+        call flow_geometry(n,x_g,y_g,WD(idF(ptr(l)+1)),x_l,y_l,idT)
+        ! Wake candidates, idx_c being enlarged to their number
+        do
+          call wake_pairs(n,nCT,nF,ptr(l+1)-ptr(l),
+     &      idF(ptr(l)+1:ptr(l+1)),x_l,y_l,DT,CT_c,CT_idle,TI,a1,a2,a3,
+     &      a4,b1,b2,size(idx_c),ptr_c,idx_c)
+          if (ptr_c(n+1) <= size(idx_c)) exit
+          deallocate(idx_c)
+          allocate(idx_c(ptr_c(n+1)))
+        end do
+        do k=ptr(l)+1,ptr(l+1)
+          i=idF(k)
+          call gcl_s_loc(n,nP,nCT,x_l,y_l,z_g,idT,ptr_c,size(idx_c),
+     &         idx_c,DT,P_c,CT_c,WS(i),TI(i),a1(i),a2(i),a3(i),a4(i),
+     &         b1(i),b2(i),Ng,root,weight,rho,WS_CI,WS_CO,CT_idle,
+     &         P(i,:),T(i,:),U(i,:))
+        end do
       end do
+!$omp end do
+      deallocate(x_l,y_l,idx_c)
+!$omp end parallel
 
       end subroutine gcl
 
@@ -536,6 +988,7 @@ c rho (float): Air density at which the power curve is valid [kg/m^3]
 c WS_CI (array): Cut in wind speed [m/s] for each turbine
 c WS_CO (array): Cut out wind speed [m/s] for each turbine
 c CT_idle (array): Thrust coefficient at rest [-] for each turbine
+c n_threads (int): Number of threads solving the flow cases
 c
 c Outputs
 c ----------
@@ -544,14 +997,15 @@ c T (array): Thrust force of the wind turbines (nWT,1) [N]
 c U (array): Rotor averaged (equivalent) Wind speed at hub height
 c            (nWT,1) [m/s]
       subroutine gcl_av(n,nP,nCT,nF,x_g,y_g,z_g,DT,P_c,CT_c,WS,WD,TI,AV,
-     &a1,a2,a3,a4,b1,b2,Ng,rho,WS_CI,WS_CO,CT_idle,P,T,U)
+     &a1,a2,a3,a4,b1,b2,Ng,rho,WS_CI,WS_CO,CT_idle,P,T,U,n_threads)
 
       implicit none
-      integer :: n,nP,nCT,nF,Ng,AV(nf,n)
+      integer :: n,nP,nCT,nF,Ng,n_threads,AV(nf,n)
       real(kind=8) :: x_g(n,n),y_g(n,n),z_g(n,n),DT(n),P_c(n,nP,2)
       real(kind=8) :: CT_c(n,nCT,2),rho,WS_CI(n),WS_CO(n),CT_idle(n)
       real(kind=8),dimension(nF) :: WS,WD,TI,a1,a2,a3,a4,b1,b2
       real(kind=8) :: P(nF,n),T(nF,n),U(nF,n)
+cf2py threadsafe
 cf2py integer intent(hide),depend(DT) :: n = len(DT)
 cf2py integer intent(hide),depend(P_c) :: nP = size(P_c,2)
 cf2py integer intent(hide),depend(CT_c) :: nCT = size(CT_c,2)
@@ -573,25 +1027,62 @@ cf2py real(kind=8) optional,intent(in) :: rho=1.225
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CI=4.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CO=25.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: CT_idle=0.053
-cf2py real(kind=8) intent(out),depend(n),dimension(nF,n) :: P,T,U
+cf2py real(kind=8) optional,intent(in,out),depend(n),
+cf2py&  dimension(nF,n) :: P,T,U
+cf2py integer optional,intent(in) :: n_threads = 1
       ! internal variables
-      integer :: i,j
-      real(kind=8) :: CT_c_AV(n,nCT,2), P_c_AV(n,nCT,2)
+      integer :: i,j,k,l,nB,idF(nF),ptr(nF+1),idT(n)
+      integer :: ptr_c(n+1)
+      integer, allocatable :: idx_c(:)
+      real(kind=8), allocatable :: CT_c_AV(:,:,:),P_c_AV(:,:,:)
+      real(kind=8) :: root(Ng),weight(Ng)
+      real(kind=8), allocatable :: x_l(:,:),y_l(:,:)
 
-      do i=1,nF
-        CT_c_AV = CT_c
-        P_c_AV  = P_c
-        ! Re-defines the trust curve for non available turbines
-        do j=1,n
-          if (AV(i,j)==0) then
-            CT_c_AV(j,:,2) = CT_idle(j)
-            P_c_AV(j,:,2) = 0.0d0
-          end if
+      ! Gauss-Legendre quadrature points and weights
+      call gl_rule(Ng,root,weight)
+      ! Flow cases grouped by wind direction, in 4 blocks per thread at
+      ! least to share the load
+      call group_wd(nF,WD,(nF-1)/(4*max(1,n_threads))+1,idF,ptr,nB)
+      ! The work arrays of the threads are allocated on the heap,
+      ! as the private copies of automatic arrays are on their stack
+!$omp parallel num_threads(n_threads)
+!$omp& private(i,j,k,CT_c_AV,P_c_AV,x_l,y_l,idT,ptr_c,idx_c)
+      allocate(x_l(n,n),y_l(n,n),idx_c(0))
+      allocate(CT_c_AV(n,nCT,2),P_c_AV(n,nP,2))
+!$omp do schedule(dynamic)
+      do l=1,nB
+        ! Flow coordinates and wake candidates shared by the flow cases
+        ! of the block, the turbines at rest having smaller wakes
+        call flow_geometry(n,x_g,y_g,WD(idF(ptr(l)+1)),x_l,y_l,idT)
+        ! Wake candidates, idx_c being enlarged to their number
+        do
+          call wake_pairs(n,nCT,nF,ptr(l+1)-ptr(l),
+     &      idF(ptr(l)+1:ptr(l+1)),x_l,y_l,DT,CT_c,CT_idle,TI,a1,a2,a3,
+     &      a4,b1,b2,size(idx_c),ptr_c,idx_c)
+          if (ptr_c(n+1) <= size(idx_c)) exit
+          deallocate(idx_c)
+          allocate(idx_c(ptr_c(n+1)))
+        end do
+        do k=ptr(l)+1,ptr(l+1)
+          i=idF(k)
+          CT_c_AV = CT_c
+          P_c_AV  = P_c
+          ! Re-defines the trust curve for non available turbines
+          do j=1,n
+            if (AV(i,j)==0) then
+              CT_c_AV(j,:,2) = CT_idle(j)
+              P_c_AV(j,:,2) = 0.0d0
+            end if
+          end do
+          call gcl_s_loc(n,nP,nCT,x_l,y_l,z_g,idT,ptr_c,size(idx_c),
+     &         idx_c,DT,P_c_AV,CT_c_AV,WS(i),TI(i),a1(i),a2(i),a3(i),
+     &         a4(i),b1(i),b2(i),Ng,root,weight,rho,WS_CI,WS_CO,CT_idle,
+     &         P(i,:),T(i,:),U(i,:))
         end do
-        call gcl_s(n,nP,nCT,x_g,y_g,z_g,DT,P_c_AV,CT_c_AV,WS(i),WD(i),
-     &       TI(i),a1(i),a2(i),a3(i),a4(i),b1(i),b2(i),Ng,rho,WS_CI,
-     &       WS_CO,CT_idle,P(i,:),T(i,:),U(i,:))
       end do
+!$omp end do
+      deallocate(x_l,y_l,idx_c,CT_c_AV,P_c_AV)
+!$omp end parallel
 
       end subroutine gcl_av
 
@@ -623,6 +1114,7 @@ c rho (float): Air density at which the power curve is valid [kg/m^3]
 c WS_CI (array): Cut in wind speed [m/s] for each turbine
 c WS_CO (array): Cut out wind speed [m/s] for each turbine
 c CT_idle (array): Thrust coefficient at rest [-] for each turbine
+c n_threads (int): Number of threads solving the flow cases
 c
 c Outputs
 c ----------
@@ -631,14 +1123,16 @@ c T (array): Thrust force of the wind turbines (nWT,1) [N]
 c U (array): Rotor averaged (equivalent) Wind speed at hub height
 c            (nWT,1) [m/s]
       subroutine gcl_GA(n,nP,nCT,nF,x_g,y_g,z_g,DT,P_c,CT_c,WS,WD,
-     &TI,STD_WD,Nga,a1,a2,a3,a4,b1,b2,Ng,rho,WS_CI,WS_CO,CT_idle,P,T,U)
+     &TI,STD_WD,Nga,a1,a2,a3,a4,b1,b2,Ng,rho,WS_CI,WS_CO,CT_idle,P,T,U,
+     &n_threads)
 
       implicit none
-      integer :: n,nP,nCT,nF,Ng,Nga
+      integer :: n,nP,nCT,nF,Ng,Nga,n_threads
       real(kind=8) :: x_g(n,n),y_g(n,n),z_g(n,n),DT(n),P_c(n,nP,2)
       real(kind=8) :: CT_c(n,nCT,2),rho,WS_CI(n),WS_CO(n),CT_idle(n)
       real(kind=8),dimension(nF) :: WS,WD,TI,STD_WD,a1,a2,a3,a4,b1,b2
       real(kind=8) :: P(nF,n),T(nF,n),U(nF,n)
+cf2py threadsafe
 cf2py integer intent(hide),depend(DT) :: n = len(DT)
 cf2py integer intent(hide),depend(P_c) :: nP = size(P_c,2)
 cf2py integer intent(hide),depend(CT_c) :: nCT = size(CT_c,2)
@@ -661,6 +1155,7 @@ cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CI=4.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CO=25.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: CT_idle=0.053
 cf2py real(kind=8) intent(out),depend(n),dimension(nF,n) :: P,T,U
+cf2py integer optional,intent(in) :: n_threads = 1
       ! internal variables
       real(kind=8), parameter :: pi=3.1415926535897932384626433832795d0
       integer :: i,j
@@ -745,6 +1240,8 @@ cf2py real(kind=8) intent(out),depend(n),dimension(nF,n) :: P,T,U
           weight(8) = 0.000199604072211d0
       end select
 
+!$omp parallel do num_threads(n_threads)
+!$omp& private(j,WD_aux,P_aux,T_aux,U_aux)
       do i=1,nF
         P(i,:)=0.0d0
         T(i,:)=0.0d0
@@ -759,6 +1256,7 @@ cf2py real(kind=8) intent(out),depend(n),dimension(nF,n) :: P,T,U
           U(i,:)=U(i,:)+weight(j)*U_aux*(1.0d0/sqrt(pi))
         end do
       end do
+!$omp end parallel do
 
       end subroutine gcl_GA
 
@@ -766,7 +1264,9 @@ c ----------------------------------------------------------------------
 c gcl_mult_wd(x,y,z,DT,P_c,CT_c,WS,WD,TI)
 c ----------------------------------------------------------------------
 c MULTIPLE FLOW CASES with individual wind direction for each turbine
-c and optional individual Gaussian averaging
+c and optional individual Gaussian averaging. The wind farm is solved
+c once per distinct wind direction of a flow case, for all the turbines
+c sharing it
 c
 c Inputs
 c ----------
@@ -786,6 +1286,7 @@ c rho (float): Air density at which the power curve is valid [kg/m^3]
 c WS_CI (array): Cut in wind speed [m/s] for each turbine
 c WS_CO (array): Cut out wind speed [m/s] for each turbine
 c CT_idle (array): Thrust coefficient at rest [-] for each turbine
+c n_threads (int): Number of threads solving the flow cases
 c
 c Outputs
 c ----------
@@ -794,15 +1295,17 @@ c T (array): Thrust force of the wind turbines (nWT,1) [N]
 c U (array): Rotor averaged (equivalent) Wind speed at hub height
 c            (nWT,1) [m/s]
       subroutine gcl_mult_wd(n,nP,nCT,nF,x_g,y_g,z_g,DT,P_c,CT_c,WS,WD,
-     &TI,STD_WD,Nga,a1,a2,a3,a4,b1,b2,Ng,rho,WS_CI,WS_CO,CT_idle,P,T,U)
+     &TI,STD_WD,Nga,a1,a2,a3,a4,b1,b2,Ng,rho,WS_CI,WS_CO,CT_idle,P,T,U,
+     &n_threads)
 
       implicit none
-      integer :: n,nP,nCT,nF,Ng,Nga
+      integer :: n,nP,nCT,nF,Ng,Nga,n_threads
       real(kind=8) :: x_g(n,n),y_g(n,n),z_g(n,n),DT(n),P_c(n,nP,2)
       real(kind=8) :: CT_c(n,nCT,2),rho,WS_CI(n),WS_CO(n),CT_idle(n)
       real(kind=8),dimension(nF) :: WS,TI,a1,a2,a3,a4,b1,b2
       real(kind=8),dimension(nF,n) :: WD,STD_WD
       real(kind=8) :: P(nF,n),T(nF,n),U(nF,n)
+cf2py threadsafe
 cf2py integer intent(hide),depend(DT) :: n = len(DT)
 cf2py integer intent(hide),depend(P_c) :: nP = size(P_c,2)
 cf2py integer intent(hide),depend(CT_c) :: nCT = size(CT_c,2)
@@ -826,24 +1329,37 @@ cf2py real(kind=8) optional,intent(in) :: rho=1.225
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CI=4.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CO=25.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: CT_idle=0.053
-cf2py real(kind=8) intent(out),depend(n),dimension(nF,n) :: P,T,U
+cf2py real(kind=8) optional,intent(in,out),depend(n),
+cf2py&  dimension(nF,n) :: P,T,U
+cf2py integer optional,intent(in) :: n_threads = 1
       ! internal variables
-      integer :: i,j
+      integer :: i,j,l
+      logical :: done(n)
       real(kind=8), dimension(n) :: P_aux,T_aux,U_aux
 
-      do j=1,n
-        do i=1,nF
+!$omp parallel do num_threads(n_threads) schedule(dynamic)
+!$omp& private(j,l,done,P_aux,T_aux,U_aux)
+      do i=1,nF
+        done = .false.
+        do j=1,n
+          if (done(j)) cycle
+          ! Solves the wind farm once per distinct wind direction
           call gcl_GA(n,nP,nCT,1,x_g,y_g,z_g,DT,P_c,CT_c,WS(i),WD(i,j),
      &TI(i),STD_WD(i,j),Nga,a1(i),a2(i),a3(i),a4(i),b1(i),b2(i),Ng,rho,
-     &WS_CI,WS_CO,CT_idle,P_aux,T_aux,U_aux)
-!          call gcl_s(n,nP,nCT,x_g,y_g,z_g,DT,P_c,CT_c,WS(i),WD(i,j),
-!     &     TI(i),a1(i),a2(i),a3(i),a4(i),b1(i),b2(i),Ng,rho,WS_CI,WS_CO,
-!     &     CT_idle,P_aux,T_aux,U_aux)
-          P(i,j)=P_aux(j)
-          T(i,j)=T_aux(j)
-          U(i,j)=U_aux(j)
+     &WS_CI,WS_CO,CT_idle,P_aux,T_aux,U_aux,1)
+          ! Scatters to the turbines with the same wind direction
+          do l=j,n
+            if (done(l)) cycle
+            if ((WD(i,l)==WD(i,j)).and.(STD_WD(i,l)==STD_WD(i,j))) then
+              P(i,l)=P_aux(l)
+              T(i,l)=T_aux(l)
+              U(i,l)=U_aux(l)
+              done(l) = .true.
+            end if
+          end do
         end do
       end do
+!$omp end parallel do
 
       end subroutine gcl_mult_wd
 
@@ -851,6 +1367,208 @@ c ----------------------------------------------------------------------
 c Additional routines
 c ----------------------------------------------------------------------
 
+c ----------------------------------------------------------------------
+c flow_geometry(x_g,y_g,WD)
+c ----------------------------------------------------------------------
+c Rotates the distances between the turbines to the local flow
+c coordinates of a wind direction, and orders the turbines from the most
+c upstream one. Shared by all the flow cases with the same wind direction.
+c
+c Inputs
+c ----------
+c x_g (array): Distance between turbines in the global coordinates
+c y_g (array): Distance between turbines in the global coordinates
+c WD (float): Undisturbed wind direction at hub height [deg.]
+c             Meteorological coordinates (N=0,E=90,S=180,W=270)
+c
+c Outputs
+c ----------
+c x_l (array): Distance between turbines in the stream-wise direction
+c y_l (array): Distance between turbines in the cross-flow direction
+c idT (array): Indexes of the turbines from the most upstream one
+      subroutine flow_geometry(n,x_g,y_g,WD,x_l,y_l,idT)
+
+      implicit none
+      integer :: n,idT(n)
+      real(kind=8) :: x_g(n,n),y_g(n,n),WD,x_l(n,n),y_l(n,n)
+cf2py integer intent(hide),depend(x_g) :: n = size(x_g,1)
+cf2py real(kind=8) intent(in),dimension(n,n) :: x_g
+cf2py real(kind=8) intent(in),depend(n),dimension(n,n) :: y_g
+cf2py real(kind=8) intent(in) :: WD
+cf2py real(kind=8) intent(out),depend(n),dimension(n,n) :: x_l,y_l
+cf2py integer intent(out),depend(n),dimension(n) :: idT
+      ! internal variables
+      real(kind=8), parameter :: pi=3.1415926535897932384626433832795d0
+      integer :: i,j,nDownstream(n)
+      real(kind=8) :: angle
+
+      ! Rotates the global coordinates to local flow coordinates
+      angle = pi*(270.0d0-WD)/180.0d0
+      do i=1,n
+        do j=1,n
+          x_l(i,j) = cos(angle)*x_g(i,j)+sin(angle)*y_g(i,j)
+          y_l(i,j) = -sin(angle)*x_g(i,j)+cos(angle)*y_g(i,j)
+        end do
+        ! counts the number of turbines in front of turbine
+        nDownstream(i) = count(x_l(i,:).lt.0)
+      end do
+      ! Indexes of ordered turbines from most upstream turbine
+      call order_id(n,nDownstream,idT)
+
+      end subroutine flow_geometry
+
+c ----------------------------------------------------------------------
+c wake_pairs(idF,x_l,y_l,DT,CT_c,CT_idle,TI)
+c ----------------------------------------------------------------------
+c Finds the wake candidates of each turbine in the flow coordinates of a
+c wind direction, in compressed sparse row format (see gcl_s_sp). They
+c are the turbines downstream overlapped by the largest wake the turbine
+c can have: over the thrust coefficients of its curve, at rest and 0.99,
+c and over the flow cases sharing the flow coordinates. The deficit is
+c null outside the wake radius, so that the other turbines are skipped
+c with the same results.
+c
+c Inputs
+c ----------
+c idF (array): Indexes of the flow cases sharing the flow coordinates
+c x_l (array): Distance between turbines in the stream-wise direction
+c y_l (array): Distance between turbines in the cross-flow direction
+c DT (array): Turbines diameter
+c CT_c (array): Thrust coefficient curves
+c CT_idle (array): Thrust coefficient at rest [-] for each turbine
+c TI (array): Ambient turbulence intensity of the flow cases [-]
+c nnz (int): Size of idx
+c
+c Outputs
+c ----------
+c ptr (array): Row pointers of the wake candidates (n+1), 0-based. The
+c              candidates are all counted, ptr(n+1) being their number
+c idx (array): Indices of the wake candidates, 0-based. The candidates
+c              of the turbine i are idx(ptr(i)+1:ptr(i+1)), complete
+c              only when ptr(n+1) <= nnz
+      subroutine wake_pairs(n,nCT,nF,nT,idF,x_l,y_l,DT,CT_c,CT_idle,TI,
+     &a1,a2,a3,a4,b1,b2,nnz,ptr,idx)
+
+      implicit none
+      integer :: n,nCT,nF,nT,idF(nT),nnz,ptr(n+1),idx(nnz)
+      real(kind=8) :: x_l(n,n),y_l(n,n),DT(n),CT_c(n,nCT,2),CT_idle(n)
+      real(kind=8),dimension(nF) :: TI,a1,a2,a3,a4,b1,b2
+cf2py integer intent(hide),depend(DT) :: n = len(DT)
+cf2py integer intent(hide),depend(CT_c) :: nCT = size(CT_c,2)
+cf2py integer intent(hide),depend(TI) :: nF = len(TI)
+cf2py integer intent(hide),depend(idF) :: nT = len(idF)
+cf2py integer intent(in),dimension(nT) :: idF
+cf2py real(kind=8) intent(in),depend(n),dimension(n,n) :: x_l,y_l
+cf2py real(kind=8) intent(in),dimension(n) :: DT
+cf2py real(kind=8) intent(in),dimension(n,nCT,2) :: CT_c
+cf2py real(kind=8) intent(in),depend(n),dimension(n) :: CT_idle
+cf2py real(kind=8) intent(in),dimension(nF) :: TI
+cf2py real(kind=8) intent(in),depend(nF),dimension(nF) :: a1,a2,a3,a4
+cf2py real(kind=8) intent(in),depend(nF),dimension(nF) :: b1,b2
+cf2py integer intent(out),depend(n),dimension(n+1) :: ptr
+cf2py integer optional,intent(in),depend(n) :: nnz = n*n
+cf2py integer intent(out),depend(nnz),dimension(nnz) :: idx
+      ! internal variables
+      real(kind=8), parameter :: pi=3.1415926535897932384626433832795d0
+      integer :: i,k,l,t
+      logical :: new(nT)
+      real(kind=8) :: pars(7,nT),CT(nCT+2),Area,xT_st,c1,s,S_m,B_m,d
+
+      ! Wake parameters of the flow cases, each one considered once
+      do t=1,nT
+        k = idF(t)
+        pars(:,t) = (/TI(k),a1(k),a2(k),a3(k),a4(k),b1(k),b2(k)/)
+        new(t) = .true.
+        do l=1,t-1
+          if (all(pars(:,l) == pars(:,t))) new(t) = .false.
+        end do
+      end do
+      ptr(1) = 0
+      do i=1,n
+        Area = pi*DT(i)*DT(i)/4.0d0
+        CT(1:nCT) = CT_c(i,:,2)
+        CT(nCT+1) = CT_idle(i)
+        CT(nCT+2) = 0.99d0
+        ! Bound S_m*x+B_m of RW**3 = s*(x+xT_st) (see get_RW_c) over
+        ! the wakes of the turbine
+        S_m = 0.0d0
+        B_m = 0.0d0
+        do t=1,nT
+          if (.not.new(t)) cycle
+          do l=1,nCT+2
+            ! No wake, or an undefined one
+            if ((CT(l) <= 0.0d0).or.(CT(l) >= 1.0d0)) cycle
+            call get_wake_c(DT(i),CT(l),pars(1,t),pars(2,t),pars(3,t),
+     &           pars(4,t),pars(5,t),pars(6,t),pars(7,t),xT_st,c1)
+            s = (105.0d0*c1*c1/(2.0d0*pi))**(0.6d0)*CT(l)*Area
+            S_m = max(S_m,s)
+            B_m = max(B_m,s*xT_st)
+          end do
+        end do
+        ! Turbines downstream with their rotor in the bounding wake,
+        ! with a margin for the rounding
+        ptr(i+1) = ptr(i)
+        do k=1,n
+          if (x_l(i,k) <= 0.0d0) cycle
+          d = abs(y_l(i,k))-DT(k)/2.0d0
+          if (d > 0.0d0) then
+            if (d**3.0d0 >= (1.0d0+1.0d-6)*(S_m*x_l(i,k)+B_m)) cycle
+          end if
+          ptr(i+1) = ptr(i+1)+1
+          if (ptr(i+1) <= nnz) idx(ptr(i+1)) = k-1
+        end do
+      end do
+
+      end subroutine wake_pairs
+
+c ----------------------------------------------------------------------
+c group_wd(WD,nMax)
+c ----------------------------------------------------------------------
+c Groups the flow cases by wind direction, in blocks of at most nMax flow
+c cases, so that the flow coordinates are computed once per block
+c
+c Inputs
+c ----------
+c WD (array): Wind directions of the flow cases [deg.]
+c nMax (int): Largest number of flow cases in a block
+c
+c Outputs
+c ----------
+c idF (array): Indexes of the flow cases, ordered by wind direction
+c ptr (array): Blocks of flow cases, 0-based. The flow cases of the block
+c              l are idF(ptr(l)+1:ptr(l+1))
+c nB (int): Number of blocks
+      subroutine group_wd(nF,WD,nMax,idF,ptr,nB)
+
+      implicit none
+      integer :: nF,nMax,idF(nF),ptr(nF+1),nB
+      real(kind=8) :: WD(nF)
+cf2py integer intent(hide),depend(WD) :: nF = len(WD)
+cf2py real(kind=8) intent(in),dimension(nF) :: WD
+cf2py integer intent(in) :: nMax
+cf2py integer intent(out),depend(nF),dimension(nF) :: idF
+cf2py integer intent(out),depend(nF),dimension(nF+1) :: ptr
+cf2py integer intent(out) :: nB
+      ! internal variables
+      integer :: k
+      real(kind=8) :: WD_s(nF)
+
+      ! Sorts a copy, order_r sorts its input
+      WD_s = WD
+      call order_r(nF,WD_s,idF)
+      nB = 0
+      do k=1,nF
+        if (k > 1) then
+          if ((WD_s(k) == WD_s(k-1)).and.(k-1-ptr(nB) < nMax)) cycle
+        end if
+        ! New block at a new wind direction, or when the block is full
+        nB = nB+1
+        ptr(nB) = k-1
+      end do
+      ptr(nB+1) = nF
+
+      end subroutine group_wd
+
 c ----------------------------------------------------------------------
 c Find the lower location index of a point in an ordered array
 c ----------------------------------------------------------------------
@@ -942,4 +1660,44 @@ cf2py integer intent(out),depend(n),dimension(n) :: id
           id(j)=w
         end do
       end do
-      end subroutine order_id
\ No newline at end of file
+      end subroutine order_id
+
+c ----------------------------------------------------------------------
+c Finds the index that order an array from lower to higher values
+c for reals (same as order_id)
+c ----------------------------------------------------------------------
+      subroutine order_r(n,a,id)
+      integer n,id(n)
+      real(kind=8) a(n)
+cf2py integer intent(hide),depend(a) :: n = len(a)
+cf2py real(kind=8) intent(in),dimension(n) :: a
+cf2py integer intent(out),depend(n),dimension(n) :: id
+      ! internal variables
+      integer i,j,inc,w
+      real(kind=8) v
+      do i=1,n
+        id(i)=i
+      end do
+      ! Determine starting increment
+      inc=1
+      do while (inc.le.n)
+        inc=3*inc+1
+      end do
+      ! Partial sorts loop
+      do while (inc.gt.1)
+        inc=inc/3
+        do i=inc+1,n
+          v=a(i)
+          w=id(i)
+          j=i
+          do while (a(j-inc).gt.v)
+            a(j)=a(j-inc)
+            id(j)=id(j-inc)
+            j=j-inc
+            if(j.le.inc) exit
+          end do
+          a(j)=v
+          id(j)=w
+        end do
+      end do
+      end subroutine order_r
@@ -0,0 +1,323 @@
+"""GCL kernels compiled with Numba
+
+Same algorithms as the Fortran kernels of GCL.f (upstream sweep of gcl_s,
+rotor quadrature of get_dUeq_q, lookup of the curves of interp_l), written
+with scalar loops compiled by Numba, for the installations without a
+Fortran compiler. The kernels take the inputs of the Fortran kernels and
+return the same (P, T, U) outputs, so that they are run by the wake model
+runtime as the Fortran versions.
+
+The flow cases of the batch kernels are shared among n_threads threads, as
+in the Fortran kernels (Numba >= 0.49, older versions use all the threads of
+Numba). Without Numba the kernels run as plain (slow) Python, on one thread,
+with the same results, and warn about it.
+"""
+import warnings
+import numpy as np
+from fusedwake.quadrature import gauss_legendre
+try:
+    from numba import njit, prange, config
+    NUMBA = True
+except ImportError:
+    NUMBA = False
+    prange = range
+    def njit(*args, **kwargs):
+        """Runs the functions as plain Python"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+try:
+    from numba import set_num_threads
+except ImportError:
+    # Numba < 0.49 (or no Numba)
+    set_num_threads = None
+
+pi = 3.1415926535897932384626433832795
+
+# Gauss-Legendre points and weights of the orders tabulated in the Fortran
+# kernels, built once from the shared quadrature rules
+_GL_TABLES = dict((Ng, gauss_legendre(Ng)) for Ng in range(4, 9))
+
+def gl_rule(Ng):
+    """Gauss-Legendre quadrature points and weights on [-1, 1] (read-only)"""
+    if Ng in _GL_TABLES:
+        return _GL_TABLES[Ng]
+    return gauss_legendre(Ng)
+
+@njit(cache=True)
+def _wake_c(D, CT, TI, a1, a2, a3, a4, b1, b2):
+    """Wake shape coefficients xT_st, c1 (get_wake_c)"""
+    Area = pi * D * D / 4.0
+    a = (1.0 - np.sqrt(1.0 - CT)) / 2.0
+    k = np.sqrt((1.0 - a) / (1.0 - 2.0 * a))
+    R96 = a1 * (np.exp(a2 * CT * CT + a3 * CT + a4)) * (b1 * TI + b2) * D
+    xT_st = (9.6 * D) / (((2.0 * R96 / (k * D))**3.0) - 1.0)
+    tm1 = (k * D / 2.0)**2.5
+    tm2 = (105.0 / (2.0 * pi))**(-0.5)
+    tm3 = (CT * Area * xT_st)**(-5.0 / 6.0)
+    return xT_st, tm1 * tm2 * tm3
+
+@njit(cache=True)
+def _RW_c(x, D, CT, xT_st, c1):
+    """Wake radius at a location (get_RW_c)"""
+    if x + xT_st <= 0.0:
+        return 0.0
+    Area = pi * D * D / 4.0
+    tm4 = (105.0 * c1 * c1 / (2.0 * pi))**0.2
+    tm5 = (CT * Area * (x + xT_st))**(1.0 / 3.0)
+    return tm4 * tm5
+
+@njit(cache=True)
+def _dU_c(x, r, RW, D, CT, xT_st, c1):
+    """Wake velocity deficit at a location (get_dU_c)"""
+    if x <= 0.0 or r >= RW:
+        return 0.0
+    Area = pi * D * D / 4.0
+    tm10 = 1.0 / 9.0
+    tm20 = (CT * Area * (x + xT_st)**(-2.0))**(1.0 / 3.0)
+    tm31 = r**1.5
+    tm32 = (3.0 * c1 * c1 * CT * Area * (x + xT_st))**(-0.5)
+    tm30 = tm31 * tm32
+    tm41 = (35.0 / (2.0 * pi))**(3.0 / 10.0)
+    tm42 = (3.0 * c1 * c1)**(-0.2)
+    tm40 = tm41 * tm42
+    return -tm10 * tm20 * (tm30 - tm40)**2.0
+
+@njit(cache=True)
+def _loc_in_list(xa, x):
+    """Lower location index (1-based) of x in the ordered xa (loc_in_list)"""
+    n = len(xa)
+    j_low, j_up = 0, n + 1
+    while j_up - j_low > 1:
+        j_mid = (j_up + j_low) // 2
+        if (xa[n - 1] >= xa[0]) == (x >= xa[j_mid - 1]):
+            j_low = j_mid
+        else:
+            j_up = j_mid
+    if x == xa[0]:
+        return 1
+    elif x == xa[n - 1]:
+        return n - 1
+    return j_low
+
+@njit(cache=True)
+def _interp_l(xa, ya, x):
+    """Linear interpolation (interp_l)"""
+    j = _loc_in_list(xa, x)
+    return ((ya[j] - ya[j - 1]) / (xa[j] - xa[j - 1])) * (x - xa[j - 1]) + ya[j - 1]
+
+@njit(cache=True)
+def _order_id(a):
+    """Indexes (0-based) ordering the integers a, in the order of the
+    Shell sort of order_id"""
+    a = a.copy()
+    n = len(a)
+    idx = np.arange(n)
+    inc = 1
+    while inc <= n:
+        inc = 3 * inc + 1
+    while inc > 1:
+        inc = inc // 3
+        # 1-based indexes, as in order_id
+        for i in range(inc + 1, n + 1):
+            v = a[i - 1]
+            w = idx[i - 1]
+            j = i
+            while a[j - inc - 1] > v:
+                a[j - 1] = a[j - inc - 1]
+                idx[j - 1] = idx[j - inc - 1]
+                j = j - inc
+                if j <= inc:
+                    break
+            a[j - 1] = v
+            idx[j - 1] = w
+    return idx
+
+@njit(cache=True)
+def _gcl_s(x_g, y_g, z_g, DT, P_c, CT_c, WS, WD, TI, a1, a2, a3, a4, b1, b2,
+           root, weight, rho, WS_CI, WS_CO, CT_idle, P, T, U):
+    """Single flow case (gcl_s), the outputs are written in P, T, U"""
+    n = len(DT)
+    Ng = len(root)
+    # Rotates the global coordinates to local flow coordinates
+    angle = pi * (270.0 - WD) / 180.0
+    x_l = np.empty((n, n))
+    y_l = np.empty((n, n))
+    nDownstream = np.zeros(n, dtype=np.int64)
+    for i in range(n):
+        for j in range(n):
+            x_l[i, j] = np.cos(angle) * x_g[i, j] + np.sin(angle) * y_g[i, j]
+            y_l[i, j] = -np.sin(angle) * x_g[i, j] + np.cos(angle) * y_g[i, j]
+            if x_l[i, j] < 0.0:
+                nDownstream[i] += 1
+    # Indexes of ordered turbines from most upstream turbine
+    idT = _order_id(nDownstream)
+    for k in range(n):
+        U[k] = WS
+    dUeq = np.zeros(n)
+    # Computes the rotor averaged (equivalent) velocity deficit
+    for jj in range(n):
+        i = idT[jj]
+        D = DT[i]
+        if U[i] >= WS_CI[i] and U[i] <= WS_CO[i]:
+            CT = _interp_l(CT_c[i, :, 0], CT_c[i, :, 1], U[i])
+        else:
+            CT = CT_idle[i]
+        xT_st, c1 = _wake_c(D, CT, TI, a1, a2, a3, a4, b1, b2)
+        for m in range(n):
+            dUeq[m] = 0.0
+            x = x_l[i, m]
+            if x > 0.0:
+                RW = _RW_c(x, D, CT, xT_st, c1)
+                y = y_l[i, m]
+                z = z_g[i, m]
+                RT = DT[m] / 2.0
+                # Location of the turbine in wake coordinates
+                r_R = (y**2.0 + z**2.0)**0.5
+                th_R = np.arctan2(z, y)
+                th_R = th_R - np.floor(th_R / (2.0 * pi)) * (2.0 * pi)
+                for j in range(Ng):
+                    th_pr = pi * (root[j] + 1.0) - pi / 2.0
+                    for k in range(Ng):
+                        r_pr = RT * (root[k] + 1.0) / 2.0
+                        tm1 = r_R**2.0
+                        tm2 = r_pr**2.0
+                        tm3 = 2.0 * r_R * r_pr * np.cos(th_R - th_pr)
+                        r_e = np.sqrt(tm1 + tm2 + tm3)
+                        dU = _dU_c(x, r_e, RW, D, CT, xT_st, c1)
+                        dUeq[m] += weight[j] * weight[k] * dU * (root[k] + 1.0) / 4.0
+        Ui = U[i]
+        for m in range(n):
+            U[m] = U[m] + Ui * dUeq[m]
+    # Calculates the power and thrust
+    for k in range(n):
+        if U[k] >= WS_CI[k] and U[k] <= WS_CO[k]:
+            P[k] = _interp_l(P_c[k, :, 0], P_c[k, :, 1], U[k])
+            CT = _interp_l(CT_c[k, :, 0], CT_c[k, :, 1], U[k])
+        else:
+            P[k] = 0.0
+            CT = CT_idle[k]
+        T[k] = CT * 0.5 * rho * U[k] * U[k] * pi * DT[k] * DT[k] / 4.0
+
+@njit(cache=True, parallel=True)
+def _gcl(x_g, y_g, z_g, DT, P_c, CT_c, WS, WD, TI, a1, a2, a3, a4, b1, b2,
+         root, weight, rho, WS_CI, WS_CO, CT_idle, P, T, U):
+    """Multiple flow cases (gcl)"""
+    for i in prange(len(WS)):
+        _gcl_s(x_g, y_g, z_g, DT, P_c, CT_c, WS[i], WD[i], TI[i], a1[i], a2[i],
+               a3[i], a4[i], b1[i], b2[i], root, weight, rho, WS_CI, WS_CO,
+               CT_idle, P[i], T[i], U[i])
+
+@njit(cache=True, parallel=True)
+def _gcl_av(x_g, y_g, z_g, DT, P_c, CT_c, WS, WD, TI, AV, a1, a2, a3, a4, b1,
+            b2, root, weight, rho, WS_CI, WS_CO, CT_idle, P, T, U):
+    """Multiple flow cases with the availability of the turbines (gcl_av)"""
+    for i in prange(len(WS)):
+        CT_c_AV = CT_c.copy()
+        P_c_AV = P_c.copy()
+        # Re-defines the thrust curve for non available turbines
+        for j in range(len(DT)):
+            if AV[i, j] == 0:
+                CT_c_AV[j, :, 1] = CT_idle[j]
+                P_c_AV[j, :, 1] = 0.0
+        _gcl_s(x_g, y_g, z_g, DT, P_c_AV, CT_c_AV, WS[i], WD[i], TI[i], a1[i],
+               a2[i], a3[i], a4[i], b1[i], b2[i], root, weight, rho, WS_CI,
+               WS_CO, CT_idle, P[i], T[i], U[i])
+
+def _turbine_inputs(dt, p_c, ct_c, ws_ci, ws_co, ct_idle):
+    n = len(dt)
+    return ([np.ascontiguousarray(a, dtype=np.float64) for a in [dt, p_c, ct_c]] +
+            [np.array(np.broadcast_to(a, (n,)), dtype=np.float64)
+             for a in [ws_ci, ws_co, ct_idle]])
+
+def _outputs(shape, p, t, u):
+    return [np.empty(shape, order='F') if a is None else a for a in [p, t, u]]
+
+def _check_numba():
+    """Warns when the kernels run as plain Python"""
+    if not NUMBA:
+        warnings.warn('Numba is not installed: the jit_ versions of GCL run as '
+                      'plain Python', RuntimeWarning, stacklevel=3)
+
+def _set_threads(n_threads):
+    """Number of threads of the next parallel loops"""
+    if set_num_threads is not None:
+        set_num_threads(max(1, min(int(n_threads), config.NUMBA_NUM_THREADS)))
+
+def gcl_s(x_g, y_g, z_g, dt, p_c, ct_c, ws, wd, ti, a1=0.435449861,
+          a2=0.797853685, a3=-0.124807893, a4=0.136821858, b1=15.6298, b2=1.0,
+          ng=4, rho=1.225, ws_ci=4.0, ws_co=25.0, ct_idle=0.053, p=None, t=None,
+          u=None):
+    """Single flow case, same inputs and outputs as the Fortran gcl_s
+
+    Returns
+    -------
+    p, t, u: ndarray
+        Power [kW], thrust [N] and rotor averaged wind speed [m/s] of the
+        wind turbines (nWT)
+    """
+    _check_numba()
+    dt, p_c, ct_c, ws_ci, ws_co, ct_idle = _turbine_inputs(dt, p_c, ct_c, ws_ci,
+                                                           ws_co, ct_idle)
+    p, t, u = _outputs((len(dt),), p, t, u)
+    root, weight = gl_rule(ng)
+    _gcl_s(x_g, y_g, z_g, dt, p_c, ct_c, float(ws), float(wd), float(ti),
+           float(a1), float(a2), float(a3), float(a4), float(b1), float(b2),
+           root, weight, float(rho), ws_ci, ws_co, ct_idle, p, t, u)
+    return p, t, u
+
+def _batch_inputs(ws, wd, ti, pars):
+    cases = [np.ascontiguousarray(a, dtype=np.float64) for a in [ws, wd, ti]]
+    nF = len(cases[0])
+    return cases + [np.array(np.broadcast_to(a, (nF,)), dtype=np.float64)
+                    for a in pars]
+
+def gcl(x_g, y_g, z_g, dt, p_c, ct_c, ws, wd, ti, a1=0.435449861,
+        a2=0.797853685, a3=-0.124807893, a4=0.136821858, b1=15.6298, b2=1.0,
+        ng=4, rho=1.225, ws_ci=4.0, ws_co=25.0, ct_idle=0.053, p=None, t=None,
+        u=None, n_threads=1):
+    """Multiple flow cases, same inputs and outputs as the Fortran gcl
+
+    Returns
+    -------
+    p, t, u: ndarray
+        Power [kW], thrust [N] and rotor averaged wind speed [m/s] of the
+        wind turbines (nF, nWT)
+    """
+    _check_numba()
+    dt, p_c, ct_c, ws_ci, ws_co, ct_idle = _turbine_inputs(dt, p_c, ct_c, ws_ci,
+                                                           ws_co, ct_idle)
+    cases = _batch_inputs(ws, wd, ti, [a1, a2, a3, a4, b1, b2])
+    p, t, u = _outputs((len(cases[0]), len(dt)), p, t, u)
+    root, weight = gl_rule(ng)
+    _set_threads(n_threads)
+    _gcl(x_g, y_g, z_g, dt, p_c, ct_c, *(cases + [root, weight, float(rho), ws_ci,
+         ws_co, ct_idle, p, t, u]))
+    return p, t, u
+
+def gcl_av(x_g, y_g, z_g, dt, p_c, ct_c, ws, wd, ti, av, a1=0.435449861,
+           a2=0.797853685, a3=-0.124807893, a4=0.136821858, b1=15.6298, b2=1.0,
+           ng=4, rho=1.225, ws_ci=4.0, ws_co=25.0, ct_idle=0.053, p=None, t=None,
+           u=None, n_threads=1):
+    """Multiple flow cases with the availability of the turbines av (nF,
+    nWT), same inputs and outputs as the Fortran gcl_av
+
+    Returns
+    -------
+    p, t, u: ndarray
+        Power [kW], thrust [N] and rotor averaged wind speed [m/s] of the
+        wind turbines (nF, nWT)
+    """
+    _check_numba()
+    dt, p_c, ct_c, ws_ci, ws_co, ct_idle = _turbine_inputs(dt, p_c, ct_c, ws_ci,
+                                                           ws_co, ct_idle)
+    cases = _batch_inputs(ws, wd, ti, [a1, a2, a3, a4, b1, b2])
+    nF = len(cases[0])
+    av = np.array(np.broadcast_to(av, (nF, len(dt))), dtype=np.int64)
+    p, t, u = _outputs((nF, len(dt)), p, t, u)
+    root, weight = gl_rule(ng)
+    _set_threads(n_threads)
+    _gcl_av(x_g, y_g, z_g, dt, p_c, ct_c, *(cases[:3] + [av] + cases[3:] +
+            [root, weight, float(rho), ws_ci, ws_co, ct_idle, p, t, u]))
+    return p, t, u
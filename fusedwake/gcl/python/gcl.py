@@ -6,6 +6,8 @@ References:
 import numpy as np
 import fusedwake.WindTurbine as wt
 import fusedwake.WindFarm as wf
+from fusedwake.quadrature import gauss_legendre, gauss_hermite, rotor_disk
+from fusedwake.dual import Dual
 
 def Ua(r,te,zc,us,z0):
     """Function of undisturbed inflow wind speed - log law.
@@ -75,17 +77,10 @@ def gaussN(R, func, varargin, NG=4):
     """
     A = np.pi*R**2
     #coefficients
-    if NG==4: #for speed give the full values
-        rt = np.array([[ -0.339981043584856, -0.861136311594053,
-            0.339981043584856, 0.861136311594053]])
-        te = rt.T
-        w = np.array([[0.652145154862546, 0.347854845137454,
-            0.652145154862546, 0.347854845137454]])
-    else:
-        rt,w = np.polynomial.legendre.leggauss(NG)
-        rt = np.array([rt])
-        te = rt.T
-        w = np.array([w])
+    rt,w = gauss_legendre(NG)
+    rt = rt[None, :]
+    te = rt.T
+    w = w[None, :]
 
     return (np.pi/4.0)*(R**2./A)*w*w.T*func(R*(rt+1.0)/2.0,
         np.pi*(te+1.0),*varargin)*(rt+1.0)
@@ -114,7 +109,68 @@ def get_r96(D, CT, TI, pars=[0.435449861, 0.797853685, -0.124807893, 0.136821858
 
     return R96
 
-def get_Rw(x, R, TI, CT, pars=[0.435449861, 0.797853685, -0.124807893, 0.136821858, 15.6298, 1.0]):
+class WakeCoefficients(object):
+    """Wake shape coefficients of the GCL model. They only depend on the
+    state of the wake generating turbine and on the model parameters, so
+    they are computed once and passed to get_Rw and get_dU. The inputs can be
+    arrays (e.g. one value per flow case), the coefficients are then
+    broadcasted against them.
+    Parameters
+    ----------
+    R: float or ndarray
+        Wake generating turbine's radius [m]
+    TI: float or ndarray
+        Ambient turbulence intensity [-]
+    CT: float or ndarray
+        Thrust coefficient of the wake generating turbine [-]
+    pars: list, optional
+        GCL Model parameters [a1, a2, a3, a4, b1, b2]
+    Attributes
+    ----------
+    R96: float or ndarray
+        Wake radius at 9.6D downstream location [m]
+    x0: float or ndarray
+        Distance from the rotor to the origin of the wake expansion [m]
+    c1: float or ndarray
+        Integration constant of the wake
+    """
+    def __init__(self, R, TI, CT,
+        pars=[0.435449861, 0.797853685, -0.124807893, 0.136821858, 15.6298, 1.0]):
+        self.R, self.TI, self.CT = R, TI, CT
+        D = 2.0 * R
+        Area = np.pi * D**2.0 / 4.0
+
+        m = 1.0 / (np.sqrt(1.0 - CT))
+        k = np.sqrt((m + 1.0) / 2.0)
+
+        self.R96 = get_r96(D, CT, TI, pars)
+
+        self.x0 = (9.6 * D) / ((2.0 * self.R96 / (k * D))**3.0 - 1.0)
+        term1 = (k * D / 2.0)**2.5
+        term2 = (105.0/(2.0*np.pi))**-0.5
+        term3 = (CT * Area * self.x0)**(-5.0 / 6.0)
+        self.c1 = term1 * term2 * term3
+
+        # Terms of the wake radius and deficit independent of the location
+        self.CTA = CT * Area
+        self.Rw_term = (105.0 * self.c1**2.0 / (2.0 * np.pi))**0.2
+        self.cCTA3 = 3.*self.c1*self.c1*CT*Area
+        self.term40 = ((35./(2.*np.pi))**(3./10.))*((3.*self.c1*self.c1)**(-0.2))
+
+        # Second order terms
+        self.z_term3 = ((35./(2.*np.pi))**(-3./10.))*((3.*self.c1*self.c1)**(-3./10.))
+        d_term = (4./81.)*(((35./(2.*np.pi))**(6./5.))*((3.*self.c1*self.c1)**(-12./15.)))
+        d_4_const = (1./40.)
+        d_3_const = (-4.+48./40.)*1./19.
+        d_2_const = (6.+27.*d_3_const)*1./4.
+        d_1_const = (4.-12.*d_2_const)*1./5.
+        d_0_const = (-1.-3.*d_2_const)*1./8.
+        self.d = [d_term*d_0_const, d_term*d_1_const, d_term*d_2_const,
+                  d_term*d_3_const, d_term*d_4_const]
+
+def get_Rw(x, R=None, TI=None, CT=None,
+    pars=[0.435449861, 0.797853685, -0.124807893, 0.136821858, 15.6298, 1.0],
+    coefs=None):
     """Computes the wake radius at a location.
     [1]-eq.3
     .. math::
@@ -139,35 +195,58 @@ def get_Rw(x, R, TI, CT, pars=[0.435449861, 0.797853685, -0.124807893, 0.1368218
         Ambient turbulence intensity
     CT: float
         Outputs WindTurbine object's thrust coefficient
+    coefs: WakeCoefficients, optional
+        Precomputed wake coefficients, used instead of R, TI, CT and pars
     Returns
     -------
     Rw: float or ndarray
         Wake radius at a location
     """
+    if coefs is None:
+        coefs = WakeCoefficients(R, TI, CT, pars)
     _ones = np.ones(np.shape(x))
-    D = 2.0 * R
-    Area = np.pi * D**2.0 / 4.0
-
-    m = 1.0 / (np.sqrt(1.0 - CT))
-    k = np.sqrt((m + 1.0) / 2.0)
+    x0 = coefs.x0
 
-    R96 = get_r96(D, CT, TI, pars)
-
-    x0 = (9.6 * D) / ((2.0 * R96 / (k * D))**3.0 - 1.0)
-    term1 = (k * D / 2.0)**2.5
-    term2 = (105.0/(2.0*np.pi))**-0.5
-    term3 = (CT * Area * x0)**(-5.0 / 6.0)
-    c1 = term1 * term2 * term3
-
-    Rw = ((105.0 * c1**2.0 / (2.0 * np.pi))**0.2) * (CT * Area * (x + x0 * _ones))**(1.0 / 3.0)
+    Rw = coefs.Rw_term * (coefs.CTA * (x + x0 * _ones))**(1.0 / 3.0)
 
     if type(x) == float and x+x0 <= 0.: Rw = 0
-    elif type(x) == np.ndarray: Rw[x + x0 * _ones <= 0.] = 0.
+    elif isinstance(x, (np.ndarray, Dual)): Rw[x + x0 * _ones <= 0.] = 0.
     return Rw
 
-def get_dU(x,r,Rw,U,R,TI,CT,
+def get_Rw_envelope(WF, TI, CT=0.99,
+    pars=[0.435449861, 0.797853685, -0.124807893, 0.136821858, 15.6298, 1.0]):
+    """Bounding wake radius of the turbines of a wind farm, to be used with
+    WindFarm.wake_candidates.
+    Parameters
+    ----------
+    WF: WindFarm
+        Windfarm instance
+    TI: float or ndarray
+        Ambient turbulence intensities of the flow cases considered [-]
+    CT: float or ndarray, optional
+        Thrust coefficients considered [-]. Default to the maximum effect.
+    Returns
+    -------
+    envelope: function
+        envelope(x, i) gives the largest wake radius of the turbine i at the
+        downstream distances x over all the TI and CT values [m]
+    """
+    TI_m, CT_m = np.meshgrid(np.unique(TI), np.unique(CT))
+    TI_m, CT_m = TI_m.reshape((-1, 1)), CT_m.reshape((-1, 1))
+    coefs = {}
+    def envelope(x, i):
+        R = WF.WT[i].R
+        if R not in coefs:
+            coefs[R] = WakeCoefficients(R, TI_m, CT_m, pars)
+        # fmax ignores the values of the parameters without a wake (NaN)
+        return np.fmax.reduce(get_Rw(x=x*np.ones_like(TI_m), coefs=coefs[R]),
+                              axis=0)
+    return envelope
+
+def get_dU(x,r,Rw,U,R=None,TI=None,CT=None,
     order=1,
-    pars=[0.435449861,0.797853685,-0.124807893,0.136821858,15.6298,1.0]):
+    pars=[0.435449861,0.797853685,-0.124807893,0.136821858,15.6298,1.0],
+    coefs=None):
     """Computes the wake velocity deficit at a location
     Parameters
     ----------
@@ -186,32 +265,25 @@ def get_dU(x,r,Rw,U,R,TI,CT,
     CT: float
         Outputs WindTurbine object's thrust coefficient
     order: int, optional
+    coefs: WakeCoefficients, optional
+        Precomputed wake coefficients, used instead of R, TI, CT and pars
     Returns
     -------
     dU: float
         Wake velocity deficit at a location
     """
+    if coefs is None:
+        coefs = WakeCoefficients(R, TI, CT, pars)
     _ones = np.ones(np.shape(x))
-
-    D = 2.*R
-    Area=np.pi*D*D/4.
-    m=1./(np.sqrt(1.-CT))
-    k=np.sqrt((m+1.)/2.)
-
-    R96 = get_r96(D,CT,TI,pars)
-
-    x0=(9.6*D)/((2.*R96/(k*D))**3.-1.)
-    term1=(k*D/2.)**2.5
-    term2=(105./(2.*np.pi))**-0.5
-    term3=(CT*Area*x0)**(-5./6.)
-    c1=term1*term2*term3
+    x0 = coefs.x0
+    CT = coefs.CT
 
     term10=0.1111*U*_ones
-    term20=(CT*Area*(x+x0)**(-2.))**(1./3.)
+    term20=(coefs.CTA*(x+x0)**(-2.))**(1./3.)
     term310=(r**(1.5))
-    term320=(3.*c1*c1*CT*Area*(x+x0))**(-0.5)
+    term320=(coefs.cCTA3*(x+x0))**(-0.5)
     term30=term310*term320
-    term40=((35./(2.*np.pi))**(3./10.))*((3.*c1*c1)**(-0.2))
+    term40=coefs.term40
     dU1=-term10*term20*(term30-term40)**2.
 
     dU = dU1
@@ -219,25 +291,12 @@ def get_dU(x,r,Rw,U,R,TI,CT,
     if order == 2:
 
         z_term1 = r**1.5
-        z_term2 = (CT*Area*(x+x0))**(-0.5)
-        z_term3 = ((35./(2.*np.pi))**(-3./10.))*((3.*c1*c1)**(-3./10.))
-        z = z_term1*z_term2*z_term3
+        z_term2 = (coefs.CTA*(x+x0))**(-0.5)
+        z = z_term1*z_term2*coefs.z_term3
 
-        d_term = (4./81.)*(((35./(2.*np.pi))**(6./5.))*((3.*c1*c1)**(-12./15.)))
+        d_0, d_1, d_2, d_3, d_4 = coefs.d
 
-        d_4_const = (1./40.)
-        d_3_const = (-4.+48./40.)*1./19.
-        d_2_const = (6.+27.*d_3_const)*1./4.
-        d_1_const = (4.-12.*d_2_const)*1./5.
-        d_0_const = (-1.-3.*d_2_const)*1./8.
-
-        d_0 = d_term*d_0_const
-        d_1 = d_term*d_1_const
-        d_2 = d_term*d_2_const
-        d_3 = d_term*d_3_const
-        d_4 = d_term*d_4_const
-
-        dU2_const = U*((CT*Area*((x+x0)**(-2.)))**(2./3.))
+        dU2_const = U*((coefs.CTA*((x+x0)**(-2.)))**(2./3.))
         dU2_term0 = d_0*(z**0.)
         dU2_term1 = d_1*(z**1.)
         dU2_term2 = d_2*(z**2.)
@@ -248,13 +307,16 @@ def get_dU(x,r,Rw,U,R,TI,CT,
 
         dU=dU1 + dU2
 
-    if type(r)==np.ndarray: dU[Rw<r]=0. # Outside the wake
+    if isinstance(r, (np.ndarray, Dual)): dU[Rw<r]=0. # Outside the wake
     elif type(r)==float and Rw<r: dU = 0
 
-    if type(x)==np.ndarray: dU[x<=0.]=0. # upstream the wake gen. WT
+    if isinstance(x, (np.ndarray, Dual)): dU[x<=0.]=0. # upstream the wake gen. WT
     elif type(x)==float and x<=0.: dU = 0
 
-    if CT==0: dU = 0.0*dU
+    if np.ndim(CT) == 0:
+        if CT==0: dU = 0.0*dU
+    else:
+        dU = np.where(CT==0, 0.0, dU) # one CT per flow case
 
     return dU
 
@@ -355,9 +417,51 @@ def GCLarsen_v0(WF, WS, WD, TI, z0, NG=4, sup='lin',
 
     return (P_WT,U_WT,Ct)
 
+def _grad_variables(WF, WD, x_f, y_f, TI, pars, grad):
+    """Dual numbers of the variables of the derivatives of GCLarsen
+    Parameters
+    ----------
+    WF: WindFarm
+        Windfarm instance
+    WD: float
+        Wind direction [deg]
+    x_f, y_f: ndarray
+        Turbine positions in flow coordinates (nWT)
+    TI: float
+        Ambient turbulence intensity [-]
+    pars: list
+        GCL Model parameters
+    grad: bool or list
+        True for the positions, or a list of variables among 'pos', 'TI'
+        and 'pars'
+    Returns
+    -------
+    x_f, y_f, TI, pars:
+        The inputs, as dual numbers when they depend on the variables
+    """
+    variables = ['pos'] if grad is True else list(grad)
+    nP = 2 * WF.nWT * ('pos' in variables) + ('TI' in variables) + \
+         len(pars) * ('pars' in variables)
+    x_f, y_f = Dual.constant(x_f, nP), Dual.constant(y_f, nP)
+    i = 0
+    if 'pos' in variables:
+        # Rotation of the global coordinates to the flow coordinates
+        angle = np.radians(270.-WD)
+        iWT = np.arange(WF.nWT)
+        x_f.der[iWT, iWT], x_f.der[iWT, WF.nWT + iWT] = np.cos(angle), np.sin(angle)
+        y_f.der[iWT, iWT], y_f.der[iWT, WF.nWT + iWT] = -np.sin(angle), np.cos(angle)
+        i += 2 * WF.nWT
+    if 'TI' in variables:
+        TI = Dual.variable(TI, i, nP)
+        i += 1
+    if 'pars' in variables:
+        pars = [Dual.variable(p, i + k, nP) for k, p in enumerate(pars)]
+    return x_f, y_f, TI, pars
+
 def GCLarsen(WF, WS, WD,TI,
     z0=0.0001, alpha=0.101, inflow='log', NG=4, sup='lin',
-    pars=[0.435449861,0.797853685,-0.124807893,0.136821858,15.6298,1.0]):
+    pars=[0.435449861,0.797853685,-0.124807893,0.136821858,15.6298,1.0],
+    stats=None, grad=False):
     """Computes the WindFarm flow and Power using GCLarsen
     [Larsen, 2009, A simple Stationary...]
     Parameters
@@ -387,6 +491,13 @@ def GCLarsen(WF, WS, WD,TI,
         Wake velocity deficit superposition method:
             'lin': Linear superposition
             'quad' Quadratic superposition
+    stats: RunStats, optional
+        Counts of the work done (see fusedwake.instrumentation)
+    grad: bool or list, optional
+        Also computes the derivatives of the power of the turbines with
+        respect to their positions (True), or to the variables listed among
+        'pos', 'TI' and 'pars', by forward mode differentiation in the same
+        sweep (see fusedwake.dual)
     Returns
     -------
     P_WT: ndarray
@@ -395,8 +506,14 @@ def GCLarsen(WF, WS, WD,TI,
          Wind speed at hub height (nWT,1) [m/s]
     Ct: float
         Thrust coefficients for each wind turbine (nWT,1) [-]
+    dP_WT: ndarray
+        Only with grad. Derivatives of the power of the wind turbines
+        (nWT, nP), the variables being ordered as: the x then the y
+        positions of the turbines (2 nWT) [W/m], TI [W], and pars (6). The
+        derivatives of the total power are dP_WT.sum(axis=0).
     """
-    (distFlowCoord, nDownstream, id0) = WF.turbineDistance(WD)
+    # Turbine positions in flow coordinates, ranked from the most upstream
+    (x_f, y_f), id0 = WF.turbineFlowCoord(WD)
 
     # TODO: decide how at what height the us should be defined
     if inflow == 'log':
@@ -408,18 +525,8 @@ def GCLarsen(WF, WS, WD,TI,
         #eq inflow ws
         WS_inf = gaussN(WF.WT[0].R, Ua_shear, [WF.WT[0].H,WS,alpha]).sum()
 
-    # Gauss quadrature points
-    r_Gc,w_Gc = np.polynomial.legendre.leggauss(NG)
-    wj,wk=np.meshgrid(w_Gc,w_Gc)
-    tj,rk=np.meshgrid(r_Gc,r_Gc)
-    wj = wj.reshape((NG**2))
-    tj = tj.reshape((NG**2))
-    wk = wk.reshape((NG**2))
-    rk = rk.reshape((NG**2))
-
     # Initialize arrays to NaN
     Ct = np.nan*np.ones([WF.nWT])
-    P_WT = np.nan*np.ones([WF.nWT])
 
     # Initialize velocity to undisturbed eq ws
     U_WT  = WS_inf*np.ones([WF.nWT])
@@ -428,14 +535,27 @@ def GCLarsen(WF, WS, WD,TI,
 
     allR = np.array([WF.WT[i].R for i in range(WF.nWT)])
 
-    # Extreme wake to define WT's in each wake, including partial wakes
-    ID_wake = {i:(get_Rw(x=distFlowCoord[0,i,:],                # streamwise distance
-                         R=WF.WT[i].R,                          # Upstream radius
-                         TI=TI,
-                         CT=0.99,                                #Maximum effect
-                         pars=pars)
-                        > np.abs(distFlowCoord[1,i,:]) + allR).nonzero()[0]
-               for i in id0}
+    # Extreme wake to define WT's in each wake, including partial wakes.
+    # Only the wake candidates given by the spatial index are checked
+    indptr, indices = WF.wake_candidates(WD, get_Rw_envelope(WF, TI, pars=pars))
+    ID_wake = {}
+    for i in id0:
+        cand = indices[indptr[i]:indptr[i+1]]
+        ID_wake[i] = cand[get_Rw(x=x_f[cand] - x_f[i],     # streamwise distance
+                                 R=WF.WT[i].R,             # Upstream radius
+                                 TI=TI,
+                                 CT=0.99,                  #Maximum effect
+                                 pars=pars)
+                          > np.abs(y_f[cand] - y_f[i]) + allR[cand]]
+
+    if grad:
+        # Same sweep on dual numbers, carrying the derivatives
+        x_f, y_f, TI, pars = _grad_variables(WF, WD, x_f, y_f, TI, pars, grad)
+        nP = x_f.nP
+        Ct, U_WT, DU_sq = [Dual.constant(a, nP) for a in [Ct, U_WT, DU_sq]]
+
+    # Gauss quadrature points [quadrature point, turbine]
+    tj, rk, wj, wk = [a[:, None] for a in rotor_disk(NG)]
 
     for i in range(WF.nWT):
         #Current wind turbine starting from the most upstream
@@ -444,12 +564,8 @@ def GCLarsen(WF, WS, WD,TI,
         cR = WF.WT[i].R
         # Current hub wind speed
         cU = U_WT[cWT]
-        if cU>WF.WT[i].u_cutin:
-            Ct[cWT] = WF.WT[i].get_CT(U_WT[cWT])
-            P_WT[cWT] = WF.WT[i].get_P(U_WT[cWT])
-        else:
-           Ct[cWT] = 0.053  # Drag coefficient of the idled turbine
-           P_WT[cWT] = 0.0
+        # The power is computed for all the turbines after the sweep
+        Ct[cWT] = get_P_CT(WF, cU, cols=cWT)[1]
 
         # Current turbine CT
         cCT=Ct[cWT]
@@ -458,37 +574,34 @@ def GCLarsen(WF, WS, WD,TI,
         #           >np.abs(distFlowCoord[1,cWT,:])).nonzero()}
 
         #Radial coordinates in cWT for wake affected WT's
-        x = distFlowCoord[0, cWT, ID_wake[cWT]]
-        r_Ri  = np.abs(distFlowCoord[1,cWT, ID_wake[cWT]])
-        th_Ri = np.pi*(np.sign(distFlowCoord[1, cWT, ID_wake[cWT]]) + 1.0) # <- what is this? [0|2pi]
+        x = x_f[ID_wake[cWT]] - x_f[cWT]
+        y = y_f[ID_wake[cWT]] - y_f[cWT]
+        r_Ri  = np.abs(y)
+        th_Ri = np.pi*(np.sign(y) + 1.0) # <- what is this? [0|2pi]
+
+        # Wake shape coefficients of the current turbine
+        wake = WakeCoefficients(R=cR, TI=TI, CT=cCT, pars=pars)
 
         # Get all the wake radius at the position of the -in wake- downstream turbines
-        RW = get_Rw(x=x, R=cR, TI=TI, CT=cCT, pars=pars)
+        RW = get_Rw(x=x, coefs=wake)
 
-        # Meshgrids (Tensorial) extension of points of evaluation
-        # to perform Gaussian quadrature
-        r_Ri_m, rk_m = np.meshgrid(r_Ri, rk)
-        th_Ri_m, tj_m = np.meshgrid(th_Ri, tj)
-        x_m, wj_m = np.meshgrid(x, wj)
-        RW_m, wk_m = np.meshgrid(RW, wk)
+        # Tensorial extension [quadrature point, turbine] of the points of
+        # evaluation to perform Gaussian quadrature
+        shape = (NG**2, len(ID_wake[cWT]))
 
         # downstream Radius
         downR = np.array([WF.WT[j].R for j in ID_wake[cWT]])
-        downR_m, dummyvar = np.meshgrid(downR, np.zeros((NG**2)))
-        cH = WF.WT[cWT].H
-        downH = np.array([WF.WT[j].H for j in ID_wake[cWT]]) - cH
-        downH_m, dummyvar = np.meshgrid(downH, np.zeros((NG**2)))
 
         # Radial points of evaluation    <- probably need to add the turbine height difference here?
-        r_eval = np.sqrt(r_Ri_m**2.0 +
-                         (downR_m * (rk_m + 1.) / 2.0)**2. +
-                         r_Ri_m * downR_m * (rk_m + 1.) * np.cos(th_Ri_m - np.pi*(tj_m + 1.)))
+        r_eval = np.sqrt(r_Ri**2.0 +
+                         (downR * (rk + 1.) / 2.0)**2. +
+                         r_Ri * downR * (rk + 1.) * np.cos(th_Ri - np.pi*(tj + 1.)))
 
         # Eval wake velocity deficit
-        DU_m = get_dU(x=x_m, r=r_eval, Rw=RW_m,
-                      U=cU, R=downR_m, TI=TI, CT=cCT, pars=pars)
+        DU_m = get_dU(x=x * np.ones(shape), r=r_eval, Rw=RW * np.ones(shape),
+                      U=cU, coefs=wake)
 
-        localDU = np.sum((1./4.)*wj_m*wk_m*DU_m*(rk_m+1.0),axis=0)
+        localDU = np.sum((1./4.)*wj*wk*DU_m*(rk+1.0),axis=0)
 
         # Wake superposition
         if sup == 'lin':
@@ -499,32 +612,674 @@ def GCLarsen(WF, WS, WD,TI,
             U_WT = U_WT0 - np.sqrt(DU_sq)
             U_WT[U_WT<0.]=0.
 
+    P_WT = get_P_CT(WF, U_WT)[0]
+
+    if stats is not None:
+        n_wake = sum(len(v) for v in ID_wake.values())
+        stats.count(flow_cases=1, source_turbines=WF.nWT,
+                    wake_pairs_evaluated=n_wake,
+                    wake_pairs_pruned=WF.nWT * (WF.nWT - 1) - n_wake,
+                    quadrature_points=n_wake * NG**2)
+
+    if grad:
+        return (P_WT.value, U_WT.value, Ct.value, P_WT.der)
     return (P_WT,U_WT,Ct)
 
+def get_P_CT(WF, U, cols=None, CT_idle=0.053):
+    """Computes the power and thrust coefficient of the turbines of a wind
+    farm from the lookup tables of their curves, with the operational rules
+    used in GCLarsen: a turbine idles (P=0, CT=CT_idle) when it is not above
+    cut-in.
+    Parameters
+    ----------
+    WF: WindFarm
+        Windfarm instance
+    U: ndarray or Dual
+        Rotor averaged wind speeds (..., nCols) [m/s]
+    cols: int, slice or ndarray(int), optional
+        Turbines of the columns of U. Default to all the turbines.
+    CT_idle: float, optional
+        Thrust coefficient of the idled turbine [-]
+    Returns
+    -------
+    P: ndarray or Dual
+        Power production [W]
+    CT: ndarray or Dual
+        Thrust coefficient [-]
+    """
+    curves = WF.curve_table
+    if isinstance(U, Dual):
+        P, CT = get_P_CT(WF, U.value, cols, CT_idle)
+        above = U.value > curves.u_cutin[slice(None) if cols is None else cols]
+        dP, dCT = curves.slopes(U.value, cols)
+        return (Dual(P, U.der * (above * dP)[..., None]),
+                Dual(CT, U.der * (above * dCT)[..., None]))
+    P, CT = curves(U, cols)
+    above = U > curves.u_cutin[slice(None) if cols is None else cols]
+    return np.where(above, P, 0.0), np.where(above, CT, CT_idle)
+
+def GCLarsen_batch(WF, WS, WD, TI,
+    z0=0.0001, alpha=0.101, inflow='log', NG=4, sup='lin',
+    pars=[0.435449861,0.797853685,-0.124807893,0.136821858,15.6298,1.0],
+    stats=None):
+    """Computes the WindFarm flow and Power using GCLarsen for multiple flow
+    cases at once [Larsen, 2009, A simple Stationary...]
+
+    The flow cases are grouped by their upstream ordering of the turbines.
+    Each group is solved in a single sweep from the most upstream turbine,
+    vectorized over the flow cases of the group.
+    Parameters
+    ----------
+    WF: WindFarm
+        Windfarm instance
+    WS: float or ndarray
+        Undisturbed wind speed at hub height [m/s] (nF)
+    WD: float or ndarray
+        Undisturbed wind direction at hub height [deg] (nF).
+                Meteorological axis. North = 0 [deg], clockwise.
+    TI: float or ndarray
+        Ambient turbulence intensity [-] (nF)
+    z0: float, optional
+        Roughness height [m]
+    alpha: float, optional
+        Shear coefficient [-]
+        Only used for power-law undisturbed inflow.
+    inflow: Str, optional
+        Undisturbed inflow vertical profile:
+           'log': Logarithmic law (neutral case); uses z0
+           'pow': Power law profile; uses alpha
+    NG: int, optional
+        Number of points in Gaussian Quadrature for equivalent wind
+        speed integration over rotor distFlowCoord
+    sup: str, optional
+        Wake velocity deficit superposition method:
+            'lin': Linear superposition
+            'quad' Quadratic superposition
+    stats: RunStats, optional
+        Counts of the work done (see fusedwake.instrumentation)
+    Returns
+    -------
+    P_WT: ndarray
+         Power production of the wind turbines (nF,nWT) [W]
+    U_WT: ndarray
+         Wind speed at hub height (nF,nWT) [m/s]
+    Ct: ndarray
+        Thrust coefficients for each wind turbine (nF,nWT) [-]
+    """
+    WS, WD, TI = [np.array(v, dtype=float) for v in
+                  np.broadcast_arrays(np.atleast_1d(WS), np.atleast_1d(WD),
+                                      np.atleast_1d(TI))]
+    nF = WS.shape[0]
+
+    # The inflow profiles are linear in the reference wind speed
+    if inflow == 'log':
+        kappa = 0.4 # Kappa: von karman constant
+        us = kappa / np.log(WF.WT[0].H / z0)  # friction velocity for WS=1
+        WS_inf = WS * gaussN(WF.WT[0].R, Ua, [WF.WT[0].H,us,z0]).sum()
+    elif inflow == 'pow':
+        WS_inf = WS * gaussN(WF.WT[0].R, Ua_shear, [WF.WT[0].H,1.0,alpha]).sum()
+
+    # Gauss quadrature points
+    tj, rk, wj, wk = [a.reshape((1, NG**2, 1)) for a in rotor_disk(NG)]
+
+    allR = np.array([WF.WT[i].R for i in range(WF.nWT)])
+
+    # Flow coordinates, upstream ordering and wake candidates of each
+    # distinct wind direction
+    WD_u, iWD = np.unique(WD, return_inverse=True)
+    iWD = iWD.reshape(-1)
+    xy_u, id0_u, cand_u = [], [], []
+    for k, wd in enumerate(WD_u):
+        xy, id0 = WF.turbineFlowCoord(wd)
+        xy_u.append(xy)
+        id0_u.append(id0)
+        cand_u.append(WF.wake_candidates(wd,
+            get_Rw_envelope(WF, TI[iWD == k], pars=pars)))
+    xy_u = np.array(xy_u)
+
+    # Directions sharing the same upstream ordering are solved together
+    groups = {}
+    for k, id0 in enumerate(id0_u):
+        groups.setdefault(id0.tobytes(), []).append(k)
+
+    P_WT = np.nan * np.ones([nF, WF.nWT])
+    U_WT = np.nan * np.ones([nF, WF.nWT])
+    Ct = np.nan * np.ones([nF, WF.nWT])
+    # Number of (flow case, source, target) wake deficit evaluations
+    n_wake = 0
+
+    for ks in groups.values():
+        id0 = id0_u[ks[0]]
+        iC = np.nonzero(np.isin(iWD, ks))[0]
+        xy = xy_u[iWD[iC]]              # (nC, 2, nWT)
+        cTI = TI[iC][:, None]
+        nC = len(iC)
+
+        # Initialize arrays to NaN
+        gCt = np.nan * np.ones([nC, WF.nWT])
+
+        # Initialize velocity to undisturbed eq ws
+        gU_WT = WS_inf[iC][:, None] * np.ones([nC, WF.nWT])
+        gU_WT0 = gU_WT.copy()
+        DU_sq = 0. * gU_WT
+
+        for i in range(WF.nWT):
+            #Current wind turbine starting from the most upstream
+            cWT = id0[i]
+            cR = WF.WT[cWT].R
+            # Current hub wind speed of every flow case
+            cU = gU_WT[:, cWT]
+            gCt[:, cWT] = get_P_CT(WF, cU, cols=cWT)[1]
+            cCT = gCt[:, cWT][:, None]
+
+            # Extreme wake to define WT's in each wake, including partial
+            # wakes. Only the wake candidates of the directions are checked
+            cand = np.unique(np.concatenate(
+                [cand_u[k][1][cand_u[k][0][cWT]:cand_u[k][0][cWT+1]] for k in ks]))
+            x_c = xy[:, 0, cand] - xy[:, 0, cWT][:, None]
+            y_c = xy[:, 1, cand] - xy[:, 1, cWT][:, None]
+            in_wake = (get_Rw(x=x_c, R=cR, TI=cTI, CT=0.99, pars=pars)
+                       > np.abs(y_c) + allR[cand])
+            iW = in_wake.any(axis=0).nonzero()[0]
+            if len(iW) == 0:
+                continue
+            ID_wake = cand[iW]
+            n_wake += nC * len(ID_wake)
+
+            #Radial coordinates in cWT for wake affected WT's
+            x = x_c[:, iW]
+            r_Ri = np.abs(y_c[:, iW])
+            th_Ri = np.pi*(np.sign(y_c[:, iW]) + 1.0)
+
+            # Wake shape coefficients of the current turbine in each flow case
+            wake = WakeCoefficients(R=cR, TI=cTI[:, :, None], CT=cCT[:, :, None],
+                                    pars=pars)
+
+            # Get all the wake radius at the position of the -in wake- downstream turbines
+            RW = get_Rw(x=x[:, None, :], coefs=wake)
+
+            # Tensorial extension [case, quadrature point, turbine] of the
+            # points of evaluation to perform Gaussian quadrature
+            shape = (nC, NG**2, len(ID_wake))
+            downR = allR[ID_wake][None, None, :]
+            r_eval = np.sqrt(r_Ri[:, None, :]**2.0 +
+                             (downR * (rk + 1.) / 2.0)**2. +
+                             r_Ri[:, None, :] * downR * (rk + 1.) *
+                             np.cos(th_Ri[:, None, :] - np.pi*(tj + 1.)))
+
+            # Eval wake velocity deficit
+            DU_m = get_dU(x=np.broadcast_to(x[:, None, :], shape),
+                          r=r_eval,
+                          Rw=np.broadcast_to(RW, shape),
+                          U=cU[:, None, None], coefs=wake)
+
+            localDU = np.sum((1./4.)*wj*wk*DU_m*(rk+1.0), axis=1)
+            localDU *= in_wake[:, iW]
+
+            # Wake superposition
+            if sup == 'lin':
+                gU_WT[:, ID_wake] = gU_WT[:, ID_wake] + localDU
+                gU_WT[gU_WT<0.]=0.
+            elif sup == 'quad':
+                DU_sq[:, ID_wake] = DU_sq[:, ID_wake] + localDU**2.
+                gU_WT = gU_WT0 - np.sqrt(DU_sq)
+                gU_WT[gU_WT<0.]=0.
+
+        # Power of all the turbines and flow cases of the group at once
+        gP_WT = get_P_CT(WF, gU_WT)[0]
+
+        P_WT[iC], U_WT[iC], Ct[iC] = gP_WT, gU_WT, gCt
+
+    if stats is not None:
+        stats.count(flow_cases=nF, source_turbines=nF * WF.nWT,
+                    wake_pairs_evaluated=n_wake,
+                    wake_pairs_pruned=nF * WF.nWT * (WF.nWT - 1) - n_wake,
+                    quadrature_points=n_wake * NG**2)
+
+    return (P_WT,U_WT,Ct)
+
+class GCLarsenIncremental(object):
+    """GCLarsen flow cases kept between changes of the layout of the wind
+    farm, e.g. in a layout optimization moving a few turbines at a time.
+
+    The wake velocity deficit of every (source, target) pair of turbines is
+    kept for each flow case. After some turbines moved (WindFarm.move), the
+    update only evaluates again the wakes of the turbines that moved, that
+    have moved turbines in their wake, or whose inflow changed, and the
+    inflow of the turbines in these wakes: the downstream closure of the
+    moved turbines in the wake dependency graph. It needs O(nF nWT^2) memory.
+
+    Example
+    -------
+        > inc = GCLarsenIncremental(WF, WS, WD, TI)
+        > WF.move(3, [x, y])
+        > P_WT, U_WT, Ct = inc.update()
+
+    Attributes
+    ----------
+    wakes_evaluated: int
+        Number of wakes of turbines evaluated by the last solve or update,
+        over all the flow cases
+    """
+    def __init__(self, WF, WS, WD, TI,
+        z0=0.0001, alpha=0.101, inflow='log', NG=4, sup='lin',
+        pars=[0.435449861,0.797853685,-0.124807893,0.136821858,15.6298,1.0]):
+        """Initializes a GCLarsenIncremental object and solves its flow cases
+
+        Parameters
+        ----------
+        WF: WindFarm
+            Windfarm instance
+        WS, WD, TI: float or ndarray
+            Flow cases (nF), see GCLarsen_batch
+        z0, alpha, inflow, NG, sup, pars: optional
+            See GCLarsen
+        """
+        self.WF = WF
+        self.WS, self.WD, self.TI = [np.array(v, dtype=float) for v in
+                                     np.broadcast_arrays(np.atleast_1d(WS), np.atleast_1d(WD),
+                                                         np.atleast_1d(TI))]
+        self.NG, self.sup, self.pars = NG, sup, pars
+        self.allR = np.array(WF.R, dtype=float)
+        nF, nWT = len(self.WS), WF.nWT
+
+        # Equivalent inflow wind speed of the flow cases
+        if inflow == 'log':
+            kappa = 0.4 # Kappa: von karman constant
+            us = self.WS * kappa / np.log(WF.WT[0].H / z0)  # friction velocity
+            self.WS_inf = np.array([gaussN(WF.WT[0].R, Ua, [WF.WT[0].H, u, z0]).sum()
+                                    for u in us])
+        elif inflow == 'pow':
+            self.WS_inf = np.array([gaussN(WF.WT[0].R, Ua_shear, [WF.WT[0].H, ws, alpha]).sum()
+                                    for ws in self.WS])
+
+        self.U_WT = self.WS_inf[:, None] * np.ones([nF, nWT])
+        self.Ct = np.zeros([nF, nWT])
+        # Wake velocity deficit of the turbine i at the turbine j: DU[:, i, j]
+        self.DU = np.zeros([nF, nWT, nWT])
+        # The turbine j is in the wake of the turbine i: in_wake[:, i, j]
+        self.in_wake = np.zeros([nF, nWT, nWT], dtype=bool)
+        self.xyz = None
+        self.wakes_evaluated = 0
+        self.solve()
+
+    def solve(self):
+        """Solves all the flow cases for the current layout
+
+        Returns
+        -------
+        P_WT, U_WT, Ct: ndarray
+            Outputs of the flow cases (nF, nWT), see GCLarsen_batch
+        """
+        return self._solve(np.arange(self.WF.nWT))
+
+    def update(self):
+        """Solves again the flow cases after some turbines moved, only
+        evaluating the wakes affected by the turbines that moved since the
+        last solve or update
+
+        Returns
+        -------
+        P_WT, U_WT, Ct: ndarray
+            Outputs of the flow cases (nF, nWT), see GCLarsen_batch
+        """
+        if self.xyz is None or self.xyz.shape != self.WF.xyz.shape:
+            return self.solve()
+        moved = np.nonzero((self.WF.xyz != self.xyz).any(axis=0))[0]
+        return self._solve(moved)
+
+    def _solve(self, moved):
+        WF = self.WF
+        self.xyz = np.array(WF.xyz, dtype=float)
+        self.wakes_evaluated = 0
+        for k in range(len(self.WS)):
+            self._solve_case(k, moved)
+        P_WT = get_P_CT(WF, self.U_WT)[0]
+        return P_WT, self.U_WT.copy(), self.Ct.copy()
+
+    def _in_wake(self, x_f, y_f, src, tgt, TI):
+        """Extreme wake test of GCLarsen between the turbines src and tgt"""
+        allR = self.allR
+        dx = x_f[tgt][None, :] - x_f[src][:, None]
+        dy = y_f[tgt][None, :] - y_f[src][:, None]
+        with np.errstate(invalid='ignore'): # No wake upstream of the rotor
+            Rw = get_Rw(x=dx, R=allR[src][:, None], TI=TI, CT=0.99, pars=self.pars)
+        return (dx > 0.) & (Rw > np.abs(dy) + allR[tgt][None, :])
+
+    def _solve_case(self, k, moved):
+        WF, NG, pars = self.WF, self.NG, self.pars
+        TI, WS_inf = self.TI[k], self.WS_inf[k]
+        U_WT, Ct, DU, W = self.U_WT[k], self.Ct[k], self.DU[k], self.in_wake[k]
+        (x_f, y_f), id0 = WF.turbineFlowCoord(self.WD[k])
+        allR = self.allR
+        everyone = np.arange(WF.nWT)
+
+        # The targets of the moved turbines, before and after moving, and the
+        # moved turbines need a new inflow
+        stale = np.zeros(WF.nWT, dtype=bool)
+        stale[moved] = True
+        stale |= W[moved].any(axis=0)
+        # The sources with moved turbines in their wake, before or after
+        # moving, and the moved turbines need new wakes
+        dirty = np.zeros(WF.nWT, dtype=bool)
+        dirty[moved] = True
+        dirty |= W[:, moved].any(axis=1)
+        W[moved, :] = self._in_wake(x_f, y_f, moved, everyone, TI)
+        W[:, moved] = self._in_wake(x_f, y_f, everyone, moved, TI)
+        dirty |= W[:, moved].any(axis=1)
+
+        # Rank of the turbines from the most upstream
+        rank = np.empty(WF.nWT, dtype=int)
+        rank[id0] = everyone
+
+        # Gauss quadrature points
+        tj, rk, wj, wk = [a[:, None] for a in rotor_disk(NG)]
+
+        for cWT in id0:
+            if stale[cWT]:
+                # Superposition of the wakes in the order of the sweep of GCLarsen
+                src = np.nonzero(W[:, cWT])[0]
+                src = src[np.argsort(rank[src])]
+                u = WS_inf
+                if self.sup == 'lin':
+                    for i in src:
+                        u = max(u + DU[i, cWT], 0.)
+                elif self.sup == 'quad':
+                    DU_sq = 0.
+                    for i in src:
+                        DU_sq = DU_sq + DU[i, cWT]**2.
+                    u = max(WS_inf - np.sqrt(DU_sq), 0.)
+                if u != U_WT[cWT]:
+                    U_WT[cWT] = u
+                    dirty[cWT] = True
+            if not dirty[cWT]:
+                continue
+
+            # Wake of the current turbine
+            cU = U_WT[cWT]
+            Ct[cWT] = get_P_CT(WF, cU, cols=cWT)[1]
+            ID_wake = np.nonzero(W[cWT])[0]
+            DU[cWT, :] = 0.
+            stale[ID_wake] = True
+            self.wakes_evaluated += 1
+            if len(ID_wake) == 0:
+                continue
+
+            #Radial coordinates in cWT for wake affected WT's
+            x = x_f[ID_wake] - x_f[cWT]
+            y = y_f[ID_wake] - y_f[cWT]
+            r_Ri = np.abs(y)
+            th_Ri = np.pi*(np.sign(y) + 1.0)
+
+            wake = WakeCoefficients(R=allR[cWT], TI=TI, CT=Ct[cWT], pars=pars)
+            RW = get_Rw(x=x, coefs=wake)
+
+            # Points of evaluation [quadrature point, turbine]
+            downR = allR[ID_wake]
+            r_eval = np.sqrt(r_Ri**2.0 +
+                             (downR * (rk + 1.) / 2.0)**2. +
+                             r_Ri * downR * (rk + 1.) * np.cos(th_Ri - np.pi*(tj + 1.)))
+            shape = r_eval.shape
+            DU_m = get_dU(x=np.broadcast_to(x, shape), r=r_eval,
+                          Rw=np.broadcast_to(RW, shape), U=cU, coefs=wake)
+            DU[cWT, ID_wake] = np.sum((1./4.)*wj*wk*DU_m*(rk+1.0), axis=0)
+
+def grid_points(x, y, z, chunk_size=65536):
+    """Points of a regular grid, generated by chunks without building the
+    whole grid. The points follow the C order of the grid (nz, ny, nx).
+    Parameters
+    ----------
+    x, y, z: float or ndarray
+        Coordinates of the grid lines [m]
+    chunk_size: int, optional
+        Largest number of points of a chunk
+    Returns
+    -------
+    chunks: generator
+        Points of the grid (3, n), n <= chunk_size
+    """
+    x, y, z = [np.atleast_1d(np.asarray(a, dtype=float)) for a in [x, y, z]]
+    shape = (len(z), len(y), len(x))
+    n = len(x) * len(y) * len(z)
+    for start in range(0, n, chunk_size):
+        k, j, i = np.unravel_index(np.arange(start, min(start + chunk_size, n)), shape)
+        yield np.vstack([x[i], y[j], z[k]])
+
+class GCLFlowMap(object):
+    """Wind speed field of a solved GCLarsen flow case, evaluated at any
+    points of the flow, e.g. for high resolution flow maps of a wind farm.
+
+    The points are processed by chunks of fixed size, and the wind speeds
+    can be written in a memory-mapped file, so that the memory needed does
+    not depend on the number of points. The wake of each turbine is only
+    evaluated at the points of a chunk inside of the box bounding its wake
+    radius over the chunk.
+
+    Example
+    -------
+        > P_WT, U_WT, Ct = GCLarsen(WF, WS, WD, TI)
+        > flow_map = GCLFlowMap(WF, WD, TI, U_WT, Ct, U0=WS)
+        > U = flow_map.grid(x, y, filename='flow_map.npy')
+
+    Attributes
+    ----------
+    points_evaluated: int
+        Number of wake velocity deficits evaluated at the points, over all
+        the wakes
+    """
+    def __init__(self, WF, WD, TI, U_WT, Ct, U0, sup='lin',
+        pars=[0.435449861,0.797853685,-0.124807893,0.136821858,15.6298,1.0],
+        chunk_size=65536):
+        """Initializes a GCLFlowMap object
+
+        Parameters
+        ----------
+        WF: WindFarm
+            Windfarm instance
+        WD: float
+            Undisturbed wind direction at hub height [deg]
+        TI: float
+            Ambient turbulence intensity [-]
+        U_WT, Ct: ndarray
+            Wind speeds [m/s] and thrust coefficients [-] of the turbines
+            in the flow case (nWT), as given by GCLarsen
+        U0: float
+            Undisturbed wind speed of the points [m/s]
+        sup: str, optional
+            Wake velocity deficit superposition method: 'lin' or 'quad'
+        pars: list, optional
+            GCL Model parameters [a1, a2, a3, a4, b1, b2]
+        chunk_size: int, optional
+            Number of points evaluated at once
+        """
+        self.WF, self.WD, self.U0, self.sup = WF, WD, U0, sup
+        self.chunk_size = chunk_size
+        (self.x_t, self.y_t), _ = WF.turbineFlowCoord(WD)
+        self.z_t = np.array(WF.xyz[2], dtype=float)
+        self.U_WT = np.asarray(U_WT, dtype=float)
+        # Wake shape coefficients of the turbines, None without a wake
+        self.wakes = [WakeCoefficients(R=WF.WT[i].R, TI=TI, CT=Ct[i], pars=pars)
+                      if Ct[i] > 0. else None for i in range(WF.nWT)]
+        self.points_evaluated = 0
+
+    def __call__(self, points):
+        """Wind speed at some points
+
+        Parameters
+        ----------
+        points: ndarray
+            Points coordinates (3, n) [m]
+
+        Returns
+        -------
+        U: ndarray
+            Wind speed at the points (n) [m/s]
+        """
+        points = np.asarray(points, dtype=float)
+        n = points.shape[1]
+        return self.evaluate(points[:, i:i + self.chunk_size]
+                             for i in range(0, n, self.chunk_size))
+
+    def evaluate(self, chunks, out=None):
+        """Wind speed at the points given by chunks
+
+        Parameters
+        ----------
+        chunks: iterable
+            Chunks of points (3, m) [m], e.g. a generator
+        out: ndarray, optional
+            Flat output array of the total number of points (e.g. a
+            np.memmap), filled chunk by chunk. By default the wind speeds of
+            the chunks are concatenated.
+
+        Returns
+        -------
+        U: ndarray
+            Wind speed at the points [m/s]
+        """
+        outputs, start = [], 0
+        for points in chunks:
+            U = self._chunk(np.asarray(points, dtype=float))
+            if out is None:
+                outputs.append(U)
+            else:
+                out[start:start + len(U)] = U
+            start += len(U)
+        if out is None:
+            return np.concatenate(outputs) if outputs else np.zeros(0)
+        return out
+
+    def grid(self, x, y, z=None, filename=None):
+        """Wind speed on a regular grid
+
+        Parameters
+        ----------
+        x, y: ndarray
+            Coordinates of the grid lines [m]
+        z: float or ndarray, optional
+            Heights of the grid [m]. Default to the hub height of the first
+            turbine.
+        filename: str, optional
+            The wind speeds are written in this .npy file, memory-mapped
+            instead of being kept in memory
+
+        Returns
+        -------
+        U: ndarray
+            Wind speed at the points of the grid [m/s] (ny, nx), or
+            (nz, ny, nx) when z is an array. A np.memmap with filename.
+        """
+        if z is None:
+            z = self.WF.WT[0].H
+        shape = (np.size(z), len(y), len(x))
+        if filename is None:
+            U = np.empty(shape)
+        else:
+            U = np.lib.format.open_memmap(filename, mode='w+', dtype=float, shape=shape)
+        self.evaluate(grid_points(x, y, z, self.chunk_size), out=U.reshape(-1))
+        if filename is not None:
+            U.flush()
+        return U if np.ndim(z) > 0 else U[0]
+
+    def _chunk(self, points):
+        x_f, y_f = self.WF.toFlowCoord(self.WD, points[:2])
+        z = points[2]
+        DU = np.zeros(len(z))
+        y_min, y_max, z_min, z_max = y_f.min(), y_f.max(), z.min(), z.max()
+        for i, wake in enumerate(self.wakes):
+            if wake is None:
+                continue
+            x = x_f - self.x_t[i]
+            x_max = x.max()
+            if not x_max > 0.:
+                continue
+            # The wake radius grows downstream: bounding half width of the
+            # wake over the chunk
+            W = get_Rw(x=np.array([x_max]), coefs=wake)[0]
+            if (y_min > self.y_t[i] + W or y_max < self.y_t[i] - W or
+                    z_min > self.z_t[i] + W or z_max < self.z_t[i] - W):
+                continue
+            y, dz = y_f - self.y_t[i], z - self.z_t[i]
+            ID = np.nonzero((x > 0.) & (np.abs(y) < W) & (np.abs(dz) < W))[0]
+            if len(ID) == 0:
+                continue
+            x = x[ID]
+            dU = get_dU(x=x, r=np.sqrt(y[ID]**2. + dz[ID]**2.),
+                        Rw=get_Rw(x=x, coefs=wake), U=self.U_WT[i], coefs=wake)
+            if self.sup == 'lin':
+                DU[ID] += dU
+            elif self.sup == 'quad':
+                DU[ID] += dU**2.
+            self.points_evaluated += len(ID)
+
+        if self.sup == 'lin':
+            U = self.U0 + DU
+        elif self.sup == 'quad':
+            U = self.U0 - np.sqrt(DU)
+        U[U < 0.] = 0.
+        return U
+
+def _GCL_P_GaussQ_WD(WF, WS, meanWD, dWD, TI, xi, wi, **kwargs):
+    """Quadrature average of GCLarsen over the wind direction, solving the
+    quadrature directions of all the flow cases in one call of GCLarsen_batch
+    Parameters
+    ----------
+    WF: WindFarm
+        Windfarm instance
+    WS, meanWD, dWD, TI: float or ndarray
+        Wind speed, mean wind direction, scale of the wind direction
+        deviations and turbulence intensity of the flow cases (nF)
+    xi, wi: ndarray
+        Nodes and weights of the quadrature (NG_P), the weights including the
+        normalization of the distribution
+    kwargs: dict
+        Other inputs of GCLarsen_batch
+    Returns
+    -------
+    P_WT, U_WT, CT_WT: ndarray
+        Mean of the outputs of GCLarsen_batch (nWT) or (nF, nWT)
+    """
+    scalar = all(np.ndim(v) == 0 for v in [WS, meanWD, dWD, TI])
+    WS, meanWD, dWD, TI = [np.array(v, dtype=float) for v in
+                           np.broadcast_arrays(np.atleast_1d(WS), np.atleast_1d(meanWD),
+                                               np.atleast_1d(dWD), np.atleast_1d(TI))]
+    nF, NG_P = len(WS), len(xi)
+    # All the quadrature directions of all the flow cases (nF * NG_P)
+    WD = meanWD[:, None] + dWD[:, None] * xi[None, :]
+    outputs = GCLarsen_batch(WF=WF,
+                             WS=np.repeat(WS, NG_P),
+                             WD=WD.ravel(),
+                             TI=np.repeat(TI, NG_P),
+                             **kwargs)
+    means = tuple(np.einsum('j,ijk->ik', wi, out.reshape(nF, NG_P, WF.nWT))
+                  for out in outputs)
+    if scalar: # We are only returning a 1D array
+        means = tuple(m[0] for m in means)
+    return means
+
 def GCL_P_GaussQ_Norm_U_WD(WF, WS, meanWD, stdWD, NG_P, TI,
     z0=0.0001, alpha=0.101, inflow='log', NG=4, sup='lin',
     pars=[0.435449861, 0.797853685, -0.124807893, 0.136821858, 15.6298, 1.0]):
     """Computes the Gaussian quadrature average of GCLarsen
     power/WS prediction under normally distributed wind direction
     uncertainty inside the Reynolds averaging time
+
+    The quadrature directions of all the flow cases are solved at once by
+    GCLarsen_batch.
     Parameters
     ----------
     WF: WindFarm
         Windfarm instance
-    WS: float
-        Undisturbed wind speed at hub height [m/s]
-    meanWD: float
-        Mean wind direction [deg]
-    stdWD: float
-        Std wind direction [deg]
+    WS: float or ndarray
+        Undisturbed wind speed at hub height [m/s] (nF)
+    meanWD: float or ndarray
+        Mean wind direction [deg] (nF)
+    stdWD: float or ndarray
+        Std wind direction [deg] (nF)
     NG_P: int
         Number of Gaussian quadrature points for power avg.
-    WS: float
-        Undisturbed wind speed at hub height [m/s]
-    z0: float
-        Roughness height [m]
-    TI: float
-        Ambient turbulence intensity
+    TI: float or ndarray
+        Ambient turbulence intensity (nF)
     z0: float, optional
         Roughness height [m]
     alpha: float, optional
@@ -546,60 +1301,41 @@ def GCL_P_GaussQ_Norm_U_WD(WF, WS, meanWD, stdWD, NG_P, TI,
     Returns
     -------
     P_WT: ndarray
-         Mean Power production of the wind turbines (nWT,1) [W]
+         Mean Power production of the wind turbines (nWT) or (nF,nWT) [W]
     U_WT: ndarray
-         Mean Wind speed at hub height (nWT,1) [m/s]
+         Mean Wind speed at hub height (nWT) or (nF,nWT) [m/s]
     CT_WT: ndarray
         Mean thrust coefficient [-]
     """
-
-    xi, wi = np.polynomial.hermite.hermgauss(NG_P)
-
-    meanP_WT = np.zeros([WF.nWT])
-    meanU_WT = np.zeros([WF.nWT])
-    meanCT_WT = np.zeros([WF.nWT])
-    for i in range(NG_P):
-        P_WT,U_WT,CT_WT = GCLarsen(
-                            WF=WF,
-                            WS=WS,
-                            WD=meanWD+np.sqrt(2.)*stdWD*xi[i],
-                            TI=TI,
-                            z0=z0,
-                            alpha=alpha,
-                            inflow=inflow,
-                            NG=NG,
-                            sup=sup,
+    xi, wi = gauss_hermite(NG_P)
+    return _GCL_P_GaussQ_WD(WF, WS, meanWD, np.sqrt(2.)*np.asarray(stdWD), TI,
+                            xi, wi*(1./np.sqrt(np.pi)),
+                            z0=z0, alpha=alpha, inflow=inflow, NG=NG, sup=sup,
                             pars=pars)
-        meanP_WT += wi[i]*P_WT*(1./np.sqrt(np.pi))
-        meanU_WT += wi[i]*U_WT*(1./np.sqrt(np.pi))
-        meanCT_WT += wi[i]*CT_WT*(1./np.sqrt(np.pi))
-
-    return meanP_WT, meanU_WT, meanCT_WT
 
 def GCL_P_GaussQ_Uni_U_WD(WF,WS,meanWD,U_WD,NG_P,TI,
     z0=0.0001,alpha=0.101,inflow='log',NG=4,sup='lin',
     pars=[0.435449861,0.797853685,-0.124807893,0.136821858,15.6298,1.0]):
     """Computes the Gaussian quadrature average of GCLarsen
-    power/WS prediction under normally distributed wind direction
+    power/WS prediction under uniformly distributed wind direction
     uncertainty
+
+    The quadrature directions of all the flow cases are solved at once by
+    GCLarsen_batch.
     Parameters
     ----------
     WF: WindFarm
         Windfarm instance
-    WS: float
-        Undisturbed wind speed at hub height [m/s]
-    meanWD: float
-        Mean wind direction [deg]
-    stdWD: float
-        Std wind direction [deg]
+    WS: float or ndarray
+        Undisturbed wind speed at hub height [m/s] (nF)
+    meanWD: float or ndarray
+        Mean wind direction [deg] (nF)
+    U_WD: float or ndarray
+        Half width of the wind direction interval [deg] (nF)
     NG_P: int
         Number of Gaussian quadrature points for power avg.
-    WS: float
-        Undisturbed wind speed at hub height [m/s]
-    z0: float
-        Roughness height [m]
-    TI: float
-        Ambient turbulence intensity
+    TI: float or ndarray
+        Ambient turbulence intensity (nF)
     z0: float, optional
         Roughness height [m]
     alpha: float, optional
@@ -619,35 +1355,16 @@ def GCL_P_GaussQ_Uni_U_WD(WF,WS,meanWD,U_WD,NG_P,TI,
     Returns
     -------
     P_WT: ndarray
-        Mean Power production of the wind turbines (nWT,1) [W]
+        Mean Power production of the wind turbines (nWT) or (nF,nWT) [W]
     U_WT: ndarray
-         Mean Wind speed at hub height (nWT,1) [m/s]
+         Mean Wind speed at hub height (nWT) or (nF,nWT) [m/s]
     CT_WT: ndarray
          Mean thrust coefficient [-]
     """
-
-    xi, wi = np.polynomial.legendre.leggauss(NG_P)
-
-    meanP_WT = np.zeros([WF.nWT])
-    meanU_WT = np.zeros([WF.nWT])
-    meanCT_WT = np.zeros([WF.nWT])
-    for i in range(NG_P):
-        P_WT,U_WT,CT_WT = GCLarsen(
-                            WF=WF,
-                            WS=WS,
-                            WD=meanWD+U_WD*xi[i],
-                            TI=TI,
-                            z0=z0,
-                            alpha=alpha,
-                            inflow=inflow,
-                            NG=NG,
-                            sup=sup,
+    xi, wi = gauss_legendre(NG_P)
+    return _GCL_P_GaussQ_WD(WF, WS, meanWD, U_WD, TI, xi, wi*1./2.,
+                            z0=z0, alpha=alpha, inflow=inflow, NG=NG, sup=sup,
                             pars=pars)
-        meanP_WT += wi[i]*P_WT*1./2.
-        meanU_WT += wi[i]*U_WT*1./2.
-        meanCT_WT += wi[i]*CT_WT*1./2.
-
-    return meanP_WT,meanU_WT,meanCT_WT
 '''
 print get_r96(D=80.0,CT=0.5,TI=0.05)
 print
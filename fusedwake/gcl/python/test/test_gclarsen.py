@@ -72,7 +72,8 @@ script_dir = os.path.dirname(os.path.realpath(__file__))
 
 class GCLarsen_v2_TestCase(unittest.TestCase):
     def setUp(self):
-        self.v80 = wt.WindTurbine('Vestas v80 2MW offshore', script_dir+'/V80_2MW_offshore.dat', 70,40)
+        self.v80 = wt.WindTurbine('Vestas v80 2MW offshore',
+            np.loadtxt(script_dir+'/V80_2MW_offshore.dat', delimiter=',', comments='%'), 70,40)
         self.HR1 = wf.WindFarm(name='Horns Rev 1', coordFile=script_dir+'/HR_coordinates.dat', WT=self.v80)
         self.inputs = dict(
             WS=8.0,
@@ -100,6 +101,167 @@ class GCLarsen_v2_TestCase(unittest.TestCase):
        np.testing.assert_almost_equal(U_WT, U_WT2)
        np.testing.assert_almost_equal(Ct, Ct2)
 
+    def test_GCLarsen_batch(self):
+        """Testing that the batched implementation of GCLarsen gives the same
+        results as solving the flow cases one by one.
+        """
+        inputs = dict(self.inputs)
+        WS = np.array([8.0, 11.0, 8.0, 26.0])
+        WD = np.array([270.0, 270.0, 222.0, 5.0])
+        TI = np.array([0.05, 0.07, 0.10, 0.05])
+        for sup in ['lin', 'quad']:
+            inputs.update(WS=WS, WD=WD, TI=TI, sup=sup)
+            P_WT, U_WT, Ct = gcl.GCLarsen_batch(**inputs)
+            self.assertEqual(P_WT.shape, (len(WS), self.HR1.nWT))
+            for i in range(len(WS)):
+                if WS[i] > self.v80.u_cutout:
+                    continue # GCLarsen does not handle cut-out
+                inputs.update(WS=WS[i], WD=WD[i], TI=TI[i])
+                P_WT2, U_WT2, Ct2 = gcl.GCLarsen(**inputs)
+                np.testing.assert_almost_equal(P_WT[i], P_WT2)
+                np.testing.assert_almost_equal(U_WT[i], U_WT2)
+                np.testing.assert_almost_equal(Ct[i], Ct2)
+
+    def test_GCLarsen_grad(self):
+        """Testing that the derivatives of the power given by GCLarsen are
+        the ones of finite differences.
+        """
+        inputs = dict(self.inputs, WD=273.0)
+        nWT = self.HR1.nWT
+        for sup in ['lin', 'quad']:
+            inputs.update(sup=sup)
+            P_WT, U_WT, Ct, dP_WT = gcl.GCLarsen(grad=['pos', 'TI'], **inputs)
+            self.assertEqual(dP_WT.shape, (nWT, 2 * nWT + 1))
+            np.testing.assert_array_equal(P_WT, gcl.GCLarsen(**inputs)[0])
+            pos = self.HR1.pos.copy()
+            h = 1.0E-3
+            for j in [0, 5, 45, nWT + 5, nWT + 45]:
+                P = []
+                for dx in [h, -h]:
+                    pos2 = pos.copy()
+                    pos2.flat[j] += dx
+                    self.HR1.set_layout(pos2)
+                    P.append(gcl.GCLarsen(**inputs)[0].sum())
+                self.HR1.set_layout(pos)
+                np.testing.assert_allclose(dP_WT[:, j].sum(), (P[0] - P[1]) / (2. * h),
+                                           rtol=1.0E-4, atol=1.0E-2)
+            h = 1.0E-6
+            P = [gcl.GCLarsen(**dict(inputs, TI=inputs['TI'] + dx))[0].sum()
+                 for dx in [h, -h]]
+            np.testing.assert_allclose(dP_WT[:, -1].sum(), (P[0] - P[1]) / (2. * h),
+                                       rtol=1.0E-6)
+
+    def test_GaussQ_U_WD(self):
+        """Testing that the wind direction averages of several flow cases give
+        the quadrature of GCLarsen in each flow case.
+        """
+        inputs = dict(self.inputs)
+        del inputs['WS'], inputs['WD'], inputs['TI']
+        WS = np.array([8.0, 11.0])
+        WD = np.array([270.0, 222.0])
+        TI = np.array([0.05, 0.07])
+        # Averaging function, quadrature rule, name and value of the wind
+        # direction scale, and scaling of the nodes
+        for average, quadrature, name, dWD, scale in [
+                (gcl.GCL_P_GaussQ_Norm_U_WD, gcl.gauss_hermite, 'stdWD', 5.0, np.sqrt(2.)),
+                (gcl.GCL_P_GaussQ_Uni_U_WD, gcl.gauss_legendre, 'U_WD', 10.0, 1.0)]:
+            xi, wi = quadrature(3)
+            xi, wi = scale * xi, wi / wi.sum()
+            inputs[name] = dWD
+            outputs = average(WS=WS, meanWD=WD, NG_P=3, TI=TI, **inputs)
+            del inputs[name]
+            for i in range(len(WS)):
+                means = [0., 0., 0.]
+                for j in range(3):
+                    outputs2 = gcl.GCLarsen(WS=WS[i], WD=WD[i] + dWD * xi[j], TI=TI[i],
+                                            **inputs)
+                    means = [m + wi[j] * o for m, o in zip(means, outputs2)]
+                for out, mean in zip(outputs, means):
+                    np.testing.assert_almost_equal(out[i], mean)
+
+    def test_GCLarsenIncremental(self):
+        """Testing that the incremental solves after moving turbines give the
+        results of GCLarsen on the new layout, evaluating fewer wakes.
+        """
+        inputs = dict(self.inputs)
+        WS = np.array([8.0, 11.0])
+        WD = np.array([270.0, 222.0])
+        inc = gcl.GCLarsenIncremental(self.HR1, WS, WD, 0.05, sup='quad',
+                                      pars=inputs['pars'])
+        n_full = inc.wakes_evaluated
+        pos = self.HR1.pos.copy()
+        self.HR1.move([5, 40], pos[:, [5, 40]] + [[30., 60.], [-50., 10.]])
+        P_WT, U_WT, Ct = inc.update()
+        self.assertLess(inc.wakes_evaluated, n_full)
+        inputs.update(TI=0.05, sup='quad')
+        for i in range(len(WS)):
+            inputs.update(WS=WS[i], WD=WD[i])
+            P_WT2, U_WT2, Ct2 = gcl.GCLarsen(**inputs)
+            np.testing.assert_almost_equal(P_WT[i], P_WT2)
+            np.testing.assert_almost_equal(U_WT[i], U_WT2)
+            np.testing.assert_almost_equal(Ct[i], Ct2)
+
+    def test_flow_map(self):
+        """Testing that the flow map streamed by chunks in a memory-mapped
+        file gives the superposition of all the wakes at the points.
+        """
+        import tempfile
+        inputs = dict(self.inputs, WD=222.0)
+        P_WT, U_WT, Ct = gcl.GCLarsen(**inputs)
+        x = np.linspace(self.HR1.pos[0].min() - 500., self.HR1.pos[0].max() + 500., 60)
+        y = np.linspace(self.HR1.pos[1].min() - 500., self.HR1.pos[1].max() + 500., 40)
+        z = np.array([40., 70., 100.])
+        pars = inputs['pars']
+        for sup in ['lin', 'quad']:
+            flow_map = gcl.GCLFlowMap(self.HR1, 222.0, 0.05, U_WT, Ct, U0=8.0,
+                                      sup=sup, pars=pars)
+            U = flow_map.grid(x, y, z)
+            self.assertEqual(U.shape, (3, 40, 60))
+            # Only the points in the wake envelopes are evaluated
+            self.assertLess(flow_map.points_evaluated, 0.2 * U.size * self.HR1.nWT)
+            flow_map.chunk_size = 777
+            with tempfile.NamedTemporaryFile(suffix='.npy') as f:
+                U2 = flow_map.grid(x, y, z, filename=f.name)
+                np.testing.assert_array_equal(np.load(f.name), U)
+                del U2
+            # All the wakes evaluated at every point
+            points = np.vstack([a.ravel() for a in np.meshgrid(x, y, z, indexing='ij')])
+            (x_f, y_f), _ = self.HR1.turbineFlowCoord(222.0)
+            X, Y = self.HR1.toFlowCoord(222.0, points[:2])
+            DU = np.zeros(points.shape[1])
+            for i in range(self.HR1.nWT):
+                dx = X - x_f[i]
+                r = np.sqrt((Y - y_f[i])**2. + (points[2] - self.HR1.xyz[2, i])**2.)
+                with np.errstate(invalid='ignore'):
+                    Rw = gcl.get_Rw(x=dx, R=40., TI=0.05, CT=Ct[i], pars=pars)
+                    dU = gcl.get_dU(x=dx, r=r, Rw=Rw, U=U_WT[i], R=40., TI=0.05,
+                                    CT=Ct[i], pars=pars)
+                DU += dU if sup == 'lin' else dU**2.
+            U3 = 8.0 + DU if sup == 'lin' else 8.0 - np.sqrt(DU)
+            np.testing.assert_allclose(U3.clip(0.).reshape((60, 40, 3)).transpose(),
+                                       U, rtol=1.0E-12)
+
+    def test_wake_coefficients(self):
+        """Testing that the wake coefficients computed for several flow cases
+        at once give the wake of each flow case.
+        """
+        pars = self.inputs['pars']
+        x = np.array([-100., 0., 200., 560., 2000.])
+        r = np.array([0., 10., 30., 50., 80.])
+        TI = np.array([[0.05], [0.1]])
+        CT = np.array([[0.8], [0.3]])
+        coefs = gcl.WakeCoefficients(R=40., TI=TI, CT=CT, pars=pars)
+        Rw = gcl.get_Rw(x=x*np.ones_like(TI), coefs=coefs)
+        for order in [1, 2]:
+            dU = gcl.get_dU(x=x*np.ones_like(TI), r=r*np.ones_like(TI), Rw=Rw,
+                            U=8., order=order, coefs=coefs)
+            for i in range(len(TI)):
+                Rw2 = gcl.get_Rw(x=x, R=40., TI=TI[i, 0], CT=CT[i, 0], pars=pars)
+                dU2 = gcl.get_dU(x=x, r=r, Rw=Rw2, U=8., R=40., TI=TI[i, 0],
+                                 CT=CT[i, 0], order=order, pars=pars)
+                np.testing.assert_almost_equal(Rw[i], Rw2)
+                np.testing.assert_almost_equal(dU[i], dU2)
+
 # class test_AEP(unittest.TestCase):
 #     def test_HR(self):
 #         ### Single wind rose type
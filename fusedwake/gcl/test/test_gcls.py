@@ -2,6 +2,7 @@
 import unittest
 import fusedwake.gcl.fortran as fgcl
 import fusedwake.gcl.python as gcl
+from fusedwake.gcl.jit import NUMBA
 import numpy as np
 import os
 
@@ -32,5 +33,38 @@ class TestGCLImplementations(unittest.TestCase):
         self.assertAlmostEqual(fgcl.get_r96(D, CT, TI, a1, a2, a3, a4, b1, b2),
                                 gcl.get_r96(D, CT, TI, pars=[a1, a2, a3, a4, b1, b2]))
 
+    def test_gcl_s_sp(self):
+        """The sparse wake pairs version gives the same results as gcl_s
+        """
+        from fusedwake.WindFarm import WindFarm
+        from fusedwake.gcl import GCL
+        WF = WindFarm(yml=current_dir + '/../../../examples/middelgrunden.yml')
+        for WD in [5.0, 135.0, 270.0]:
+            inputs = dict(WF=WF, WS=9.0, WD=WD, TI=0.07)
+            gcl_s = GCL(version='fort_gcl_s', **inputs)()
+            gcl_s_sp = GCL(version='fort_gcl_s_sp', **inputs)()
+            np.testing.assert_almost_equal(gcl_s.u_wt, gcl_s_sp.u_wt)
+            np.testing.assert_almost_equal(gcl_s.p_wt, gcl_s_sp.p_wt)
+
+    @unittest.skipIf(not NUMBA, 'Numba is not installed')
+    def test_jit_gcl(self):
+        """The Numba versions give the results of the Fortran versions
+        """
+        from fusedwake.WindFarm import WindFarm
+        from fusedwake.gcl import GCL
+        WF = WindFarm(yml=current_dir + '/../../../examples/middelgrunden.yml')
+        WS = np.array([5.0, 9.0, 13.0])
+        WD = np.array([5.0, 135.0, 270.0])
+        AV = np.ones([3, WF.nWT])
+        AV[1, :4] = 0
+        for v, inputs in [('gcl_s', dict(WS=9.0, WD=222.0, TI=0.07)),
+                          ('gcl', dict(WS=WS, WD=WD, TI=0.07, NG=5)),
+                          ('gcl_av', dict(WS=WS, WD=WD, TI=0.1, wt_available=AV))]:
+            fort = GCL(WF=WF, version='fort_' + v, **inputs)()
+            jit = GCL(WF=WF, version='jit_' + v, **inputs)()
+            np.testing.assert_allclose(jit.u_wt, fort.u_wt, rtol=1.0E-12)
+            np.testing.assert_allclose(jit.p_wt, fort.p_wt, rtol=1.0E-12)
+            np.testing.assert_allclose(jit.c_t, fort.c_t, rtol=1.0E-12)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,247 @@
+"""Instrumentation of the wake model runs
+
+A model run with `instrument=True` (or `instrument='memory'`) records the
+wall time (and peak allocation) of its phases and counts the work done in a
+RunStats object, available as the `stats` attribute of the model after the
+call. The statistics are also sent to the 'fusedwake' logger at the DEBUG
+level. Without instrumentation the models use NULL_STATS, which does nothing.
+
+The peak allocation of a phase is measured with tracemalloc when its peak
+can be reset per phase (Python >= 3.9). Otherwise, on Linux, it is the
+increase of the peak resident memory of the process during the phase, the
+peak being reset through /proc/self/clear_refs. Elsewhere
+`instrument='memory'` raises a ValueError.
+
+Phases
+------
+    set: preparation of the inputs from the wind farm in `set()`
+    kwargs: assembly of the inputs of the version, including the turbine to
+            turbine geometry when it is first needed
+    kernel: the wake model itself (Fortran or Python)
+    post: conversion of the outputs (thrust coefficient, units)
+
+Counts
+------
+    flow_cases: flow cases solved
+    source_turbines: wake generating turbines processed (per flow case)
+    wake_pairs_evaluated: (source, target) pairs given to the wake deficit
+        evaluation (per flow case). For the Fortran versions, the pairs given
+        to the kernel, which does its own wake test.
+    wake_pairs_pruned: pairs skipped before the wake deficit evaluation, by
+        the spatial index or the extreme wake test
+    quadrature_points: rotor points where a wake deficit is evaluated (only
+        counted by the Python versions)
+
+Example
+-------
+    > gcl = GCL(WF=WF, WS=8.0, WD=270.0, TI=0.07, instrument=True)()
+    > print(gcl.stats)
+"""
+from collections import OrderedDict
+import logging
+import time
+import numpy as np
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2: the peak resident memory is measured instead
+    tracemalloc = None
+
+logger = logging.getLogger('fusedwake')
+
+COUNTERS = ['flow_cases', 'source_turbines', 'wake_pairs_evaluated',
+            'wake_pairs_pruned', 'quadrature_points']
+
+if hasattr(time, 'perf_counter'):
+    _clock = time.perf_counter
+else:
+    _clock = time.time
+
+def _rss():
+    """Current and peak resident memory of the process [bytes] (Linux)"""
+    values = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(('VmRSS:', 'VmHWM:')):
+                values[line.split()[0]] = int(line.split()[1]) * 1024
+    return values['VmRSS:'], values['VmHWM:']
+
+def _reset_rss_peak():
+    """Resets the peak resident memory of the process to the current one"""
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+_memory_method = []
+
+def memory_method():
+    """Method measuring the peak allocation of the phases: 'tracemalloc',
+    'rss' or None when the peak can not be measured per phase"""
+    if not _memory_method:
+        method = None
+        if hasattr(tracemalloc, 'reset_peak'):
+            method = 'tracemalloc'
+        else:
+            try:
+                _reset_rss_peak()
+                _rss()
+                method = 'rss'
+            except (IOError, OSError, KeyError, ValueError):
+                pass
+        _memory_method.append(method)
+    return _memory_method[0]
+
+
+class _Phase(object):
+    """Context manager measuring one phase of a RunStats"""
+    def __init__(self, stats, name):
+        self.stats, self.name = stats, name
+
+    def __enter__(self):
+        if self.stats.memory == 'tracemalloc':
+            tracemalloc.reset_peak()
+            self.m0 = tracemalloc.get_traced_memory()[0]
+        elif self.stats.memory == 'rss':
+            _reset_rss_peak()
+            self.m0 = _rss()[0]
+        self.t0 = _clock()
+
+    def __exit__(self, *exc):
+        dt = _clock() - self.t0
+        phase = self.stats.phases.setdefault(self.name, {'time': 0.0, 'calls': 0})
+        phase['time'] += dt
+        phase['calls'] += 1
+        if self.stats.memory:
+            if self.stats.memory == 'tracemalloc':
+                peak = tracemalloc.get_traced_memory()[1] - self.m0
+            else:
+                peak = _rss()[1] - self.m0
+            phase['peak_memory'] = max(phase.get('peak_memory', 0), peak)
+        return False
+
+
+class RunStats(object):
+    """Statistics of a model run: wall time and peak allocation of its
+    phases, and counts of the work done
+    """
+    enabled = True
+
+    def __init__(self, memory=False):
+        """
+        Parameters
+        ----------
+        memory: bool, optional
+            Measure the peak allocation of each phase (see memory_method).
+            The tracing of tracemalloc is started if needed, and stopped by
+            close(). Raises a ValueError when the peak can not be measured.
+        """
+        self.memory = False
+        if memory:
+            self.memory = memory_method()
+            if self.memory is None:
+                raise ValueError("The peak memory of the phases can not be measured: "
+                                 "instrument='memory' needs Python >= 3.9 or Linux")
+        self.phases = OrderedDict()
+        self.counts = OrderedDict((k, 0) for k in COUNTERS)
+        self._tracing = False
+        if self.memory == 'tracemalloc' and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+
+    def phase(self, name):
+        """Context manager recording the wall time (and peak allocation) of
+        a phase. A phase entered several times is accumulated.
+        """
+        return _Phase(self, name)
+
+    def count(self, **counts):
+        """Adds to the counters, e.g. count(flow_cases=10)"""
+        for k, v in counts.items():
+            self.counts[k] = self.counts.get(k, 0) + int(v)
+
+    @property
+    def total_time(self):
+        return sum(p['time'] for p in self.phases.values())
+
+    def as_dict(self):
+        return {'phases': dict((k, dict(v)) for k, v in self.phases.items()),
+                'counts': dict(self.counts),
+                'total_time': self.total_time}
+
+    def close(self, name=''):
+        """Ends the run: stops the tracing started by this object and logs
+        the statistics
+        """
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('%s %s', name, self.as_dict())
+
+    def __repr__(self):
+        lines = ['phase          time [s]  calls  peak memory [B]']
+        for k, p in self.phases.items():
+            lines.append('%-12s %10.6f %6d  %s' % (k, p['time'], p['calls'],
+                                                  p.get('peak_memory', '-')))
+        for k, v in self.counts.items():
+            lines.append('%-22s %d' % (k, v))
+        return '\n'.join(lines)
+
+
+class _NullContext(object):
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _NullStats(object):
+    """RunStats doing nothing, used when the instrumentation is disabled"""
+    enabled = False
+    _context = _NullContext()
+
+    def phase(self, name):
+        return self._context
+
+    def count(self, **counts):
+        pass
+
+    def close(self, name=''):
+        pass
+
+
+NULL_STATS = _NullStats()
+
+def count_fortran_work(stats, nWT, kwargs):
+    """Counts the work given to a Fortran kernel
+    Parameters
+    ----------
+    stats: RunStats
+        Statistics of the run
+    nWT: int
+        Number of wind turbines
+    kwargs: dict
+        Inputs of the kernel. The flow cases are given by 'ws', and the wake
+        candidates of the sparse versions by 'idx'.
+    """
+    nF = np.size(kwargs['ws'])
+    pairs = nWT * (nWT - 1)
+    evaluated = len(kwargs['idx']) if 'idx' in kwargs else pairs
+    stats.count(flow_cases=nF, source_turbines=nF * nWT,
+                wake_pairs_evaluated=nF * evaluated,
+                wake_pairs_pruned=nF * (pairs - evaluated))
+
+def get_stats(instrument):
+    """Statistics object of a run
+    Parameters
+    ----------
+    instrument: bool or str
+        False: no instrumentation, True: wall time and counts, 'memory':
+        wall time, peak allocation and counts
+    Returns
+    -------
+    stats: RunStats or NULL_STATS
+    """
+    if not instrument:
+        return NULL_STATS
+    return RunStats(memory=(instrument == 'memory'))
@@ -0,0 +1,230 @@
+"""Memoization of the flow cases solved by a wake model
+
+Long time series repeat nearly the same conditions many times. A
+MemoizedModel quantizes the flow cases (WS, WD, TI, and the availability of
+the turbines) to given resolutions, and keeps the results of the quantized
+flow cases in a cache of bounded size. Only the flow cases missing from the
+cache are solved, in a single call of the batched version of the model (see
+`parallel.solve_cases`). The cache is emptied when the layout of the wind
+farm changes, and should be emptied (cache_clear) when the parameters of the
+model change.
+
+Example
+-------
+    > memo = MemoizedModel(WF, GCL(version='fort_gcl'), WS=0.1, WD=1.0, TI=0.01)
+    > P_WT, U_WT, Ct = memo(WS, WD, TI)
+    > print(memo.cache_info(), memo.hit_rate)
+"""
+from collections import OrderedDict
+import heapq
+import numpy as np
+from .WindFarm import CacheInfo
+from .wake_model import availability_mask
+
+
+def quantize(values, resolution, period=None):
+    """Rounds values to the nearest multiple of a resolution
+    Parameters
+    ----------
+    values: ndarray
+        Values to round
+    resolution: float
+        Resolution of the values, 0 or None to keep them unchanged
+    period: float, optional
+        Period of the values (e.g. 360 for the wind directions)
+    Returns
+    -------
+    values: ndarray
+        Rounded values, in [0, period) with a period
+    """
+    values = np.array(values, dtype=float)
+    if period is not None:
+        values %= period
+    if resolution:
+        values = np.round(values / resolution) * resolution
+        if period is not None:
+            values %= period
+    return values
+
+
+class MemoizedModel(object):
+    """Flow cases of a wake model solved through a cache of the results of
+    the quantized flow cases
+
+    Attributes
+    ----------
+    kernel_calls: int
+        Number of calls of the model, one per call with missing flow cases
+    evictions: int
+        Number of flow cases dropped from the cache
+    """
+    def __init__(self, WF, model, WS=0.1, WD=1.0, TI=0.005, max_size=100000,
+                 policy='lru'):
+        """Initializes a MemoizedModel object
+
+        Parameters
+        ----------
+        WF: WindFarm
+            Windfarm instance
+        model: GCL, NOJ or GAU
+            Wake model instance, with its version set. The versions with the
+            availability of the turbines are used for the flow cases with an
+            availability.
+        WS, WD, TI: float, optional
+            Resolutions of the wind speed [m/s], the wind direction [deg] and
+            the turbulence intensity [-] of the flow cases, 0 to use the
+            values given
+        max_size: int, optional
+            Largest number of flow cases in the cache
+        policy: str, optional
+            Flow cases dropped when the cache is full:
+                'lru': the least recently used
+                'lfu': the least frequently used (the least recently used
+                       among them)
+        """
+        if policy not in ['lru', 'lfu']:
+            raise Exception("Policy %s is not valid: policy=[lru|lfu]"%(policy))
+        self.WF, self.model = WF, model
+        self.resolution = dict(WS=WS, WD=WD, TI=TI)
+        self.max_size, self.policy = max_size, policy
+        self._cache = OrderedDict()
+        self._uses = {}
+        self._layout = None
+        self.cache_clear()
+
+    def cache_info(self):
+        """Statistics of the cache
+
+        Returns
+        -------
+        info: CacheInfo
+            hits and misses counted in flow cases, maximum and current
+            number of flow cases cached
+        """
+        return CacheInfo(self.hits, self.misses, self.max_size, len(self._cache))
+
+    @property
+    def hit_rate(self):
+        """Fraction of the flow cases not solved by the model"""
+        n = self.hits + self.misses
+        return self.hits / float(n) if n else 0.0
+
+    def cache_clear(self):
+        """Empties the cache and resets its statistics"""
+        self._cache.clear()
+        self._uses.clear()
+        self.hits = self.misses = 0
+        self.kernel_calls = self.evictions = 0
+
+    def quantize(self, WS, WD, TI):
+        """Quantized flow cases
+
+        Returns
+        -------
+        cases: ndarray
+            WS, WD and TI of the flow cases, rounded to the resolutions
+            (nF, 3)
+        """
+        res = self.resolution
+        return np.vstack([quantize(WS, res['WS']), quantize(WD, res['WD'], 360.),
+                          quantize(TI, res['TI'])]).T
+
+    def __call__(self, WS, WD, TI, AV=None):
+        """Solves flow cases
+
+        Parameters
+        ----------
+        WS, WD, TI: float or ndarray
+            Undisturbed wind speed [m/s], wind direction [deg] and ambient
+            turbulence intensity [-] of the flow cases (nF)
+        AV: ndarray, optional
+            Availability of the turbines in the flow cases, 0 when the
+            turbine is stopped and 1 when it runs (nWT) or (nF, nWT)
+
+        Returns
+        -------
+        P_WT: ndarray
+            Power production of the wind turbines (nF, nWT) [W]
+        U_WT: ndarray
+            Wind speed at hub height (nF, nWT) [m/s]
+        Ct: ndarray
+            Thrust coefficients for each wind turbine (nF, nWT) [-]
+        """
+        WF = self.WF
+        layout = (id(WF), WF.layout_version)
+        if layout != self._layout:
+            self._cache.clear()
+            self._uses.clear()
+            self._layout = layout
+        WS, WD, TI = np.broadcast_arrays(np.atleast_1d(WS), np.atleast_1d(WD),
+                                         np.atleast_1d(TI))
+        nF, nWT = len(WS), WF.nWT
+        rows = self.quantize(WS, WD, TI)
+        if AV is not None:
+            AV = np.broadcast_to(availability_mask(AV), (nF, nWT))
+            rows = np.hstack([rows, AV])
+        # Unique quantized flow cases, and the unique case of each flow case
+        cases, inverse = np.unique(rows, axis=0, return_inverse=True)
+        inverse = np.ravel(inverse)
+
+        results = np.empty((3, len(cases), nWT))
+        keys = [case.tobytes() for case in cases]
+        missing = []
+        for k, key in enumerate(keys):
+            entry = self._cache.pop(key, None)
+            if entry is None:
+                missing.append(k)
+            else:
+                # Most recently used last
+                self._cache[key] = entry
+                self._uses[key] += 1
+                results[:, k] = entry
+        self.misses += len(missing)
+        self.hits += nF - len(missing)
+
+        if missing:
+            m = np.array(missing)
+            WS_m, WD_m, TI_m = cases[m, :3].T
+            AV_m = None if AV is None else cases[m, 3:]
+            results[:, m] = self._solve(WS_m, WD_m, TI_m, AV_m)
+            self.kernel_calls += 1
+            for k in missing:
+                self._cache[keys[k]] = results[:, k].copy()
+                self._uses[keys[k]] = 1
+            self._evict()
+        return tuple(results[i][inverse] for i in range(3))
+
+    def _solve(self, WS, WD, TI, AV):
+        """Solves the flow cases missing from the cache with the model"""
+        # Imported on the first miss only, not with the cache
+        from .parallel import solve_cases
+        model = self.model
+        if AV is None:
+            return solve_cases(self.WF, model, WS, WD, TI)
+        version = model.version
+        available = model.__dict__.get('wt_available')
+        try:
+            model.version = model._av_version(version)
+            model.wt_available = AV
+            return solve_cases(self.WF, model, WS, WD, TI)
+        finally:
+            model.version = version
+            if available is None:
+                del model.wt_available
+            else:
+                model.wt_available = available
+
+    def _evict(self):
+        n = len(self._cache) - self.max_size
+        if n <= 0:
+            return
+        if self.policy == 'lru':
+            for i in range(n):
+                key, entry = self._cache.popitem(last=False)
+                del self._uses[key]
+        elif self.policy == 'lfu':
+            # Stable: the least recently used first among the same uses
+            for key in heapq.nsmallest(n, self._cache, key=self._uses.get):
+                del self._cache[key]
+                del self._uses[key]
+        self.evictions += n
@@ -242,34 +242,97 @@ cf2py real(kind=8) optional,intent(in) :: rho = 1.225
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CI = 4.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CO = 25.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: CT_idle = 0.053
+cf2py real(kind=8) optional,intent(in,out),depend(n),
+cf2py&  dimension(n) :: P,T,U
+      ! internal variables
+      integer :: idT(n),ptr_c(n+1)
+      integer, allocatable :: idx_c(:)
+      real(kind=8), allocatable :: x_l(:,:),y_l(:,:)
+
+      allocate(x_l(n,n),y_l(n,n),idx_c(0))
+      ! Rotates the global coordinates to local flow coordinates,
+      ! with the turbines ordered from the most upstream one
+      call flow_geometry(n,x_g,y_g,WD,x_l,y_l,idT)
+      ! Turbines in the wake of each turbine, idx_c being enlarged
+      ! to their number
+      do
+        call wake_pairs(n,nCT,1,1,(/1/),x_l,y_l,DT,CT_c,CT_idle,(/kj/),
+     &    size(idx_c),ptr_c,idx_c)
+        if (ptr_c(n+1) <= size(idx_c)) exit
+        deallocate(idx_c)
+        allocate(idx_c(ptr_c(n+1)))
+      end do
+      call noj_s_loc(n,nP,nCT,x_l,y_l,z_g,idT,ptr_c,size(idx_c),idx_c,
+     &DT,P_c,CT_c,WS,kj,rho,WS_CI,WS_CO,CT_idle,P,T,U)
+      deallocate(x_l,y_l,idx_c)
+
+      end subroutine noj_s
+
+c ----------------------------------------------------------------------
+c noj_s_loc(x_l,y_l,z_g,idT,ptr,idx,DT,P_c,CT_c,WS,kj)
+c ----------------------------------------------------------------------
+c SINGLE FLOW CASE IN LOCAL FLOW COORDINATES
+c Same as noj_s, with the flow coordinates, the order of the turbines
+c (see flow_geometry) and their wake candidates (see wake_pairs) given,
+c so that they are shared by the flow cases with the same wind
+c direction. The wake of each turbine is only evaluated at its wake
+c candidates.
+c
+c Inputs
+c ----------
+c x_l (array): Distance between turbines in the stream-wise direction
+c y_l (array): Distance between turbines in the cross-flow direction
+c z_g (array): Distance between turbines in the global coordinates
+c idT (array): Indexes of the turbines from the most upstream one
+c ptr (array): Row pointers of the wake candidates (n+1), 0-based
+c idx (array): Indices of the wake candidates, 0-based
+c
+c Other inputs and outputs as in noj_s
+      subroutine noj_s_loc(n,nP,nCT,x_l,y_l,z_g,idT,ptr,nnz,idx,DT,P_c,
+     &CT_c,WS,kj,rho,WS_CI,WS_CO,CT_idle,P,T,U)
+
+      implicit none
+      integer :: n,nP,nCT,idT(n),ptr(n+1),nnz,idx(nnz)
+      real(kind=8) :: x_l(n,n),y_l(n,n),z_g(n,n),DT(n),P_c(n,nP,2)
+      real(kind=8) :: CT_c(n,nCT,2),WS,kj
+      real(kind=8) :: rho,WS_CI(n),WS_CO(n),CT_idle(n),P(n),T(n),U(n)
+cf2py integer intent(hide),depend(DT) :: n = len(DT)
+cf2py integer intent(hide),depend(P_c) :: nP = size(P_c,2)
+cf2py integer intent(hide),depend(CT_c) :: nCT = size(CT_c,2)
+cf2py real(kind=8) intent(in),dimension(n) :: DT
+cf2py real(kind=8) intent(in),depend(n),dimension(n,n) :: x_l,y_l,z_g
+cf2py integer intent(in),depend(n),dimension(n) :: idT
+cf2py integer intent(in),depend(n),dimension(n+1) :: ptr
+cf2py integer intent(hide),depend(idx) :: nnz = len(idx)
+cf2py integer intent(in),dimension(nnz) :: idx
+cf2py real(kind=8) intent(in),dimension(n,nP,2) :: P_c
+cf2py real(kind=8) intent(in),dimension(n,nCT,2) :: CT_c
+cf2py real(kind=8) intent(in) :: WS,kj
+cf2py real(kind=8) intent(in) :: rho
+cf2py real(kind=8) intent(in),dimension(n) :: WS_CI,WS_CO,CT_idle
 cf2py real(kind=8) intent(out),depend(n),dimension(n) :: P,T,U
       ! internal variables
       real(kind=8), parameter :: pi=3.1415926535897932384626433832795d0
-      integer :: i,j,k,nDownstream(n),idT(n)
-      real(kind=8) :: x(n),y(n),z(n),D,CT,angle,dUeq(n),dUsq(n)
-      real(kind=8) :: x_l(n,n),y_l(n,n)
+      integer :: i,j,k,l,nc,jc(n)
+      real(kind=8) :: x(n),y(n),z(n),DTc(n),D,CT,dUeq(n),dUsq(n),Ui
 
-      ! Rotates the global coordinates to local flow coordinates
-      angle = pi*(270.0d0-WD)/180.0d0
-      do i=1,n
-        do j=1,n
-          x_l(i,j) = cos(angle)*x_g(i,j)+sin(angle)*y_g(i,j)
-          y_l(i,j) = -sin(angle)*x_g(i,j)+cos(angle)*y_g(i,j)
-        end do
-        ! counts the number of turbines in front of turbine
-        nDownstream(i) = count(x_l(i,:).lt.0)
-      end do
-      ! Indexes of ordered turbines from most upstream turbine
-      call order_id(n,nDownstream,idT)
       ! Initializes the rotor averaged (equivalent) velocity
       U = WS
       dUsq = 0d0
       ! Computes the rotor averaged (equivalent) velocity deficit
       do j=1,n
         i=idT(j)
-        x = x_l(i,:)
-        y = y_l(i,:)
-        z = z_g(i,:)
+        nc = ptr(i+1)-ptr(i)
+        if (nc == 0) cycle
+        ! Gathers the wake candidates
+        do l=1,nc
+          k = idx(ptr(i)+l)+1
+          jc(l) = k
+          x(l) = x_l(i,k)
+          y(l) = y_l(i,k)
+          z(l) = z_g(i,k)
+          DTc(l) = DT(k)
+        end do
         D = DT(i)
 
         if ((U(i) >= WS_CI(i)).and.(U(i) <= WS_CO(i))) then
@@ -277,17 +340,22 @@ cf2py real(kind=8) intent(out),depend(n),dimension(n) :: P,T,U
         else
           CT = CT_idle(i)
         end if
-        call get_dUeq(n,x,y,z,DT,D,CT,kj,dUeq)
+        call get_dUeq(nc,x(1:nc),y(1:nc),z(1:nc),DTc(1:nc),D,CT,kj,
+     &                dUeq(1:nc))
+        Ui = U(i)
         !
         !Wake deficits are normalized by the local velocity
         !Linear sum wake deficits superposition
-        !dUsq = (U(i)*dUeq)**(2.0d0)
-        !U = U - dUsq**(0.5d0)
+        !dUsq(k) = (Ui*dUeq(l))**(2.0d0)
+        !U(k) = U(k) - sqrt(dUsq(k))
         !
         !All deficits are normalized by the inflow velocity
         !Squared root of the sum of squares wake deficits superposition
-        dUsq = dUsq + (WS*dUeq)**(2.0d0)
-        U = WS - dUsq**(0.5d0)
+        do l=1,nc
+          k = jc(l)
+          dUsq(k) = dUsq(k) + (WS*dUeq(l))**(2.0d0)
+          U(k) = WS - sqrt(dUsq(k))
+        end do
       end do
       ! Calculates the power and thrust
       do k=1,n
@@ -301,7 +369,7 @@ cf2py real(kind=8) intent(out),depend(n),dimension(n) :: P,T,U
         T(k) = CT*0.5d0*rho*U(k)*U(k)*pi*DT(k)*DT(k)/4.0d0
       end do
 
-      end subroutine noj_s
+      end subroutine noj_s_loc
 
 c ----------------------------------------------------------------------
 c noj(x,y,z,DT,P_c,CT_c,WS,WD,kj)
@@ -326,6 +394,7 @@ c rho (float): Air density at which the power curve is valid [kg/m^3]
 c WS_CI (array): Cut in wind speed [m/s] for each turbine
 c WS_CO (array): Cut out wind speed [m/s] for each turbine
 c CT_idle (array): Thrust coefficient at rest [-] for each turbine
+c n_threads (int): Number of threads solving the flow cases
 c
 c Outputs
 c ----------
@@ -334,14 +403,15 @@ c T (array): Thrust force of the wind turbines (nWT,1) [N]
 c U (array): Rotor averaged (equivalent) Wind speed at hub height
 c            (nWT,1) [m/s]
       subroutine noj(n,nP,nCT,nF,x_g,y_g,z_g,DT,P_c,CT_c,WS,WD,kj,
-     &rho,WS_CI,WS_CO,CT_idle,P,T,U)
+     &rho,WS_CI,WS_CO,CT_idle,P,T,U,n_threads)
 
       implicit none
-      integer :: n,nP,nCT,nF
+      integer :: n,nP,nCT,nF,n_threads
       real(kind=8) :: x_g(n,n),y_g(n,n),z_g(n,n),DT(n),P_c(n,nP,2)
       real(kind=8) :: CT_c(n,nCT,2),rho,WS_CI(n),WS_CO(n),CT_idle(n)
       real(kind=8),dimension(nF) :: WS,WD,kj
       real(kind=8) :: P(nF,n),T(nF,n),U(nF,n)
+cf2py threadsafe
 cf2py integer intent(hide),depend(DT) :: n = len(DT)
 cf2py integer intent(hide),depend(P_c) :: nP = size(P_c,2)
 cf2py integer intent(hide),depend(CT_c) :: nCT = size(CT_c,2)
@@ -356,14 +426,47 @@ cf2py real(kind=8) optional,intent(in) :: rho = 1.225
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CI = 4.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CO = 25.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: CT_idle = 0.053
-cf2py real(kind=8) intent(out),depend(n),dimension(nF,n) :: P,T,U
+cf2py real(kind=8) optional,intent(in,out),depend(n),
+cf2py&  dimension(nF,n) :: P,T,U
+cf2py integer optional,intent(in) :: n_threads = 1
       ! internal variables
-      integer :: i
+      integer :: i,k,l,nB,idF(nF),ptr(nF+1),idT(n)
+      integer :: ptr_c(n+1)
+      integer, allocatable :: idx_c(:)
+      real(kind=8), allocatable :: x_l(:,:),y_l(:,:)
 
-      do i=1,nF
-        call noj_s(n,nP,nCT,x_g,y_g,z_g,DT,P_c,CT_c,WS(i),WD(i),kj(i),
-     &            rho,WS_CI,WS_CO,CT_idle,P(i,:),T(i,:),U(i,:))
+      ! Flow cases grouped by wind direction, in 4 blocks per thread at
+      ! least to share the load
+      call group_wd(nF,WD,(nF-1)/(4*max(1,n_threads))+1,idF,ptr,nB)
+      ! The work arrays of the threads are allocated on the heap,
+      ! as the private copies of automatic arrays are on their stack
+!$omp parallel num_threads(n_threads)
+!$omp& private(i,k,x_l,y_l,idT,ptr_c,idx_c)
+      allocate(x_l(n,n),y_l(n,n),idx_c(0))
+!$omp do schedule(dynamic)
+      do l=1,nB
+        ! Flow coordinates and wake candidates shared by the flow cases
+        ! of the block
+        call flow_geometry(n,x_g,y_g,WD(idF(ptr(l)+1)),x_l,y_l,idT)
+        ! Wake candidates, idx_c being enlarged to their number
+        do
+          call wake_pairs(n,nCT,nF,ptr(l+1)-ptr(l),
+     &      idF(ptr(l)+1:ptr(l+1)),x_l,y_l,DT,CT_c,CT_idle,kj,
+     &      size(idx_c),ptr_c,idx_c)
+          if (ptr_c(n+1) <= size(idx_c)) exit
+          deallocate(idx_c)
+          allocate(idx_c(ptr_c(n+1)))
+        end do
+        do k=ptr(l)+1,ptr(l+1)
+          i=idF(k)
+          call noj_s_loc(n,nP,nCT,x_l,y_l,z_g,idT,ptr_c,size(idx_c),
+     &         idx_c,DT,P_c,CT_c,WS(i),kj(i),rho,WS_CI,WS_CO,CT_idle,
+     &         P(i,:),T(i,:),U(i,:))
+        end do
       end do
+!$omp end do
+      deallocate(x_l,y_l,idx_c)
+!$omp end parallel
 
       end subroutine noj
 
@@ -391,6 +494,7 @@ c rho (float): Air density at which the power curve is valid [kg/m^3]
 c WS_CI (array): Cut in wind speed [m/s] for each turbine
 c WS_CO (array): Cut out wind speed [m/s] for each turbine
 c CT_idle (array): Thrust coefficient at rest [-] for each turbine
+c n_threads (int): Number of threads solving the flow cases
 c
 c Outputs
 c ----------
@@ -399,14 +503,15 @@ c T (array): Thrust force of the wind turbines (nWT,1) [N]
 c U (array): Rotor averaged (equivalent) Wind speed at hub height
 c            (nWT,1) [m/s]
       subroutine noj_av(n,nP,nCT,nF,x_g,y_g,z_g,DT,P_c,CT_c,WS,WD,kj,AV,
-     &rho,WS_CI,WS_CO,CT_idle,P,T,U)
+     &rho,WS_CI,WS_CO,CT_idle,P,T,U,n_threads)
 
       implicit none
-      integer :: n,nP,nCT,nF,AV(nf,n)
+      integer :: n,nP,nCT,nF,n_threads,AV(nf,n)
       real(kind=8) :: x_g(n,n),y_g(n,n),z_g(n,n),DT(n),P_c(n,nP,2)
       real(kind=8) :: CT_c(n,nCT,2),rho,WS_CI(n),WS_CO(n),CT_idle(n)
       real(kind=8),dimension(nF) :: WS,WD,kj
       real(kind=8) :: P(nF,n),T(nF,n),U(nF,n)
+cf2py threadsafe
 cf2py integer intent(hide),depend(DT) :: n = len(DT)
 cf2py integer intent(hide),depend(P_c) :: nP = size(P_c,2)
 cf2py integer intent(hide),depend(CT_c) :: nCT = size(CT_c,2)
@@ -422,24 +527,58 @@ cf2py real(kind=8) optional,intent(in) :: rho = 1.225
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CI = 4.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CO = 25.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: CT_idle = 0.053
-cf2py real(kind=8) intent(out),depend(n),dimension(nF,n) :: P,T,U
+cf2py real(kind=8) optional,intent(in,out),depend(n),
+cf2py&  dimension(nF,n) :: P,T,U
+cf2py integer optional,intent(in) :: n_threads = 1
       ! internal variables
-      integer :: i,j
-      real(kind=8) :: CT_c_AV(n,nCT,2), P_c_AV(n,nCT,2)
+      integer :: i,j,k,l,nB,idF(nF),ptr(nF+1),idT(n)
+      integer :: ptr_c(n+1)
+      integer, allocatable :: idx_c(:)
+      real(kind=8), allocatable :: CT_c_AV(:,:,:),P_c_AV(:,:,:)
+      real(kind=8), allocatable :: x_l(:,:),y_l(:,:)
 
-      do i=1,nF
-        CT_c_AV = CT_c
-        P_c_AV  = P_c
-        ! Re-defines the trust curve for non available turbines
-        do j=1,n
-          if (AV(i,j)==0) then
-            CT_c_AV(j,:,2) = CT_idle(j)
-            P_c_AV(j,:,2) = 0.0d0
-          end if
+      ! Flow cases grouped by wind direction, in 4 blocks per thread at
+      ! least to share the load
+      call group_wd(nF,WD,(nF-1)/(4*max(1,n_threads))+1,idF,ptr,nB)
+      ! The work arrays of the threads are allocated on the heap,
+      ! as the private copies of automatic arrays are on their stack
+!$omp parallel num_threads(n_threads)
+!$omp& private(i,j,k,CT_c_AV,P_c_AV,x_l,y_l,idT,ptr_c,idx_c)
+      allocate(x_l(n,n),y_l(n,n),idx_c(0))
+      allocate(CT_c_AV(n,nCT,2),P_c_AV(n,nP,2))
+!$omp do schedule(dynamic)
+      do l=1,nB
+        ! Flow coordinates and wake candidates shared by the flow cases
+        ! of the block, the turbines at rest having smaller wakes
+        call flow_geometry(n,x_g,y_g,WD(idF(ptr(l)+1)),x_l,y_l,idT)
+        ! Wake candidates, idx_c being enlarged to their number
+        do
+          call wake_pairs(n,nCT,nF,ptr(l+1)-ptr(l),
+     &      idF(ptr(l)+1:ptr(l+1)),x_l,y_l,DT,CT_c,CT_idle,kj,
+     &      size(idx_c),ptr_c,idx_c)
+          if (ptr_c(n+1) <= size(idx_c)) exit
+          deallocate(idx_c)
+          allocate(idx_c(ptr_c(n+1)))
+        end do
+        do k=ptr(l)+1,ptr(l+1)
+          i=idF(k)
+          CT_c_AV = CT_c
+          P_c_AV  = P_c
+          ! Re-defines the trust curve for non available turbines
+          do j=1,n
+            if (AV(i,j)==0) then
+              CT_c_AV(j,:,2) = CT_idle(j)
+              P_c_AV(j,:,2) = 0.0d0
+            end if
+          end do
+          call noj_s_loc(n,nP,nCT,x_l,y_l,z_g,idT,ptr_c,size(idx_c),
+     &         idx_c,DT,P_c_AV,CT_c_AV,WS(i),kj(i),rho,WS_CI,WS_CO,
+     &         CT_idle,P(i,:),T(i,:),U(i,:))
         end do
-        call noj_s(n,nP,nCT,x_g,y_g,z_g,DT,P_c_AV,CT_c_AV,WS(i),WD(i),
-     &            kj(i),rho,WS_CI,WS_CO,CT_idle,P(i,:),T(i,:),U(i,:))
       end do
+!$omp end do
+      deallocate(x_l,y_l,idx_c,CT_c_AV,P_c_AV)
+!$omp end parallel
 
       end subroutine noj_av
 
@@ -470,6 +609,7 @@ c rho (float): Air density at which the power curve is valid [kg/m^3]
 c WS_CI (array): Cut in wind speed [m/s] for each turbine
 c WS_CO (array): Cut out wind speed [m/s] for each turbine
 c CT_idle (array): Thrust coefficient at rest [-] for each turbine
+c n_threads (int): Number of threads solving the flow cases
 c
 c Outputs
 c ----------
@@ -478,14 +618,15 @@ c T (array): Thrust force of the wind turbines (nWT,1) [N]
 c U (array): Rotor averaged (equivalent) Wind speed at hub height
 c            (nWT,1) [m/s]
       subroutine noj_GA(n,nP,nCT,nF,x_g,y_g,z_g,DT,P_c,CT_c,WS,WD,
-     &STD_WD,Nga,kj,rho,WS_CI,WS_CO,CT_idle,P,T,U)
+     &STD_WD,Nga,kj,rho,WS_CI,WS_CO,CT_idle,P,T,U,n_threads)
 
       implicit none
-      integer :: n,nP,nCT,nF,Nga
+      integer :: n,nP,nCT,nF,Nga,n_threads
       real(kind=8) :: x_g(n,n),y_g(n,n),z_g(n,n),DT(n),P_c(n,nP,2)
       real(kind=8) :: CT_c(n,nCT,2),rho,WS_CI(n),WS_CO(n),CT_idle(n)
       real(kind=8),dimension(nF) :: WS,WD,STD_WD,kj
       real(kind=8) :: P(nF,n),T(nF,n),U(nF,n)
+cf2py threadsafe
 cf2py integer intent(hide),depend(DT) :: n = len(DT)
 cf2py integer intent(hide),depend(P_c) :: nP = size(P_c,2)
 cf2py integer intent(hide),depend(CT_c) :: nCT = size(CT_c,2)
@@ -502,6 +643,7 @@ cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CI = 4.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CO = 25.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: CT_idle = 0.053
 cf2py real(kind=8) intent(out),depend(n),dimension(nF,n) :: P,T,U
+cf2py integer optional,intent(in) :: n_threads = 1
       ! internal variables
       real(kind=8), parameter :: pi=3.1415926535897932384626433832795d0
       integer :: i,j
@@ -586,6 +728,8 @@ cf2py real(kind=8) intent(out),depend(n),dimension(nF,n) :: P,T,U
           weight(8) = 0.000199604072211d0
       end select
 
+!$omp parallel do num_threads(n_threads)
+!$omp& private(j,WD_aux,P_aux,T_aux,U_aux)
       do i=1,nF
         P(i,:)=0.0d0
         T(i,:)=0.0d0
@@ -599,13 +743,16 @@ cf2py real(kind=8) intent(out),depend(n),dimension(nF,n) :: P,T,U
           U(i,:)=U(i,:)+weight(j)*U_aux*(1.0d0/sqrt(pi))
         end do
       end do
+!$omp end parallel do
 
       end subroutine noj_GA
 
 c ----------------------------------------------------------------------
 c noj_mult_wd(x,y,z,DT,P_c,CT_c,WS,WD,TI)
 c ----------------------------------------------------------------------
-c MULTIPLE FLOW CASES with individual wind direction for each turbine
+c MULTIPLE FLOW CASES with individual wind direction for each turbine.
+c The wind farm is solved once per distinct wind direction of a flow
+c case, for all the turbines sharing it
 c
 c Inputs
 c ----------
@@ -625,6 +772,7 @@ c rho (float): Air density at which the power curve is valid [kg/m^3]
 c WS_CI (array): Cut in wind speed [m/s] for each turbine
 c WS_CO (array): Cut out wind speed [m/s] for each turbine
 c CT_idle (array): Thrust coefficient at rest [-] for each turbine
+c n_threads (int): Number of threads solving the flow cases
 c
 c Outputs
 c ----------
@@ -633,15 +781,16 @@ c T (array): Thrust force of the wind turbines (nWT,1) [N]
 c U (array): Rotor averaged (equivalent) Wind speed at hub height
 c            (nWT,1) [m/s]
       subroutine noj_mult_wd(n,nP,nCT,nF,x_g,y_g,z_g,DT,P_c,CT_c,WS,WD,
-     &STD_WD,Nga,kj,rho,WS_CI,WS_CO,CT_idle,P,T,U)
+     &STD_WD,Nga,kj,rho,WS_CI,WS_CO,CT_idle,P,T,U,n_threads)
 
       implicit none
-      integer :: n,nP,nCT,nF,Nga
+      integer :: n,nP,nCT,nF,Nga,n_threads
       real(kind=8) :: x_g(n,n),y_g(n,n),z_g(n,n),DT(n),P_c(n,nP,2)
       real(kind=8) :: CT_c(n,nCT,2),rho,WS_CI(n),WS_CO(n),CT_idle(n)
       real(kind=8),dimension(nF) :: WS,kj
       real(kind=8),dimension(nF,n) :: WD, STD_WD
       real(kind=8) :: P(nF,n),T(nF,n),U(nF,n)
+cf2py threadsafe
 cf2py integer intent(hide),depend(DT) :: n = len(DT)
 cf2py integer intent(hide),depend(P_c) :: nP = size(P_c,2)
 cf2py integer intent(hide),depend(CT_c) :: nCT = size(CT_c,2)
@@ -659,22 +808,36 @@ cf2py real(kind=8) optional,intent(in) :: rho = 1.225
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CI = 4.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: WS_CO = 25.0
 cf2py real(kind=8) optional,intent(in),dimension(n) :: CT_idle = 0.053
-cf2py real(kind=8) intent(out),depend(n),dimension(nF,n) :: P,T,U
+cf2py real(kind=8) optional,intent(in,out),depend(n),
+cf2py&  dimension(nF,n) :: P,T,U
+cf2py integer optional,intent(in) :: n_threads = 1
       ! internal variables
-      integer :: i,j
+      integer :: i,j,l
+      logical :: done(n)
       real(kind=8), dimension(n) :: P_aux,T_aux,U_aux
 
-      do j=1,n
-        do i=1,nF
+!$omp parallel do num_threads(n_threads) schedule(dynamic)
+!$omp& private(j,l,done,P_aux,T_aux,U_aux)
+      do i=1,nF
+        done = .false.
+        do j=1,n
+          if (done(j)) cycle
+          ! Solves the wind farm once per distinct wind direction
           call noj_GA(n,nP,nCT,1,x_g,y_g,z_g,DT,P_c,CT_c,WS(i),WD(i,j),
-     &STD_WD(i,j),Nga,kj(i),rho,WS_CI,WS_CO,CT_idle,P_aux,T_aux,U_aux)
-!          call noj_s(n,nP,nCT,x_g,y_g,z_g,DT,P_c,CT_c,WS(i),WD(i,j),
-!     &      kj(i),rho,WS_CI,WS_CO,CT_idle,P_aux,T_aux,U_aux)
-          P(i,j)=P_aux(j)
-          T(i,j)=T_aux(j)
-          U(i,j)=U_aux(j)
+     &STD_WD(i,j),Nga,kj(i),rho,WS_CI,WS_CO,CT_idle,P_aux,T_aux,U_aux,1)
+          ! Scatters to the turbines with the same wind direction
+          do l=j,n
+            if (done(l)) cycle
+            if ((WD(i,l)==WD(i,j)).and.(STD_WD(i,l)==STD_WD(i,j))) then
+              P(i,l)=P_aux(l)
+              T(i,l)=T_aux(l)
+              U(i,l)=U_aux(l)
+              done(l) = .true.
+            end if
+          end do
         end do
       end do
+!$omp end parallel do
 
       end subroutine noj_mult_wd
 
@@ -682,6 +845,183 @@ c ----------------------------------------------------------------------
 c Additional routines
 c ----------------------------------------------------------------------
 
+c ----------------------------------------------------------------------
+c flow_geometry(x_g,y_g,WD)
+c ----------------------------------------------------------------------
+c Rotates the distances between the turbines to the local flow
+c coordinates of a wind direction, and orders the turbines from the most
+c upstream one. Shared by all the flow cases with the same wind direction.
+c
+c Inputs
+c ----------
+c x_g (array): Distance between turbines in the global coordinates
+c y_g (array): Distance between turbines in the global coordinates
+c WD (float): Undisturbed wind direction at hub height [deg.]
+c             Meteorological coordinates (N=0,E=90,S=180,W=270)
+c
+c Outputs
+c ----------
+c x_l (array): Distance between turbines in the stream-wise direction
+c y_l (array): Distance between turbines in the cross-flow direction
+c idT (array): Indexes of the turbines from the most upstream one
+      subroutine flow_geometry(n,x_g,y_g,WD,x_l,y_l,idT)
+
+      implicit none
+      integer :: n,idT(n)
+      real(kind=8) :: x_g(n,n),y_g(n,n),WD,x_l(n,n),y_l(n,n)
+cf2py integer intent(hide),depend(x_g) :: n = size(x_g,1)
+cf2py real(kind=8) intent(in),dimension(n,n) :: x_g
+cf2py real(kind=8) intent(in),depend(n),dimension(n,n) :: y_g
+cf2py real(kind=8) intent(in) :: WD
+cf2py real(kind=8) intent(out),depend(n),dimension(n,n) :: x_l,y_l
+cf2py integer intent(out),depend(n),dimension(n) :: idT
+      ! internal variables
+      real(kind=8), parameter :: pi=3.1415926535897932384626433832795d0
+      integer :: i,j,nDownstream(n)
+      real(kind=8) :: angle
+
+      ! Rotates the global coordinates to local flow coordinates
+      angle = pi*(270.0d0-WD)/180.0d0
+      do i=1,n
+        do j=1,n
+          x_l(i,j) = cos(angle)*x_g(i,j)+sin(angle)*y_g(i,j)
+          y_l(i,j) = -sin(angle)*x_g(i,j)+cos(angle)*y_g(i,j)
+        end do
+        ! counts the number of turbines in front of turbine
+        nDownstream(i) = count(x_l(i,:).lt.0)
+      end do
+      ! Indexes of ordered turbines from most upstream turbine
+      call order_id(n,nDownstream,idT)
+
+      end subroutine flow_geometry
+
+c ----------------------------------------------------------------------
+c wake_pairs(idF,x_l,y_l,DT,CT_c,CT_idle,kj)
+c ----------------------------------------------------------------------
+c Finds the wake candidates of each turbine in the flow coordinates of a
+c wind direction, in compressed sparse row format. They are the turbines
+c downstream overlapped by the largest wake the turbine can have: at the
+c largest thrust coefficient of its curve, at rest and 0.99, and over
+c the wake expansion coefficients of the flow cases sharing the flow
+c coordinates. The deficit is null outside the wake radius, so that the
+c other turbines are skipped with the same results.
+c
+c Inputs
+c ----------
+c idF (array): Indexes of the flow cases sharing the flow coordinates
+c x_l (array): Distance between turbines in the stream-wise direction
+c y_l (array): Distance between turbines in the cross-flow direction
+c DT (array): Turbines diameter
+c CT_c (array): Thrust coefficient curves
+c CT_idle (array): Thrust coefficient at rest [-] for each turbine
+c kj (array): Wake (linear) expansion coefficient of the flow cases
+c nnz (int): Size of idx
+c
+c Outputs
+c ----------
+c ptr (array): Row pointers of the wake candidates (n+1), 0-based. The
+c              candidates are all counted, ptr(n+1) being their number
+c idx (array): Indices of the wake candidates, 0-based. The candidates
+c              of the turbine i are idx(ptr(i)+1:ptr(i+1)), complete
+c              only when ptr(n+1) <= nnz
+      subroutine wake_pairs(n,nCT,nF,nT,idF,x_l,y_l,DT,CT_c,CT_idle,kj,
+     &nnz,ptr,idx)
+
+      implicit none
+      integer :: n,nCT,nF,nT,idF(nT),nnz,ptr(n+1),idx(nnz)
+      real(kind=8) :: x_l(n,n),y_l(n,n),DT(n),CT_c(n,nCT,2),CT_idle(n)
+      real(kind=8) :: kj(nF)
+cf2py integer intent(hide),depend(DT) :: n = len(DT)
+cf2py integer intent(hide),depend(CT_c) :: nCT = size(CT_c,2)
+cf2py integer intent(hide),depend(kj) :: nF = len(kj)
+cf2py integer intent(hide),depend(idF) :: nT = len(idF)
+cf2py integer intent(in),dimension(nT) :: idF
+cf2py real(kind=8) intent(in),depend(n),dimension(n,n) :: x_l,y_l
+cf2py real(kind=8) intent(in),dimension(n) :: DT
+cf2py real(kind=8) intent(in),dimension(n,nCT,2) :: CT_c
+cf2py real(kind=8) intent(in),depend(n),dimension(n) :: CT_idle
+cf2py real(kind=8) intent(in),dimension(nF) :: kj
+cf2py integer intent(out),depend(n),dimension(n+1) :: ptr
+cf2py integer optional,intent(in),depend(n) :: nnz = n*n
+cf2py integer intent(out),depend(nnz),dimension(nnz) :: idx
+      ! internal variables
+      integer :: i,k
+      real(kind=8) :: kj_min,kj_max,CT_m,RW
+      real(kind=8), dimension(n) :: x,RW_min,RW_max
+
+      ! The wake radius is linear in kj, and largest at one of the ends
+      kj_min = minval(kj(idF))
+      kj_max = maxval(kj(idF))
+      ptr(1) = 0
+      do i=1,n
+        ! Largest thrust coefficient of the turbine, with a defined wake
+        CT_m = max(0.99d0,maxval(CT_c(i,:,2),mask=CT_c(i,:,2)<1.0d0))
+        if (CT_idle(i) < 1.0d0) CT_m = max(CT_m,CT_idle(i))
+        x = x_l(i,:)
+        call get_RW(n,x,DT(i),CT_m,RW_min,kj_min)
+        call get_RW(n,x,DT(i),CT_m,RW_max,kj_max)
+        ! Turbines downstream with their rotor in the bounding wake,
+        ! with a margin for the rounding
+        ptr(i+1) = ptr(i)
+        do k=1,n
+          if (x(k) <= 0.0d0) cycle
+          RW = max(RW_min(k),RW_max(k))
+          if (abs(y_l(i,k)) >= (1.0d0+1.0d-6)*(RW+DT(k)/2.0d0)) cycle
+          ptr(i+1) = ptr(i+1)+1
+          if (ptr(i+1) <= nnz) idx(ptr(i+1)) = k-1
+        end do
+      end do
+
+      end subroutine wake_pairs
+
+c ----------------------------------------------------------------------
+c group_wd(WD,nMax)
+c ----------------------------------------------------------------------
+c Groups the flow cases by wind direction, in blocks of at most nMax flow
+c cases, so that the flow coordinates are computed once per block
+c
+c Inputs
+c ----------
+c WD (array): Wind directions of the flow cases [deg.]
+c nMax (int): Largest number of flow cases in a block
+c
+c Outputs
+c ----------
+c idF (array): Indexes of the flow cases, ordered by wind direction
+c ptr (array): Blocks of flow cases, 0-based. The flow cases of the block
+c              l are idF(ptr(l)+1:ptr(l+1))
+c nB (int): Number of blocks
+      subroutine group_wd(nF,WD,nMax,idF,ptr,nB)
+
+      implicit none
+      integer :: nF,nMax,idF(nF),ptr(nF+1),nB
+      real(kind=8) :: WD(nF)
+cf2py integer intent(hide),depend(WD) :: nF = len(WD)
+cf2py real(kind=8) intent(in),dimension(nF) :: WD
+cf2py integer intent(in) :: nMax
+cf2py integer intent(out),depend(nF),dimension(nF) :: idF
+cf2py integer intent(out),depend(nF),dimension(nF+1) :: ptr
+cf2py integer intent(out) :: nB
+      ! internal variables
+      integer :: k
+      real(kind=8) :: WD_s(nF)
+
+      ! Sorts a copy, order_r sorts its input
+      WD_s = WD
+      call order_r(nF,WD_s,idF)
+      nB = 0
+      do k=1,nF
+        if (k > 1) then
+          if ((WD_s(k) == WD_s(k-1)).and.(k-1-ptr(nB) < nMax)) cycle
+        end if
+        ! New block at a new wind direction, or when the block is full
+        nB = nB+1
+        ptr(nB) = k-1
+      end do
+      ptr(nB+1) = nF
+
+      end subroutine group_wd
+
 c ----------------------------------------------------------------------
 c Find the lower location index of a point in an ordered array
 c ----------------------------------------------------------------------
@@ -773,4 +1113,44 @@ cf2py integer intent(out),depend(n),dimension(n) :: id
           id(j)=w
         end do
       end do
-      end subroutine order_id
\ No newline at end of file
+      end subroutine order_id
+
+c ----------------------------------------------------------------------
+c Finds the index that order an array from lower to higher values
+c for reals (same as order_id)
+c ----------------------------------------------------------------------
+      subroutine order_r(n,a,id)
+      integer n,id(n)
+      real(kind=8) a(n)
+cf2py integer intent(hide),depend(a) :: n = len(a)
+cf2py real(kind=8) intent(in),dimension(n) :: a
+cf2py integer intent(out),depend(n),dimension(n) :: id
+      ! internal variables
+      integer i,j,inc,w
+      real(kind=8) v
+      do i=1,n
+        id(i)=i
+      end do
+      ! Determine starting increment
+      inc=1
+      do while (inc.le.n)
+        inc=3*inc+1
+      end do
+      ! Partial sorts loop
+      do while (inc.gt.1)
+        inc=inc/3
+        do i=inc+1,n
+          v=a(i)
+          w=id(i)
+          j=i
+          do while (a(j-inc).gt.v)
+            a(j)=a(j-inc)
+            id(j)=id(j-inc)
+            j=j-inc
+            if(j.le.inc) exit
+          end do
+          a(j)=v
+          id(j)=w
+        end do
+      end do
+      end subroutine order_r
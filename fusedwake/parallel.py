@@ -0,0 +1,199 @@
+"""Parallel execution of flow case sweeps
+
+The flow cases are split in chunks solved by a pool of worker processes
+(multiprocessing.Pool). The wind farm is given once to each worker (pickled
+without its caches when the workers are spawned). The turbine to turbine
+geometry of the Fortran versions and the power and thrust coefficient tables
+are given to the workers in shared memory (multiprocessing.sharedctypes), and
+the workers write their results in shared (nCases, nWT) arrays, at the rows
+of their flow cases. The results do not depend on the number of workers.
+
+Example
+-------
+    > gcl = GCL(version='fort_gcl')
+    > P_WT, U_WT, Ct = run_parallel(WF, gcl, WS, WD, TI, n_workers=32)
+"""
+import copy
+import ctypes
+import logging
+import multiprocessing
+import os
+from multiprocessing.sharedctypes import RawArray
+import numpy as np
+from .WindFarm import PreparedFarm
+
+logger = logging.getLogger('fusedwake')
+
+# Arrays of the power and thrust coefficient tables shared with the workers
+TABLE_ARRAYS = ['P', 'CT', 'dP', 'dCT']
+# Turbine to turbine distances shared with the workers (PreparedFarm.T2T)
+T2T_ARRAYS = ['x_g', 'y_g', 'z_g']
+
+def solve_cases(WF, model, WS, WD, TI):
+    """Solves a list of flow cases in the current process, in a single call
+    of the model when its version handles several flow cases, one by one
+    otherwise
+    Parameters
+    ----------
+    WF: WindFarm
+        Windfarm instance
+    model: GCL, NOJ or GAU
+        Wake model instance, with its version set
+    WS: ndarray
+        Undisturbed wind speed at hub height [m/s] (nF)
+    WD: ndarray
+        Undisturbed wind direction at hub height [deg] (nF)
+    TI: ndarray
+        Ambient turbulence intensity [-] (nF)
+    Returns
+    -------
+    P_WT: ndarray
+        Power production of the wind turbines (nF, nWT) [W]
+    U_WT: ndarray
+        Wind speed at hub height (nF, nWT) [m/s]
+    Ct: ndarray
+        Thrust coefficients for each wind turbine (nF, nWT) [-]
+    """
+    WS, WD, TI = [np.array(v, dtype=float) for v in np.broadcast_arrays(
+                  np.atleast_1d(WS), np.atleast_1d(WD), np.atleast_1d(TI))]
+    nF = len(WS)
+    if nF == 0:
+        return tuple(np.zeros([0, WF.nWT]) for i in range(3))
+    if model.version in model.batch_versions:
+        inputs = dict(WF=WF, WS=WS, WD=WD, TI=TI, ws=WS, wd=WD, ti=TI)
+        # Wake expansion coefficients of the Fortran versions
+        if 'K' in model.defaults:
+            inputs['kj'] = inputs['ks'] = model.K * np.ones_like(WS)
+        model(**inputs)
+        return tuple(np.reshape(a, (nF, WF.nWT))
+                     for a in [model.p_wt, model.u_wt, model.c_t])
+    P_WT, U_WT, Ct = [np.zeros([nF, WF.nWT]) for i in range(3)]
+    for i in range(nF):
+        model(WF=WF, WS=WS[i], WD=WD[i], TI=TI[i], ws=WS[i], wd=WD[i], ti=TI[i])
+        P_WT[i], U_WT[i], Ct[i] = model.p_wt, model.u_wt, model.c_t
+    return P_WT, U_WT, Ct
+
+def _share(a):
+    """Copies an array in a new shared memory block
+    Returns
+    -------
+    spec: tuple
+        (block, shape, dtype, order) given to the worker processes to attach
+        the array, block being a RawArray freed with its last reference
+    view: ndarray
+        The array in the shared memory block, in the memory order of a
+        (Fortran order if a is Fortran but not C contiguous)
+    """
+    order = 'F' if np.isfortran(a) else 'C'
+    a = np.asarray(a, order=order)
+    block = RawArray(ctypes.c_char, max(a.nbytes, 1))
+    spec = (block, a.shape, a.dtype.str, order)
+    view = _attach(spec)
+    view[...] = a
+    return spec, view
+
+def _attach(spec):
+    """Array in a shared memory block (see _share)"""
+    block, shape, dtype, order = spec
+    return np.ndarray(shape, dtype=dtype, buffer=np.frombuffer(block, dtype=np.uint8),
+                      order=order)
+
+# State of a worker process, set once by _init_worker
+_worker = {}
+
+def _init_worker(WF, table, specs, model_class, model_kwargs):
+    arrays = dict((k, _attach(spec)) for k, spec in specs.items())
+    for k in TABLE_ARRAYS:
+        setattr(table, k, arrays[k])
+    WF._curve_table = table
+    _worker['WF'] = WF
+    _worker['model'] = model = model_class(**model_kwargs)
+    if 'x_g' in arrays:
+        model.prepared = PreparedFarm(WF)
+        model.prepared._T2T = tuple(arrays[k] for k in T2T_ARRAYS)
+    _worker['cases'] = [arrays[k] for k in ['WS', 'WD', 'TI']]
+    _worker['results'] = [arrays[k] for k in ['P_WT', 'U_WT', 'Ct']]
+
+def _run_chunk(start, stop):
+    cases = [a[start:stop] for a in _worker['cases']]
+    results = solve_cases(_worker['WF'], _worker['model'], *cases)
+    for out, res in zip(_worker['results'], results):
+        out[start:stop] = res
+    return start, stop, os.getpid()
+
+def run_parallel(WF, model, WS, WD, TI, n_workers=None, chunk_size=None):
+    """Solves a list of flow cases with a pool of worker processes
+    Parameters
+    ----------
+    WF: WindFarm
+        Windfarm instance
+    model: GCL, NOJ or GAU
+        Wake model instance, with its version set. The workers use new
+        instances with the same version and parameters (the keys of the
+        model's defaults).
+    WS: ndarray
+        Undisturbed wind speed at hub height [m/s] (nF)
+    WD: ndarray
+        Undisturbed wind direction at hub height [deg] (nF)
+    TI: ndarray
+        Ambient turbulence intensity [-] (nF)
+    n_workers: int, optional
+        Number of worker processes. Default to the number of cpus.
+    chunk_size: int, optional
+        Number of flow cases solved per task. Default to a quarter of the
+        flow cases of a worker.
+    Returns
+    -------
+    P_WT: ndarray
+        Power production of the wind turbines (nF, nWT) [W]
+    U_WT: ndarray
+        Wind speed at hub height (nF, nWT) [m/s]
+    Ct: ndarray
+        Thrust coefficients for each wind turbine (nF, nWT) [-]
+    """
+    WS, WD, TI = [np.array(v, dtype=float) for v in np.broadcast_arrays(
+                  np.atleast_1d(WS), np.atleast_1d(WD), np.atleast_1d(TI))]
+    nF = len(WS)
+    if n_workers is None:
+        n_workers = multiprocessing.cpu_count()
+    if chunk_size is None:
+        chunk_size = int(np.ceil(nF / (4.0 * n_workers)))
+    chunk_size = max(1, chunk_size)
+
+    arrays = dict(WS=WS, WD=WD, TI=TI)
+    for k in ['P_WT', 'U_WT', 'Ct']:
+        arrays[k] = np.zeros([nF, WF.nWT])
+    table = WF.curve_table
+    for k in TABLE_ARRAYS:
+        arrays[k] = getattr(table, k)
+    # The versions using the turbine to turbine distances get them from the
+    # shared memory instead of building them in each worker
+    if 'x_g' in model.inputs[model.version]:
+        prepared = model.prepared
+        if prepared is None or not prepared.is_valid(WF):
+            prepared = PreparedFarm(WF)
+        arrays.update(zip(T2T_ARRAYS, prepared.T2T))
+
+    specs, views = {}, {}
+    for k, a in arrays.items():
+        specs[k], views[k] = _share(a)
+    # The workers get the tables without their arrays
+    light_table = copy.copy(table)
+    for k in TABLE_ARRAYS:
+        setattr(light_table, k, None)
+    model_kwargs = dict((k, getattr(model, k)) for k in model.defaults)
+    model_kwargs['version'] = model.version
+    # The processes already share the cpus
+    model_kwargs['n_threads'] = 1
+    pool = multiprocessing.Pool(n_workers, initializer=_init_worker,
+        initargs=(WF, light_table, specs, type(model), model_kwargs))
+    try:
+        tasks = [pool.apply_async(_run_chunk, (i0, min(i0 + chunk_size, nF)))
+                 for i0 in range(0, nF, chunk_size)]
+        pids = set(task.get()[2] for task in tasks)
+    finally:
+        pool.terminate()
+        pool.join()
+    logger.debug('run_parallel: %d flow cases solved by the worker processes %s',
+                 nF, sorted(pids))
+    return tuple(views[k].copy() for k in ['P_WT', 'U_WT', 'Ct'])
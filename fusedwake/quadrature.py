@@ -0,0 +1,79 @@
+"""Quadrature rules shared by the wind farm flow models
+
+The rules are computed once per order and kept in a module level cache. The
+arrays returned are contiguous and read-only, they should be copied before
+being modified.
+"""
+import numpy as np
+
+_rules = {}
+
+def _cached(name, n, compute):
+    """Returns the rule `name` of order n from the cache, computing it with
+    compute(n) if needed
+    """
+    key = (name, int(n))
+    if key not in _rules:
+        rule = tuple(np.ascontiguousarray(a, dtype=float) for a in compute(int(n)))
+        for a in rule:
+            a.flags.writeable = False
+        _rules[key] = rule
+    return _rules[key]
+
+def gauss_legendre(n):
+    """Gauss-Legendre quadrature rule on [-1, 1]
+    Parameters
+    ----------
+    n: int
+        Number of points
+    Returns
+    -------
+    x: ndarray
+        Nodes (n)
+    w: ndarray
+        Weights (n)
+    """
+    return _cached('legendre', n, np.polynomial.legendre.leggauss)
+
+def gauss_hermite(n):
+    """Gauss-Hermite quadrature rule, for the weight function exp(-x^2)
+    Parameters
+    ----------
+    n: int
+        Number of points
+    Returns
+    -------
+    x: ndarray
+        Nodes (n)
+    w: ndarray
+        Weights (n)
+    """
+    return _cached('hermite', n, np.polynomial.hermite.hermgauss)
+
+def _rotor_disk(NG):
+    r_Gc, w_Gc = gauss_legendre(NG)
+    wj, wk = np.meshgrid(w_Gc, w_Gc)
+    tj, rk = np.meshgrid(r_Gc, r_Gc)
+    return [a.reshape((NG**2)) for a in [tj, rk, wj, wk]]
+
+def rotor_disk(NG):
+    """Gauss-Legendre quadrature rule over a rotor disk, tensor product of the
+    angular and radial rules. The point k is at the radius R*(rk+1)/2 and the
+    angle pi*(tj+1), with the weight wj*wk*(rk+1)/4 (normalized by the rotor
+    area).
+    Parameters
+    ----------
+    NG: int
+        Number of points in each direction
+    Returns
+    -------
+    tj: ndarray
+        Angular nodes on [-1, 1] (NG**2)
+    rk: ndarray
+        Radial nodes on [-1, 1] (NG**2)
+    wj: ndarray
+        Angular weights (NG**2)
+    wk: ndarray
+        Radial weights (NG**2)
+    """
+    return _cached('rotor_disk', NG, _rotor_disk)
@@ -14,5 +14,157 @@ class TestWindFarm(unittest.TestCase):
             np.array(self.wf.get_T2T_gl_coord()),
             np.array(self.wf.get_T2T_gl_coord2()))
 
+    def test_wake_candidates(self):
+        """The wake candidates of the spatial index are the same as the ones
+        found by checking every pair of turbines
+        """
+        envelope = lambda x, i: 40.0 + 0.05 * x
+        R = np.array(self.wf.R)
+        for wd in [0.0, 95.0, 222.0, 270.0]:
+            indptr, indices = self.wf.wake_candidates(wd, envelope)
+            dist, nDownstream, id0 = self.wf.turbineDistance(wd)
+            for i in range(self.wf.nWT):
+                x, y = dist[:, i, :]
+                in_wake = (x > 0.) & (np.abs(y) < envelope(x, i) + R)
+                np.testing.assert_array_equal(indices[indptr[i]:indptr[i+1]],
+                                              in_wake.nonzero()[0])
+
+    def test_wake_candidates_cache(self):
+        """The wake candidates given with a key are cached per wind direction,
+        in the integer kind of the Fortran kernels
+        """
+        envelope = lambda x, i: 40.0 + 0.05 * x
+        self.wf.cache_clear()
+        indptr, indices = self.wf.wake_candidates(0.0, envelope, key='lin')
+        self.assertEqual(indptr.dtype, np.int32)
+        self.assertEqual(indices.dtype, np.int32)
+        hits = self.wf.cache_info().hits
+        self.assertIs(self.wf.wake_candidates(0.0, envelope, key='lin')[1], indices)
+        self.assertEqual(self.wf.cache_info().hits, hits + 1)
+        # Another envelope is not taken from the cache
+        wide = lambda x, i: 80.0 + 0.1 * x
+        self.assertGreater(len(self.wf.wake_candidates(0.0, wide, key='wide')[1]),
+                           len(indices))
+
+    def test_direction_cache(self):
+        """The geometry of a wind direction is computed once, and recomputed
+        after the layout has changed
+        """
+        self.wf.cache_clear()
+        dist, nDownstream, id0 = self.wf.turbineDistance(270.0)
+        self.assertIs(self.wf.turbineDistance(270.0 + 360.0)[0], dist)
+        self.assertEqual(self.wf.cache_info()[:2], (1, 1))
+
+        pos = self.wf.pos.copy()
+        pos[0, 0] += 100.0
+        self.wf.set_layout(pos)
+        dist2, nDownstream2, id02 = self.wf.turbineDistance(270.0)
+        self.assertEqual(self.wf.cache_info()[:2], (1, 2))
+        np.testing.assert_almost_equal(dist2[0, 0, 1:], dist[0, 0, 1:] - 100.0)
+
+        self.wf.cache_size = 2
+        for wd in [0.0, 90.0, 180.0]:
+            self.wf.turbineFlowCoord(wd)
+        self.assertEqual(self.wf.cache_info().currsize, 2)
+
+    def test_geometry_chunks(self):
+        """The turbine to turbine geometry does not depend on the size of the
+        chunks, and can be stored in single precision
+        """
+        dist = self.wf.turbineDistance(222.0)[0]
+        self.wf.chunk_size = 7
+        self.wf.geometry_dtype = np.float32
+        self.wf.cache_clear()
+        dist32 = self.wf.turbineDistance(222.0)[0]
+        self.assertEqual(dist32.dtype, np.float32)
+        self.assertEqual(self.wf.vectWTtoWT.dtype, np.float32)
+        np.testing.assert_allclose(dist32, dist, atol=1.0E-3)
+        np.testing.assert_allclose(self.wf.vectWTtoWT,
+                                   np.array(self.wf.get_T2T_gl_coord()), atol=1.0E-3)
+
+    def test_get_P_CT(self):
+        """The lookup tables give the power and thrust coefficient of the
+        turbines' curves, including outside of the operating range
+        """
+        U = np.linspace(0.0, 30.0, 7 * self.wf.nWT).reshape((7, self.wf.nWT))
+        U[0, :3] = [self.wf.WT[0].u_cutin, self.wf.WT[0].u_cutout, 12.0]
+        P, CT = self.wf.get_P_CT(U)
+        self.assertEqual(P.shape, U.shape)
+        for i in range(self.wf.nWT):
+            wt = self.wf.WT[i]
+            # The interpolators of the turbine raise outside of their range
+            u = np.clip(U[:, i], wt.PCI.x[0], wt.PCI.x[-1])
+            np.testing.assert_allclose(P[:, i],
+                np.where(u == U[:, i], wt.get_P(u), 0.0), rtol=1.0E-9, atol=1.0E-6)
+            u = np.clip(U[:, i], wt.CTCI.x[0], wt.CTCI.x[-1])
+            np.testing.assert_allclose(CT[:, i],
+                np.where(u == U[:, i], wt.get_CT(u), wt.CT_idle), rtol=1.0E-9, atol=1.0E-9)
+
+        # The missing wind speeds give NaN, as the interpolators do
+        U[1, :2] = [np.nan, np.inf]
+        P2, CT2 = self.wf.get_P_CT(U)
+        self.assertTrue(np.isnan(P2[1, :2]).all() and np.isnan(CT2[1, :2]).all())
+        np.testing.assert_array_equal(P2[1, 2:], P[1, 2:])
+        self.assertTrue(np.isnan(self.wf.curve_table.slopes(U)[0][1, :2]).all())
+
+    def test_prepared_farm(self):
+        """The wake models keep their prepared inputs between the calls on
+        the same layout, and rebuild them when the layout changes
+        """
+        from fusedwake.noj import NOJ
+        noj = NOJ(version='fort_noj_s', K=0.04)
+        noj(WF=self.wf, ws=8.0, wd=270.0)
+        prepared = noj.prepared
+        self.assertTrue(np.isfortran(noj.x_g))
+        P = noj.p_wt.copy()
+        noj(WF=self.wf, ws=8.0, wd=270.0)
+        self.assertIs(noj.prepared, prepared)
+        np.testing.assert_array_equal(noj.p_wt, P)
+        # Mirrored layout: the wind from the east sees the original wakes
+        x0 = self.wf.pos[0].mean()
+        self.wf.set_layout(np.vstack([2. * x0 - self.wf.pos[0], self.wf.pos[1]]))
+        noj(WF=self.wf, ws=8.0, wd=90.0)
+        self.assertIsNot(noj.prepared, prepared)
+        np.testing.assert_allclose(noj.p_wt, P)
+
+    def test_prepared_T2T(self):
+        """The turbine to turbine distances of the Fortran versions are built
+        by chunks, in float64 and Fortran order, without the vectors of the
+        wind farm
+        """
+        from fusedwake.WindFarm import PreparedFarm
+        self.wf.chunk_size = 7
+        self.wf.geometry_dtype = np.float32
+        T2T = PreparedFarm(self.wf).T2T
+        self.assertIsNone(self.wf._vectWTtoWT)
+        for a, b in zip(T2T, self.wf.get_T2T_gl_coord()):
+            self.assertTrue(np.isfortran(a))
+            self.assertEqual(a.dtype, np.float64)
+            np.testing.assert_array_equal(a, b)
+
+    def test_move(self):
+        """Moving some turbines updates the geometry and the prepared inputs
+        of the wake models as setting the whole layout does
+        """
+        from fusedwake.noj import NOJ
+        noj = NOJ(version='fort_noj_s', K=0.04)
+        noj(WF=self.wf, ws=8.0, wd=270.0)
+        prepared = noj.prepared
+        self.wf.vectWTtoWT
+        pos = self.wf.pos.copy()
+        pos[:, [2, 7]] += [[150., -40.], [80., 300.]]
+        self.wf.move([2, 7], pos[:, [2, 7]])
+        noj(WF=self.wf, ws=8.0, wd=270.0)
+        self.assertIs(noj.prepared, prepared)
+        P = noj.p_wt.copy()
+        vect = self.wf.vectWTtoWT.copy()
+        self.wf.set_layout(pos)
+        np.testing.assert_array_equal(self.wf.vectWTtoWT, vect)
+        noj2 = NOJ(version='fort_noj_s', K=0.04)
+        noj2(WF=self.wf, ws=8.0, wd=270.0)
+        for a, b in zip(noj2.prepared.T2T, prepared.T2T):
+            np.testing.assert_array_equal(a, b)
+        np.testing.assert_array_equal(noj2.p_wt, P)
+
 if __name__ == '__main__':
     unittest.main()
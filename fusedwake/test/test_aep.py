@@ -0,0 +1,46 @@
+from fusedwake.WindFarm import WindFarm
+from fusedwake.gcl import GCL
+from fusedwake import aep
+import unittest
+import os
+import numpy as np
+current_dir = os.path.dirname(os.path.realpath(__file__))
+
+class TestAEP(unittest.TestCase):
+    def setUp(self):
+        filename = current_dir + '/../../examples/middelgrunden.yml'
+        self.wf = WindFarm(name='farm_name', yml=filename)
+
+    def test_weibull_frequency(self):
+        """The frequencies of the bins are the probabilities of the Weibull
+        distributions weighted by the sector frequencies
+        """
+        WS = np.arange(0.0, 60.0, 0.5)
+        freq = aep.weibull_frequency(WS, A=[8.0, 10.0], k=[2.0, 2.3], f=[1.0, 3.0])
+        self.assertEqual(freq.shape, (2, len(WS)))
+        np.testing.assert_allclose(freq.sum(axis=1), [0.25, 0.75])
+        # Probability of the bin [7.75, 8.25] of the first sector
+        i = np.nonzero(WS == 8.0)[0][0]
+        p = np.exp(-(7.75 / 8.0)**2.0) - np.exp(-(8.25 / 8.0)**2.0)
+        self.assertAlmostEqual(freq[0, i], 0.25 * p)
+
+    def test_get_AEP(self):
+        """The AEP of the batched GCL is the one of the flow cases solved one
+        by one
+        """
+        WD = np.array([0.0, 90.0, 222.0, 270.0])
+        WS = np.array([3.0, 6.0, 9.0, 12.0])
+        freq = aep.weibull_frequency(WS, A=[8.0, 9.0, 10.0, 11.0],
+                                     k=[2.0, 2.0, 2.2, 2.4], f=[0.2, 0.1, 0.3, 0.4])
+        net, gross, wt_aep = aep.get_AEP(self.wf, GCL(version='py_gcl_v2'),
+                                         WD, WS, freq, TI=0.07)
+        net1, gross1, wt_aep1 = aep.get_AEP(self.wf, GCL(version='py_gcl_v1'),
+                                            WD, WS, freq, TI=0.07)
+        self.assertEqual(wt_aep.shape, (self.wf.nWT,))
+        np.testing.assert_allclose(wt_aep, wt_aep1, rtol=1.0E-9)
+        self.assertAlmostEqual(net, wt_aep.sum())
+        self.assertEqual(gross, gross1)
+        self.assertLess(net, gross)
+
+if __name__ == '__main__':
+    unittest.main()
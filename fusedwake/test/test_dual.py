@@ -0,0 +1,28 @@
+import unittest
+import numpy as np
+from fusedwake.dual import Dual
+
+
+class TestDual(unittest.TestCase):
+    def test_derivatives(self):
+        """The derivatives of the dual numbers are the ones of the functions
+        of their values, through the operators, ufuncs, indexing and sums
+        """
+        x0 = np.array([0.5, 1.0, 2.0, 3.0])
+        f = lambda x: np.sum(np.exp(-x) * np.sqrt(x)**3. / (1.0 + np.cos(x)) -
+                             2.0 * np.abs(x - 1.5), axis=0)
+        df = lambda x: (np.exp(-x) * (1.5 * np.sqrt(x) - x**1.5) / (1.0 + np.cos(x)) +
+                        np.exp(-x) * x**1.5 * np.sin(x) / (1.0 + np.cos(x))**2. -
+                        2.0 * np.sign(x - 1.5))
+        x = Dual.variable(x0, 0, 1) * np.ones([3, 1])
+        y = f(x)
+        np.testing.assert_allclose(y.value, f(x0 * np.ones([3, 1])))
+        np.testing.assert_allclose(y.der[:, 0], 3.0 * df(x0))
+
+        # Masked values have no derivative
+        x[x > 1.5] = 0.0
+        self.assertTrue(np.all(x.der[:, 2:] == 0.0))
+        self.assertTrue(np.all(x.der[:, :2] == 1.0))
+
+if __name__ == '__main__':
+    unittest.main()
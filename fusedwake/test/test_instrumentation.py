@@ -0,0 +1,65 @@
+from fusedwake.WindFarm import WindFarm
+from fusedwake.gcl import GCL
+from fusedwake.instrumentation import NULL_STATS, RunStats, memory_method
+import unittest
+import os
+import numpy as np
+current_dir = os.path.dirname(os.path.realpath(__file__))
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        filename = current_dir + '/../../examples/middelgrunden.yml'
+        self.wf = WindFarm(name='farm_name', yml=filename)
+
+    def test_instrumented_run(self):
+        """The instrumented runs record their phases and the work done, and
+        give the results of the runs without instrumentation
+        """
+        WS, WD, TI = np.array([8.0, 10.0]), np.array([270.0, 275.0]), np.array([0.07, 0.07])
+        cases = dict(WF=self.wf, WS=WS, WD=WD, TI=TI, ws=WS, wd=WD, ti=TI)
+        nWT = self.wf.nWT
+        for version in ['py_gcl_v2', 'fort_gcl']:
+            ref = GCL(version=version, **cases)()
+            self.assertIs(ref.stats, NULL_STATS)
+            if memory_method() is None:
+                self.assertRaises(ValueError, GCL(version=version, instrument='memory',
+                                                  **cases))
+                gcl = GCL(version=version, instrument=True, **cases)()
+            else:
+                gcl = GCL(version=version, instrument='memory', **cases)()
+            np.testing.assert_array_equal(gcl.p_wt, ref.p_wt)
+            stats = gcl.stats
+            self.assertEqual(list(stats.phases), ['set', 'kwargs', 'kernel'] +
+                             (['post'] if 'fort' in version else []))
+            for phase in stats.phases.values():
+                self.assertGreaterEqual(phase['time'], 0.0)
+                if stats.memory:
+                    self.assertGreaterEqual(phase['peak_memory'], 0)
+            counts = stats.counts
+            self.assertEqual(counts['flow_cases'], 2)
+            self.assertEqual(counts['source_turbines'], 2 * nWT)
+            self.assertEqual(counts['wake_pairs_evaluated'] + counts['wake_pairs_pruned'],
+                             2 * nWT * (nWT - 1))
+            if 'py' in version:
+                self.assertGreater(counts['wake_pairs_pruned'], 0)
+                self.assertEqual(counts['quadrature_points'],
+                                 counts['wake_pairs_evaluated'] * gcl.NG**2)
+
+    @unittest.skipIf(memory_method() is None, 'the peak memory can not be measured')
+    def test_phase_peak_memory(self):
+        """The peak memory of a phase does not include the ones of the phases
+        before it
+        """
+        stats = RunStats(memory=True)
+        n = 2**23
+        with stats.phase('large'):
+            np.ones(n).sum()
+        with stats.phase('small'):
+            np.ones(n // 16).sum()
+        stats.close()
+        large, small = [stats.phases[k]['peak_memory'] for k in ['large', 'small']]
+        self.assertGreater(large, 0.9 * 8 * n)
+        self.assertLess(small, 0.5 * 8 * n)
+
+if __name__ == '__main__':
+    unittest.main()
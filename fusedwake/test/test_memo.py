@@ -0,0 +1,68 @@
+from fusedwake.WindFarm import WindFarm
+from fusedwake.gcl import GCL
+from fusedwake.memo import MemoizedModel
+from fusedwake.parallel import solve_cases
+import unittest
+import os
+import numpy as np
+current_dir = os.path.dirname(os.path.realpath(__file__))
+
+class TestMemo(unittest.TestCase):
+    def setUp(self):
+        filename = current_dir + '/../../examples/middelgrunden.yml'
+        self.wf = WindFarm(name='farm_name', yml=filename)
+        # Slowly varying series of measured conditions
+        rng = np.random.RandomState(0)
+        n = 2000
+        self.WS = np.clip(9.0 + np.cumsum(rng.normal(0.0, 0.05, n)), 4.0, 20.0)
+        self.WD = (250.0 + np.cumsum(rng.normal(0.0, 0.5, n))) % 360.0
+        self.TI = np.clip(0.07 + np.cumsum(rng.normal(0.0, 0.0005, n)), 0.03, 0.2)
+
+    def test_quantization_error(self):
+        """Most of the flow cases of a series are found in the cache, with a
+        small error on the power of the wind farm
+        """
+        gcl = GCL(version='fort_gcl')
+        memo = MemoizedModel(self.wf, gcl, WS=0.1, WD=1.0, TI=0.005)
+        P_WT = memo(self.WS, self.WD, self.TI)[0]
+        P_WT2 = solve_cases(self.wf, gcl, self.WS, self.WD, self.TI)[0]
+        self.assertEqual(P_WT.shape, P_WT2.shape)
+        error = np.abs(P_WT.sum(axis=1) - P_WT2.sum(axis=1)) / P_WT2.sum(axis=1)
+        # Relative error on the wind farm power: about 1% in average for
+        # 0.1 m/s steps of the wind speed
+        report = 'error: mean %.4f, max %.4f, hit rate %.3f' % (
+            error.mean(), error.max(), memo.hit_rate)
+        self.assertLess(error.mean(), 2.0E-2, report)
+        self.assertLess(error.max(), 5.0E-2, report)
+        self.assertGreater(memo.hit_rate, 0.6, report)
+        # A second pass only uses the cache
+        misses = memo.cache_info().misses
+        memo(self.WS, self.WD, self.TI)
+        self.assertEqual(memo.kernel_calls, 1)
+        self.assertEqual(memo.cache_info()[:2], (2 * len(self.WS) - misses, misses))
+
+    def test_eviction(self):
+        """The cache stays within its size, and the flow cases on the
+        quantization grid are solved exactly, with their availability
+        """
+        gcl = GCL(version='fort_gcl')
+        WS, WD = np.round(self.WS[:200]), np.round(self.WD[:200])
+        AV = np.ones((len(WS), self.wf.nWT))
+        AV[::3, 5] = 0
+        for policy in ['lru', 'lfu']:
+            memo = MemoizedModel(self.wf, gcl, WS=1.0, WD=1.0, TI=0.0,
+                                 max_size=20, policy=policy)
+            for i in range(0, len(WS), 50):
+                results = memo(WS[i:i + 50], WD[i:i + 50], 0.07, AV=AV[i:i + 50])
+                self.assertLessEqual(memo.cache_info().currsize, 20)
+            self.assertGreater(memo.evictions, 0)
+            self.assertEqual(gcl.version, 'fort_gcl')
+            gcl_av = GCL(version='fort_gcl_av', wt_available=AV[150:])
+            expected = solve_cases(self.wf, gcl_av, WS[150:], WD[150:], 0.07)
+            for a, b in zip(results, expected):
+                np.testing.assert_allclose(a, b, rtol=1.0E-12, atol=1.0E-9)
+        # A derating can not be given as availability
+        self.assertRaises(ValueError, memo, WS[:2], WD[:2], 0.07, AV=0.5)
+
+if __name__ == '__main__':
+    unittest.main()
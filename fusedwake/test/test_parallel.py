@@ -0,0 +1,52 @@
+from fusedwake.WindFarm import WindFarm
+from fusedwake.gcl import GCL
+from fusedwake.parallel import run_parallel, solve_cases
+import unittest
+import logging
+import os
+import numpy as np
+current_dir = os.path.dirname(os.path.realpath(__file__))
+
+class _Records(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        filename = current_dir + '/../../examples/middelgrunden.yml'
+        self.wf = WindFarm(name='farm_name', yml=filename)
+        self.handler = _Records()
+        self.logger = logging.getLogger('fusedwake')
+        self.level = self.logger.level
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.logger.setLevel(self.level)
+
+    def test_run_parallel(self):
+        """The flow cases solved by the worker processes are the ones solved
+        in the current process, in the same order
+        """
+        WS = np.linspace(4.0, 20.0, 11)
+        WD = np.linspace(0.0, 350.0, 11)
+        for version in ['py_gcl_v2', 'fort_gcl']:
+            gcl = GCL(version=version)
+            results = run_parallel(self.wf, gcl, WS, WD, 0.07, n_workers=2,
+                                   chunk_size=3)
+            for a, b in zip(results, solve_cases(self.wf, gcl, WS, WD, 0.07)):
+                self.assertEqual(a.shape, (len(WS), self.wf.nWT))
+                np.testing.assert_array_equal(a, b)
+            # The flow cases were solved in other processes
+            nF, pids = self.handler.records[-1].args
+            self.assertEqual(nF, len(WS))
+            self.assertTrue(1 <= len(pids) <= 2)
+            self.assertNotIn(os.getpid(), pids)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+import numpy as np
+from fusedwake.quadrature import gauss_legendre, gauss_hermite, rotor_disk
+
+
+class TestQuadrature(unittest.TestCase):
+    def test_cached_rules(self):
+        """The rules are computed once and can not be modified
+        """
+        x, w = gauss_legendre(5)
+        self.assertIs(gauss_legendre(5)[0], x)
+        self.assertFalse(x.flags.writeable)
+        np.testing.assert_almost_equal(x, np.polynomial.legendre.leggauss(5)[0])
+        np.testing.assert_almost_equal(gauss_hermite(4)[1].sum(), np.sqrt(np.pi))
+
+    def test_rotor_disk(self):
+        """The rotor disk rule averages over the rotor area
+        """
+        for NG in [4, 7]:
+            tj, rk, wj, wk = rotor_disk(NG)
+            self.assertEqual(tj.shape, (NG**2,))
+            r = (rk + 1.0) / 2.0
+            w = wj * wk * (rk + 1.0) / 4.0
+            np.testing.assert_almost_equal(w.sum(), 1.0)
+            # mean of r^2 over the unit disk
+            np.testing.assert_almost_equal((w * r**2).sum(), 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
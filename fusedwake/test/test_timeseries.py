@@ -0,0 +1,105 @@
+from fusedwake.WindFarm import WindFarm
+from fusedwake.gcl import GCL
+from fusedwake.parallel import solve_cases
+from fusedwake import timeseries
+import unittest
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+current_dir = os.path.dirname(os.path.realpath(__file__))
+
+class TestTimeseries(unittest.TestCase):
+    def setUp(self):
+        filename = current_dir + '/../../examples/middelgrunden.yml'
+        self.wf = WindFarm(name='farm_name', yml=filename)
+        self.tmp = tempfile.mkdtemp()
+        n = 53
+        self.cases = np.vstack([np.linspace(4.0, 20.0, n),
+                                np.linspace(0.0, 350.0, n),
+                                0.07 * np.ones(n)]).T
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_run_timeseries(self):
+        """The flow cases read and solved by chunks give the results of
+        solving all of them at once, with the CSV and NPY inputs
+        """
+        gcl = GCL(version='fort_gcl')
+        results = solve_cases(self.wf, gcl, *self.cases.T)
+        csv = os.path.join(self.tmp, 'cases.csv')
+        np.savetxt(csv, self.cases[:, [1, 2, 0]], delimiter=',',
+                   header='WD,TI,WS', comments='')
+        npy = os.path.join(self.tmp, 'cases.npy')
+        np.save(npy, self.cases)
+        self.assertEqual(timeseries.count_csv(csv), len(self.cases))
+        for chunks in [timeseries.read_csv(csv, chunk_size=10),
+                       timeseries.read_npy(npy, chunk_size=7)]:
+            prefix = os.path.join(self.tmp, 'results')
+            writer = timeseries.NpyWriter(prefix, len(self.cases), self.wf.nWT)
+            nF = timeseries.run_timeseries(self.wf, gcl, chunks, writer)
+            self.assertEqual(nF, len(self.cases))
+            for k, res in zip(timeseries.RESULTS, results):
+                np.testing.assert_allclose(np.load(prefix + '_' + k + '.npy'), res,
+                                           rtol=1.0E-12, atol=1.0E-9)
+
+    def test_prefetch(self):
+        """The chunks read by the thread come in order, and the errors of
+        the reading are raised in the iteration
+        """
+        self.assertEqual(list(timeseries.prefetch(iter(range(20)), depth=3)),
+                         list(range(20)))
+        def failing():
+            yield 1
+            raise ValueError('bad chunk')
+        chunks = timeseries.prefetch(failing())
+        self.assertEqual(next(chunks), 1)
+        self.assertRaises(ValueError, next, chunks)
+
+    def test_prefetch_overlap(self):
+        """The next chunk is read while the current one is solved: the
+        Fortran kernels release the GIL
+        """
+        gcl = GCL(version='fort_gcl', n_threads=1)
+        n = 4000
+        WS, WD, TI = np.linspace(4.0, 20.0, n), np.linspace(0.0, 350.0, n), 0.07 * np.ones(n)
+        solve_cases(self.wf, gcl, WS, WD, TI)
+        stamps = []
+        def chunks():
+            yield self.cases[:10].T
+            # Reading of the next chunk, in Python
+            t0 = time.time()
+            while time.time() - t0 < 2.0:
+                stamps.append(time.time())
+            yield self.cases[10:].T
+        chunks = timeseries.prefetch(chunks())
+        next(chunks)
+        t0 = time.time()
+        solve_cases(self.wf, gcl, WS, WD, TI)
+        t1 = time.time()
+        list(chunks)
+        # The reading thread has run all along the solve
+        times = np.array([t0] + [t for t in stamps if t0 < t < t1] + [t1])
+        self.assertLess(np.diff(times).max(), 0.25 * (t1 - t0))
+
+    @unittest.skipIf(timeseries.h5py is None, 'h5py is not installed')
+    def test_hdf5(self):
+        """The HDF5 inputs and outputs give the same results as the NPY ones"""
+        import h5py
+        gcl = GCL(version='fort_gcl')
+        results = solve_cases(self.wf, gcl, *self.cases.T)
+        filename = os.path.join(self.tmp, 'cases.h5')
+        with h5py.File(filename, 'w') as f:
+            for k, a in zip(timeseries.COLUMNS, self.cases.T):
+                f[k] = a
+        output = os.path.join(self.tmp, 'results.h5')
+        timeseries.run_timeseries(self.wf, gcl, timeseries.read_hdf5(filename, 10),
+                                  timeseries.HDF5Writer(output, self.wf.nWT))
+        with h5py.File(output, 'r') as f:
+            for k, res in zip(timeseries.RESULTS, results):
+                np.testing.assert_allclose(f[k][...], res, rtol=1.0E-12, atol=1.0E-9)
+
+if __name__ == '__main__':
+    unittest.main()
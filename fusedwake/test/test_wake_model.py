@@ -0,0 +1,193 @@
+from fusedwake.WindFarm import WindFarm
+from fusedwake.gcl import GCL
+from fusedwake.noj import NOJ
+from fusedwake.gau import GAU
+import unittest
+import os
+import numpy as np
+current_dir = os.path.dirname(os.path.realpath(__file__))
+
+class TestWakeModel(unittest.TestCase):
+    def setUp(self):
+        filename = current_dir + '/../../examples/middelgrunden.yml'
+        self.wf = WindFarm(name='farm_name', yml=filename)
+
+    def test_flow_cases(self):
+        """The fortran versions take their flow cases from the model
+        variables, unless the kernel inputs are given directly
+        """
+        for model, v in [(NOJ, 'fort_noj_s'), (NOJ, 'fort_noj'), (GAU, 'fort_gau_s')]:
+            m = model(WF=self.wf, version=v, K=0.05)
+            P = m(WS=8.0, WD=270.0).p_wt.copy()
+            P2 = m(WS=9.0, WD=200.0, ws=8.0, wd=270.0).p_wt
+            np.testing.assert_array_equal(P, P2)
+            m(WS=9.0, WD=200.0)
+            self.assertFalse(np.array_equal(m.p_wt, P))
+
+    def test_prepared_call(self):
+        """The prepared calls give the results of the model calls, and follow
+        the changes of layout
+        """
+        for model, v, ti in [(GCL, 'fort_gcl_s', 0.07), (GCL, 'fort_gcl', 0.07),
+                             (GCL, 'fort_gcl_s_sp', 0.07), (NOJ, 'fort_noj_s', 0.04),
+                             (GAU, 'fort_gau_av', 0.04)]:
+            m = model(WF=self.wf, version=v)
+            call = model(version=v).prepare(WF=self.wf)
+            for ws, wd in [(8.0, 270.0), (11.0, 95.0)]:
+                m(WS=ws, WD=wd, TI=ti, K=ti)
+                P, U, Ct = call(ws, wd, ti)
+                # The batch versions always return (nF, nWT) arrays
+                np.testing.assert_array_equal(P, np.reshape(m.p_wt, P.shape))
+                np.testing.assert_array_equal(U, np.reshape(m.u_wt, P.shape))
+                np.testing.assert_allclose(Ct, np.reshape(m.c_t, P.shape), rtol=1.0E-14)
+            # The buffers of the outputs are reused
+            self.assertIs(call(8.0, 270.0, ti)[0], P)
+
+        call = NOJ(version='fort_noj').prepare(WF=self.wf)
+        P = call([8.0, 9.0], 270.0)[0].copy()
+        self.assertEqual(P.shape, (2, self.wf.nWT))
+        pos = self.wf.pos.copy()
+        self.wf.set_layout(pos[:, ::-1])
+        np.testing.assert_array_equal(call([8.0, 9.0], 270.0)[0], P[:, ::-1])
+
+    def test_scenarios(self):
+        """The availability scenarios give the results of the versions with
+        availability, each flow case and scenario solved on its own
+        """
+        nWT = self.wf.nWT
+        AV = np.ones([4, nWT])
+        AV[1, 3] = 0
+        AV[2, :5] = 0
+        AV[3] = AV[1]
+        WS, WD = np.array([8.0, 11.0]), np.array([270.0, 95.0])
+        for model, v in [(GCL, 'fort_gcl'), (NOJ, 'fort_noj_s'), (GAU, 'fort_gau_av')]:
+            m = model(WF=self.wf, version=v, TI=0.07)
+            P, U, Ct = m.scenarios(AV, WS=WS, WD=WD)
+            self.assertEqual(P.shape, (4, 2, nWT))
+            np.testing.assert_array_equal(P[3], P[1])
+            self.assertTrue(np.all(P[2][:, :5] == 0.0))
+            m2 = model(WF=self.wf, version=m._av_version(v), TI=0.07)
+            for i in range(len(AV)):
+                for j in range(len(WS)):
+                    m2(WS=WS[j:j+1], WD=WD[j:j+1], wt_available=AV[i])
+                    np.testing.assert_array_equal(P[i, j], m2.p_wt)
+                    np.testing.assert_array_equal(U[i, j], m2.u_wt)
+            # The turbines can only be stopped or running
+            AV[0, 0] = 0.5
+            self.assertRaises(ValueError, m.scenarios, AV, WS=WS, WD=WD)
+            AV[0, 0] = 1
+
+    def test_threads(self):
+        """The batch versions give the same results on several threads"""
+        WS = np.linspace(4.0, 20.0, 37)
+        WD = np.linspace(0.0, 355.0, 37)
+        AV = np.ones([37, self.wf.nWT])
+        AV[::4, 2:6] = 0
+        for model, v in [(GCL, 'fort_gcl'), (GCL, 'fort_gcl_av'), (NOJ, 'fort_noj'),
+                         (NOJ, 'fort_mod_noj_av'), (GAU, 'fort_gau')]:
+            m = model(WF=self.wf, version=v, TI=0.07, wt_available=AV)
+            P = m(WS=WS, WD=WD, n_threads=1).p_wt.copy()
+            U = m.u_wt.copy()
+            for n_threads in [3, 0]:
+                m(n_threads=n_threads)
+                np.testing.assert_array_equal(m.p_wt, P)
+                np.testing.assert_array_equal(m.u_wt, U)
+
+    def test_direction_groups(self):
+        """The batch versions share the flow coordinates among the flow cases
+        with the same wind direction, with the results of the single flow
+        case versions
+        """
+        WS = np.tile(np.linspace(4.0, 20.0, 9), 4)
+        WD = np.repeat([270.0, 12.5, 270.0 + 1.0E-9, 190.0], 9)
+        WS, WD = WS[::-1], np.roll(WD, 5)
+        for model, v in [(GCL, 'fort_gcl'), (NOJ, 'fort_noj'), (NOJ, 'fort_mod_noj'),
+                         (GAU, 'fort_gau')]:
+            m = model(WF=self.wf, version=v, TI=0.07)(WS=WS, WD=WD)
+            m_s = model(WF=self.wf, version=v + '_s', TI=0.07)
+            for i in range(len(WS)):
+                m_s(WS=WS[i], WD=WD[i])
+                np.testing.assert_array_equal(m.p_wt[i], m_s.p_wt)
+                np.testing.assert_array_equal(m.u_wt[i], m_s.u_wt)
+
+    def test_mult_wd(self):
+        """The versions with a wind direction per turbine give to each turbine
+        its result with the wind farm in its wind direction
+        """
+        nWT = self.wf.nWT
+        WS = np.array([8.0, 11.0, 6.0])
+        WD = np.array([270.0, 95.0, 12.5])
+        # A few distinct directions among the turbines of each flow case
+        WD_WT = np.tile(WD[np.arange(nWT) % 3], (3, 1))
+        WD_WT[1] = np.roll(WD_WT[1], 1)
+        for model, v in [(GCL, 'fort_gcl'), (NOJ, 'fort_noj'), (NOJ, 'fort_mod_noj'),
+                         (GAU, 'fort_gau')]:
+            m = model(WF=self.wf, version=v, TI=0.07)(WS=np.repeat(WS, 3), WD=np.tile(WD, 3))
+            m_wd = model(WF=self.wf, version=v + '_mult_wd', TI=0.07)(WS=WS, WD=WD_WT)
+            self.assertEqual(m_wd.p_wt.shape, (3, nWT))
+            for i in range(3):
+                for j in range(nWT):
+                    k = 3 * i + list(WD).index(WD_WT[i, j])
+                    np.testing.assert_allclose(m_wd.p_wt[i, j], m.p_wt[k, j], rtol=1.0E-12)
+                    np.testing.assert_allclose(m_wd.u_wt[i, j], m.u_wt[k, j], rtol=1.0E-12)
+            # One flow case with the same direction at all the turbines
+            m_wd(WS=WS[0], WD=np.full(nWT, WD[0]))
+            np.testing.assert_allclose(m_wd.p_wt, m.p_wt[0], rtol=1.0E-12)
+
+    def test_wake_pairs(self):
+        """The wake candidates of each turbine hold all the turbines with a
+        velocity deficit in its wake, at any thrust coefficient of its curve
+        """
+        from fusedwake.gcl import fortran as fgcl
+        from fusedwake.noj import fortran as fnoj
+        from fusedwake.gau import fortran as fgau
+        kw = GCL(WF=self.wf, version='fort_gcl')._get_kwargs('fort_gcl')
+        CT_c, DT = kw['ct_c'], kw['dt']
+        pars = [0.435449861, 0.797853685, -0.124807893, 0.136821858, 15.6298, 1.0]
+        idF = np.array([1, 2])
+        for fort, k, args in [(fgcl, [0.05, 0.1], pars), (fnoj, [0.04, 0.05], []),
+                              (fgau, [0.03, 0.04], [])]:
+            n_pairs, n_downstream = 0, 0
+            for WD in [5.0, 95.0, 270.0]:
+                x_l, y_l, idT = fort.flow_geometry(kw['x_g'], kw['y_g'], WD)
+                ptr, idx = fort.wake_pairs(idF, x_l, y_l, DT, CT_c, kw['ct_idle'],
+                                           k, *[[p, p] for p in args])
+                n_pairs += ptr[-1]
+                n_downstream += (x_l > 0).sum()
+                for i in range(self.wf.nWT):
+                    out = np.ones(self.wf.nWT, dtype=bool)
+                    out[idx[ptr[i]:ptr[i + 1]]] = False
+                    # The wakes are defined for the thrust coefficients in ]0, 1[
+                    CT_i = CT_c[i, :, 1][(CT_c[i, :, 1] > 0.0) & (CT_c[i, :, 1] < 1.0)]
+                    for CT in list(CT_i) + [0.99]:
+                        for ki in k:
+                            dUeq = fort.get_dueq(x_l[i], y_l[i], kw['z_g'][i], DT,
+                                                 DT[i], CT, ki, *args)
+                            # Below the rounding of the velocities
+                            self.assertTrue(np.all(np.abs(dUeq[out]) < 1.0E-17))
+            # Some of the turbines downstream are skipped
+            self.assertLess(n_pairs, n_downstream)
+
+    def test_large_farm(self):
+        """The batch versions solve farms of thousands of turbines, their
+        work arrays being too large for the stack of the threads
+        """
+        x, y = np.meshgrid(560.0 * np.arange(50), 560.0 * np.arange(50))
+        wf = WindFarm(array=np.vstack([x.ravel(), y.ravel()]), WT=self.wf.WT[0])
+        first = x.ravel() == 0.0
+        WS, WD = np.array([8.0, 11.0]), np.array([270.0, 273.0])
+        AV = np.ones([2, wf.nWT], dtype=int)
+        AV[1, ::7] = 0
+        for model, v, kwargs in [(GCL, 'fort_gcl', dict(TI=0.07)),
+                                 (NOJ, 'fort_noj_av', dict(wt_available=AV))]:
+            m = model(WF=wf, version=v, WS=WS, WD=WD, n_threads=2, **kwargs)()
+            # The turbines of the first column are upstream of the others
+            np.testing.assert_array_equal(m.u_wt[:, first],
+                                          np.tile(WS[:, None], (1, first.sum())))
+            self.assertLess(m.u_wt.min(), 7.0)
+            s = model(WF=wf, version=v.replace('_av', '') + '_s', WS=WS[0], WD=WD[0],
+                      **kwargs)()
+            np.testing.assert_allclose(m.u_wt[0], s.u_wt, rtol=1.0E-12)
+
+if __name__ == '__main__':
+    unittest.main()
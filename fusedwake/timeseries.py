@@ -0,0 +1,264 @@
+"""Time series of flow cases solved by chunks
+
+Long time series of flow cases (e.g. years of 10 minutes SCADA or mesoscale
+data) are read by chunks from a CSV, NPY or HDF5 file, each chunk is solved
+in a single call of the batched version of the wake model (see
+`parallel.solve_cases`) and its results are written before the next chunk
+is solved, so that the memory used does not depend on the length of the
+series. The next chunk is read by a thread while the current one is solved.
+
+Example
+-------
+    > gcl = GCL(version='fort_gcl')
+    > chunks = read_csv('scada.csv', chunk_size=10000)
+    > writer = NpyWriter('results', n_cases=count_csv('scada.csv'), nWT=WF.nWT)
+    > run_timeseries(WF, gcl, chunks, writer)
+    > P_WT = np.load('results_P_WT.npy', mmap_mode='r')
+"""
+import itertools
+import threading
+import numpy as np
+try:
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue
+try:
+    import h5py
+except ImportError:
+    # The HDF5 files are not supported
+    h5py = None
+
+# Inputs of the flow cases, in the order of the chunks
+COLUMNS = ['WS', 'WD', 'TI']
+# Outputs of the flow cases
+RESULTS = ['P_WT', 'U_WT', 'Ct']
+
+
+def _require_h5py():
+    if h5py is None:
+        raise ImportError('h5py is needed to read and write HDF5 files')
+
+def read_csv(filename, chunk_size=10000, columns=COLUMNS, delimiter=','):
+    """Reads the flow cases of a CSV file by chunks
+    Parameters
+    ----------
+    filename: str
+        CSV file, with a header line naming the columns
+    chunk_size: int, optional
+        Number of flow cases per chunk
+    columns: list, optional
+        Names of the wind speed, wind direction and turbulence intensity
+        columns
+    delimiter: str, optional
+        Delimiter of the columns
+    Returns
+    -------
+    chunks: generator
+        (WS, WD, TI) arrays of each chunk (n <= chunk_size)
+    """
+    with open(filename) as f:
+        header = [c.strip() for c in f.readline().split(delimiter)]
+        usecols = [header.index(c) for c in columns]
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                break
+            data = np.loadtxt(lines, delimiter=delimiter, usecols=usecols, ndmin=2)
+            yield tuple(data.T)
+
+def count_csv(filename):
+    """Number of flow cases of a CSV file read by read_csv"""
+    with open(filename) as f:
+        return sum(1 for line in f if line.strip()) - 1
+
+def read_npy(filename, chunk_size=10000):
+    """Reads the flow cases of a NPY file by chunks, memory-mapped
+    Parameters
+    ----------
+    filename: str
+        NPY file of a (nF, 3) array of the WS, WD and TI of the flow cases
+    chunk_size: int, optional
+        Number of flow cases per chunk
+    Returns
+    -------
+    chunks: generator
+        (WS, WD, TI) arrays of each chunk (n <= chunk_size)
+    """
+    data = np.load(filename, mmap_mode='r')
+    for start in range(0, len(data), chunk_size):
+        chunk = np.array(data[start:start + chunk_size], dtype=float)
+        yield tuple(chunk.T)
+
+def read_hdf5(filename, chunk_size=10000, datasets=COLUMNS):
+    """Reads the flow cases of a HDF5 file by chunks (needs h5py)
+    Parameters
+    ----------
+    filename: str
+        HDF5 file
+    chunk_size: int, optional
+        Number of flow cases per chunk
+    datasets: list, optional
+        Names of the wind speed, wind direction and turbulence intensity
+        datasets (nF)
+    Returns
+    -------
+    chunks: generator
+        (WS, WD, TI) arrays of each chunk (n <= chunk_size)
+    """
+    _require_h5py()
+    with h5py.File(filename, 'r') as f:
+        data = [f[k] for k in datasets]
+        for start in range(0, len(data[0]), chunk_size):
+            yield tuple(np.array(d[start:start + chunk_size], dtype=float)
+                        for d in data)
+
+def prefetch(chunks, depth=1):
+    """Iterates over chunks read in advance by a thread
+    Parameters
+    ----------
+    chunks: iterable
+        Chunks, e.g. given by read_csv
+    depth: int, optional
+        Number of chunks read in advance
+    Returns
+    -------
+    chunks: generator
+        The same chunks, in the same order
+    """
+    done = object()
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def read():
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    return
+                buffer.put((chunk, None))
+        except Exception as e:
+            buffer.put((None, e))
+            return
+        buffer.put((done, None))
+
+    thread = threading.Thread(target=read)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            chunk, error = buffer.get()
+            if error is not None:
+                raise error
+            if chunk is done:
+                break
+            yield chunk
+    finally:
+        # Unblocks the reading thread when the iteration stops early
+        stop.set()
+        while thread.is_alive():
+            try:
+                buffer.get_nowait()
+            except queue.Empty:
+                thread.join(0.01)
+
+
+class NpyWriter(object):
+    """Writes the results of the flow cases in memory-mapped NPY files,
+    prefix + '_P_WT.npy', '_U_WT.npy' and '_Ct.npy' of shape (nF, nWT)
+    """
+    def __init__(self, prefix, n_cases, nWT):
+        self.filenames = [prefix + '_' + k + '.npy' for k in RESULTS]
+        self.arrays = [np.lib.format.open_memmap(f, mode='w+', dtype=float,
+                                                 shape=(n_cases, nWT))
+                       for f in self.filenames]
+
+    def __call__(self, start, P_WT, U_WT, Ct):
+        for a, res in zip(self.arrays, [P_WT, U_WT, Ct]):
+            a[start:start + len(res)] = res
+
+    def close(self):
+        for a in self.arrays:
+            a.flush()
+        self.arrays = []
+
+
+class HDF5Writer(object):
+    """Writes the results of the flow cases in the datasets 'P_WT', 'U_WT'
+    and 'Ct' (nF, nWT) of a HDF5 file, growing with each chunk (needs h5py)
+    """
+    def __init__(self, filename, nWT):
+        _require_h5py()
+        self.file = h5py.File(filename, 'w')
+        self.datasets = [self.file.create_dataset(k, shape=(0, nWT), maxshape=(None, nWT),
+                                                  dtype=float, chunks=True)
+                         for k in RESULTS]
+
+    def __call__(self, start, P_WT, U_WT, Ct):
+        for d, res in zip(self.datasets, [P_WT, U_WT, Ct]):
+            d.resize(start + len(res), axis=0)
+            d[start:] = res
+
+    def close(self):
+        self.file.close()
+
+
+def solve_chunks(WF, model, chunks, depth=1):
+    """Solves the flow cases by chunks, the next chunks being read while
+    the current one is solved (the Fortran kernels release the GIL)
+    Parameters
+    ----------
+    WF: WindFarm
+        Windfarm instance
+    model: GCL, NOJ or GAU
+        Wake model instance, with its version set
+    chunks: iterable
+        (WS, WD, TI) arrays of each chunk, e.g. given by read_csv
+    depth: int, optional
+        Number of chunks read in advance, 0 to read them when needed
+    Returns
+    -------
+    results: generator
+        (start, P_WT, U_WT, Ct) of each chunk, start being the index of its
+        first flow case in the series and the results (n, nWT) as given by
+        parallel.solve_cases
+    """
+    # The readers and writers do not need the solver
+    from .parallel import solve_cases
+    if depth > 0:
+        chunks = prefetch(chunks, depth)
+    start = 0
+    for WS, WD, TI in chunks:
+        P_WT, U_WT, Ct = solve_cases(WF, model, WS, WD, TI)
+        yield start, P_WT, U_WT, Ct
+        start += len(P_WT)
+
+def run_timeseries(WF, model, chunks, writer, depth=1):
+    """Solves the flow cases by chunks and writes the results of each chunk
+    Parameters
+    ----------
+    WF: WindFarm
+        Windfarm instance
+    model: GCL, NOJ or GAU
+        Wake model instance, with its version set
+    chunks: iterable
+        (WS, WD, TI) arrays of each chunk, e.g. given by read_csv
+    writer: callable
+        writer(start, P_WT, U_WT, Ct) writes the results of a chunk, e.g.
+        a NpyWriter or a HDF5Writer. It is closed at the end if it has a
+        close method.
+    depth: int, optional
+        Number of chunks read in advance, 0 to read them when needed
+    Returns
+    -------
+    nF: int
+        Number of flow cases solved
+    """
+    nF = 0
+    try:
+        for start, P_WT, U_WT, Ct in solve_chunks(WF, model, chunks, depth):
+            writer(start, P_WT, U_WT, Ct)
+            nF = start + len(P_WT)
+    finally:
+        if hasattr(writer, 'close'):
+            writer.close()
+    return nF
@@ -0,0 +1,457 @@
+"""Common runtime of the wind farm flow models (GCL, NOJ, GAU)
+
+The models define their versions, inputs and Fortran kernels, and the
+runtime marshals the arguments of the kernels:
+    - the inputs depending only on the wind farm are prepared once per
+      layout (PreparedFarm), in float64 and Fortran order
+    - the flow case inputs are written in float64 buffers kept between the
+      calls
+    - the outputs of the kernels are written in buffers reused between the
+      calls of a PreparedCall
+so that f2py does not copy or convert them at every call.
+
+Example
+-------
+    > gcl = GCL(version='fort_gcl_s', TI=0.07)
+    > call = gcl.prepare(WF=WF)
+    > for wd in range(360):
+    >     P_WT, U_WT, Ct = call(8.0, wd)
+
+The batch kernels share their flow cases among n_threads threads (a model
+variable, 0 or None for one thread per cpu), with the same results as on one
+thread.
+"""
+import multiprocessing
+import numpy as np
+from .WindFarm import PreparedFarm
+from .instrumentation import get_stats, count_fortran_work, NULL_STATS
+
+# Inputs of the wind farm in the PreparedFarm
+FARM_INPUTS = ['x_t', 'y_t', 'z_t', 'dt', 'p_c', 'ct_c', 'ws_ci', 'ws_co', 'ct_idle']
+
+def availability_mask(AV):
+    """Availability of the turbines as an on/off mask. The kernels with
+    availability only stop or run the turbines, a derating can not be given.
+
+    Parameters
+    ----------
+    AV: array_like
+        Availability of the turbines, 0 when the turbine is stopped and 1
+        when it runs
+
+    Returns
+    -------
+    mask: ndarray(bool)
+        True for the turbines running
+    """
+    AV = np.asarray(AV)
+    mask = (AV == 1)
+    if not np.all(mask | (AV == 0)):
+        raise ValueError('The availability of the turbines should be 0 or 1, got {}'.format(
+            np.unique(AV[~mask & (AV != 0)])))
+    return mask
+
+
+class WakeModel(object):
+    # The different versions and their respective inputs
+    inputs = {}
+    # The versions solving several flow cases in one call
+    batch_versions = []
+    # The Fortran versions: version -> (kernel, kind), kind being 'single'
+    # (one flow case), 'batch' (several flow cases), 'batch_av' (several
+    # flow cases with the availability of the turbines) or 'batch_mult_wd'
+    # (several flow cases with a wind direction per turbine)
+    kernels = {}
+    # The Python versions: version -> method
+    methods = {}
+    # The flow case inputs of the Fortran kernels and the model variables
+    # they default to
+    case_inputs = [('ws', 'WS'), ('wd', 'WD')]
+    # Default variables for running the wind farm flow model
+    defaults = {}
+    # Statistics of the last run, when it is instrumented
+    stats = NULL_STATS
+    # Inputs depending only on the wind farm, kept between the calls
+    prepared = None
+
+    def __init__(self, **kwargs):
+        # Flow case inputs given directly to the kernels (e.g. ws instead of WS)
+        self._given = {}
+        # Arrays reused between the calls
+        self._buffers = {}
+        self.set(self.defaults)
+        self.set(kwargs)
+
+    @property
+    def versions(self):
+        versions = list(self.inputs.keys())
+        versions.sort()
+        return versions
+
+    @property
+    def case_variables(self):
+        """Model variables of the flow cases"""
+        return [var for name, var in self.case_inputs]
+
+    # The turbine to turbine distances in global coordinates are only built
+    # when a version using them is run
+    @property
+    def x_g(self):
+        return self.prepared.T2T[0]
+
+    @property
+    def y_g(self):
+        return self.prepared.T2T[1]
+
+    @property
+    def z_g(self):
+        return self.prepared.T2T[2]
+
+    def set(self, dic):
+        """ Set the attributes of a dictionary as instance variables. Prepares
+        for the different versions of the wake model
+
+        Parameters
+        ----------
+        dic: dict
+            An input dictionary
+        """
+        for k, v in dic.items():
+            setattr(self, k, v)
+
+        # A model variable of the flow cases replaces the kernel input given
+        # directly before, unless both are given
+        for name, var in self.case_inputs:
+            if name in dic:
+                self._given[name] = dic[name]
+            elif var in dic:
+                self._given.pop(name, None)
+
+        # Preparing for the inputs for the fortran version, only rebuilt when
+        # the wind farm or its layout changes, and updated when some of its
+        # turbines moved
+        if 'WF' in dic:
+            if self.prepared is None or not (self.prepared.is_valid(self.WF) or
+                                             self.prepared.update(self.WF)):
+                self.prepared = PreparedFarm(self.WF)
+            for k in FARM_INPUTS:
+                setattr(self, k, getattr(self.prepared, k))
+
+    def _get_kwargs(self, version):
+        """Prepare a dictionary of inputs to be passed to the wind farm flow model
+
+        Parameters
+        ----------
+        version: str
+            The version of the wind farm flow model to run
+        """
+        if 'py' in version:
+            return {k:getattr(self, k) for k in self.inputs[version] if hasattr(self, k)}
+        if version in self.kernels:
+            # fortran (and Numba) kernels only get lowercase inputs
+            return {(k).lower():getattr(self, k) for k in self.inputs[version] if hasattr(self, k)}
+
+    def _buffer(self, name, shape, order='C', dtype=float):
+        """Array kept between the calls"""
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype or \
+                not buf.flags[order + '_CONTIGUOUS']:
+            buf = self._buffers[name] = np.empty(shape, order=order, dtype=dtype)
+        return buf
+
+    def _flow_cases(self, values=None):
+        """Flow case inputs of the kernels: the values given, the inputs given
+        directly to the kernels, or the model variables they default to
+
+        Parameters
+        ----------
+        values: dict, optional
+            Model variables of the flow cases, e.g. {'WS': 8.0, 'WD': 270.0}
+
+        Returns
+        -------
+        cases: dict
+            Inputs of the kernel, e.g. {'ws': 8.0, 'wd': 270.0}
+        """
+        cases = {}
+        for name, var in self.case_inputs:
+            if values and var in values:
+                cases[name] = values[var]
+            elif name in self._given:
+                cases[name] = self._given[name]
+            else:
+                cases[name] = getattr(self, var)
+        return cases
+
+    def _model_kwargs(self, version, kind, cases, n):
+        """Other inputs of the kernels depending on the flow cases, defined by
+        the models"""
+        return {}
+
+    def _case_kwargs(self, version, kind, cases, kwargs):
+        """Writes the flow case inputs of a kernel in its arguments
+
+        Parameters
+        ----------
+        version: str
+            Fortran version
+        kind: str
+            Kind of the kernel (see kernels)
+        cases: dict
+            Flow case inputs (see _flow_cases)
+        kwargs: dict
+            Arguments of the kernel, updated
+
+        Returns
+        -------
+        n: int
+            Number of flow cases
+        """
+        if kind == 'single':
+            n = 1
+            kwargs.update(cases)
+        else:
+            # The wind directions of the mult_wd kernels are given per
+            # turbine: (nWT) for one flow case, or (nF, nWT)
+            per_wt = ['wd'] if kind == 'batch_mult_wd' else []
+            n = max(int(np.prod(np.shape(v)[:-1])) if name in per_wt else np.size(v)
+                    for name, v in cases.items())
+            for name, v in cases.items():
+                if name in per_wt:
+                    buf = self._buffer(name, (n, self.WF.nWT), order='F')
+                else:
+                    buf = self._buffer(name, (n,))
+                buf[...] = v
+                kwargs[name] = buf
+            if kind == 'batch_av':
+                # The availability is an integer array in the kernels
+                av = self._buffer('av', (n, self.WF.nWT), order='F', dtype=np.int32)
+                av[...] = availability_mask(getattr(self, 'wt_available', 1))
+                kwargs['av'] = av
+            elif kind == 'batch_mult_wd':
+                # Standard deviation of the wind direction of each turbine
+                std_wd = self._buffer('std_wd', (n, self.WF.nWT), order='F')
+                std_wd[...] = getattr(self, 'STD_WD', 0.0)
+                kwargs['std_wd'] = std_wd
+            kwargs['n_threads'] = self._n_threads()
+        kwargs.update(self._model_kwargs(version, kind, cases, n))
+        return n
+
+    def _n_threads(self):
+        """Number of threads of the batch kernels"""
+        return getattr(self, 'n_threads', 1) or multiprocessing.cpu_count()
+
+    def _run_fortran(self, kernel, kwargs):
+        """Runs a fortran kernel on the inputs of the current version"""
+        with self.stats.phase('kernel'):
+            try:
+                out = kernel(**kwargs)
+            except Exception as e:
+                raise Exception('The fortran version {} failed with the followind inputs: {}, and the error message: {}'.format(
+                        self.version, kwargs, e))
+        if self.stats.enabled:
+            count_fortran_work(self.stats, self.WF.nWT, kwargs)
+        return out
+
+    def _thrust_area(self):
+        """0.5 rho A of the thrust coefficient of the outputs"""
+        A = 0.25 * self.WF.WT.rotor_diameter**2.0
+        return 0.5 * A * self.rho
+
+    def fortran(self, version):
+        """Runs a Fortran version of the model"""
+        kernel, kind = self.kernels[version]
+        with self.stats.phase('kwargs'):
+            kwargs = self._get_kwargs(version)
+            n = self._case_kwargs(version, kind, self._flow_cases(), kwargs)
+        self.p_wt, self.t_wt, self.u_wt = self._run_fortran(kernel, kwargs)
+        with self.stats.phase('post'):
+            self.c_t = self.t_wt / (self._thrust_area() * self.u_wt**2.0)
+            self.p_wt *= 1.0E3  # Scaling the power back to Watt
+            if kind != 'single' and n == 1: # We are only returning a 1D array
+                self.p_wt = self.p_wt[0]
+                self.u_wt = self.u_wt[0]
+                self.c_t = self.c_t[0]
+
+    def prepare(self, **kwargs):
+        """Low overhead calls of the current (Fortran) version for tight loops
+
+        Parameters
+        ----------
+        kwargs: dict
+            Inputs of the model kept between the calls (WF, version, ...)
+
+        Returns
+        -------
+        call: PreparedCall
+        """
+        self.set(kwargs)
+        return PreparedCall(self, self.version)
+
+    def _av_version(self, version):
+        """Fortran version with the availability of the turbines matching a
+        version (e.g. fort_gcl_av for fort_gcl_s, fort_gcl and fort_gcl_av)"""
+        if version in self.kernels and self.kernels[version][1] == 'batch_av':
+            return version
+        for av_version in sorted(self.kernels):
+            if self.kernels[av_version][1] == 'batch_av' and \
+                    version.startswith(av_version[:-len('_av')]):
+                return av_version
+        raise Exception("Version %s has no version with availability: version=[%s]"%(
+            version, '|'.join(v for v in sorted(self.kernels) if v.endswith('_av'))))
+
+    def scenarios(self, AV, **kwargs):
+        """Solves the flow cases of the model for several availability
+        scenarios of the turbines (e.g. N-1 contingencies, downtime Monte Carlo)
+
+        All the scenarios and flow cases are solved in a single call of the
+        Fortran version with availability matching the current version. The
+        identical scenarios are only solved once.
+
+        Parameters
+        ----------
+        AV: array_like
+            Availability of the turbines in each scenario, 0 when the turbine
+            is stopped and 1 when it runs (nS, nWT)
+        kwargs: dict
+            Inputs of the model, e.g. the flow cases WS=[...], WD=[...]
+
+        Returns
+        -------
+        P_WT: ndarray
+            Power production of the wind turbines (nS, nF, nWT) [W]
+        U_WT: ndarray
+            Wind speed at hub height (nS, nF, nWT) [m/s]
+        Ct: ndarray
+            Thrust coefficients for each wind turbine (nS, nF, nWT) [-]
+        """
+        self.stats = get_stats(kwargs.get('instrument', self.instrument))
+        with self.stats.phase('set'):
+            self.set(kwargs)
+        version = self._av_version(self.version)
+        kernel, kind = self.kernels[version]
+        with self.stats.phase('kwargs'):
+            AV = np.atleast_2d(availability_mask(AV))
+            if AV.shape[1] != self.WF.nWT:
+                raise Exception('The scenarios should have the availability of the {} turbines, got {}'.format(
+                    self.WF.nWT, AV.shape[1]))
+            # Unique scenarios, and the unique scenario of each scenario
+            masks, inverse = np.unique(AV, axis=0, return_inverse=True)
+            inverse = np.ravel(inverse)
+            # The flow cases are repeated for each unique scenario
+            cases = self._flow_cases()
+            nF = max(np.size(v) for v in cases.values())
+            cases = {name: np.tile(np.broadcast_to(v, (nF,)), len(masks))
+                     for name, v in cases.items()}
+            kwargs = self._get_kwargs(version)
+            n = self._case_kwargs(version, 'batch', cases, kwargs)
+            av = self._buffer('av', (n, self.WF.nWT), order='F', dtype=np.int32)
+            av[...] = np.repeat(masks, nF, axis=0)
+            kwargs['av'] = av
+        p_wt, t_wt, u_wt = self._run_fortran(kernel, kwargs)
+        with self.stats.phase('post'):
+            c_t = t_wt / (self._thrust_area() * u_wt**2.0)
+            p_wt *= 1.0E3  # Scaling the power back to Watt
+            out = tuple(np.reshape(a, (len(masks), nF, self.WF.nWT))[inverse]
+                        for a in [p_wt, u_wt, c_t])
+        self.stats.count(scenarios=len(AV), unique_scenarios=len(masks))
+        self.stats.close(version)
+        return out
+
+    def __call__(self, **kwargs):
+        self.stats = get_stats(kwargs.get('instrument', self.instrument))
+        with self.stats.phase('set'):
+            self.set(kwargs)
+        if hasattr(self, 'version'):
+            if self.version in self.kernels:
+                self.fortran(self.version)
+            elif self.version in self.methods:
+                getattr(self, self.methods[self.version])()
+            else:
+                raise Exception("Version %s is not valid: version=[%s]"%(self.version, '|'.join(self.versions)))
+        else:
+            raise Exception("Version hasn't been set: version=[%s]"%('|'.join(self.versions)))
+        self.stats.close(self.version)
+        return self
+
+
+class PreparedCall(object):
+    """Low overhead calls of a Fortran version of a wake model
+
+    The arguments of the kernel that do not depend on the flow cases are
+    marshalled once, and the outputs are written in buffers reused between
+    the calls. They are refreshed when the layout of the wind farm changes
+    (WindFarm.set_layout). The calls are not instrumented.
+
+    Note
+    ----
+    The arrays returned are overwritten by the next call: copy them to keep
+    them.
+    """
+    def __init__(self, model, version):
+        """Initializes a PreparedCall object
+
+        Parameters
+        ----------
+        model: WakeModel
+            Wake model instance, with its wind farm set
+        version: str
+            Fortran version of the model
+        """
+        if version not in model.kernels:
+            raise Exception("Version %s can not be prepared: version=[%s]"%(
+                version, '|'.join(sorted(model.kernels))))
+        self.model = model
+        self.version = version
+        self.kernel, self.kind = model.kernels[version]
+        self.refresh()
+
+    def refresh(self):
+        """Marshals again the arguments that do not depend on the flow cases"""
+        model = self.model
+        model.set({'WF': model.WF})
+        self.prepared = model.prepared
+        self.kwargs = model._get_kwargs(self.version)
+        self.thrust_area = model._thrust_area()
+        self.n = None
+
+    def __call__(self, *args, **kwargs):
+        """Solves flow cases
+
+        Parameters
+        ----------
+        args, kwargs:
+            Model variables of the flow cases, in the order of
+            model.case_variables (e.g. WS, WD, TI for GCL). The variables
+            not given are the ones of the model.
+
+        Returns
+        -------
+        P_WT: ndarray
+            Power production of the wind turbines [W], (nWT) or (nF, nWT)
+        U_WT: ndarray
+            Wind speed at hub height [m/s], (nWT) or (nF, nWT)
+        Ct: ndarray
+            Thrust coefficients for each wind turbine [-], (nWT) or (nF, nWT)
+        """
+        model = self.model
+        if not self.prepared.is_valid(model.WF):
+            self.refresh()
+        values = dict(zip(model.case_variables, args))
+        values.update(kwargs)
+        kw = self.kwargs
+        n = model._case_kwargs(self.version, self.kind, model._flow_cases(values), kw)
+        if n != self.n:
+            # Output buffers in the memory order of the kernel
+            shape = (model.WF.nWT,) if self.kind == 'single' else (n, model.WF.nWT)
+            for k in ['p', 't', 'u']:
+                kw[k] = np.empty(shape, order='F')
+            self.c_t = np.empty(shape, order='F')
+            self.n = n
+        p, t, u = self.kernel(**kw)
+        c_t = self.c_t
+        np.multiply(u, u, out=c_t)
+        c_t *= self.thrust_area
+        np.divide(t, c_t, out=c_t)
+        p *= 1.0E3  # Scaling the power back to Watt
+        return p, u, c_t
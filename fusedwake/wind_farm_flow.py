@@ -1,3 +1,5 @@
+from .quadrature import rotor_disk
+
 
 if inflow == 'log':
     kappa = 0.4 # Kappa: von karman constant
@@ -49,13 +51,7 @@ class WFFM(WindFarm):
             WS_inf = gaussN(WF.WT[0].R, Ua_shear, [WF.WT[0].H,WS,alpha]).sum()
 
         # Gauss quadrature points
-        r_Gc,w_Gc = np.polynomial.legendre.leggauss(NG)
-        wj,wk=np.meshgrid(w_Gc,w_Gc)
-        tj,rk=np.meshgrid(r_Gc,r_Gc)
-        wj = wj.reshape((NG**2))
-        tj = tj.reshape((NG**2))
-        wk = wk.reshape((NG**2))
-        rk = rk.reshape((NG**2))
+        tj, rk, wj, wk = rotor_disk(NG)
 
         # Initialize arrays to NaN
         Ct = np.nan*np.ones([WF.nWT])
@@ -205,13 +201,7 @@ def wffm_vectorized(WF, WS, WD,TI,
         WS_inf = gaussN(WF.WT[0].R, Ua_shear, [WF.WT[0].H,WS,alpha]).sum()
 
     # Gauss quadrature points
-    r_Gc,w_Gc = np.polynomial.legendre.leggauss(NG)
-    wj,wk=np.meshgrid(w_Gc,w_Gc)
-    tj,rk=np.meshgrid(r_Gc,r_Gc)
-    wj = wj.reshape((NG**2))
-    tj = tj.reshape((NG**2))
-    wk = wk.reshape((NG**2))
-    rk = rk.reshape((NG**2))
+    tj, rk, wj, wk = rotor_disk(NG)
 
     # Initialize arrays to NaN
     Ct = np.nan*np.ones([WF.nWT])
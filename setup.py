@@ -34,6 +34,10 @@ requirements = [
     'utm'
 ]
 
+# The batch versions of the wake models solve the flow cases in parallel
+openmp = dict(extra_f77_compile_args=['-fopenmp'],
+              extra_link_args=['-lgomp'])
+
 test_requirements = [
     'tox',
     'pytest',
@@ -85,14 +89,18 @@ setup(
     ext_package='fusedwake',
     ext_modules=[Extension('gcl.fortran',
                            glob.glob(os.path.join('fusedwake', 'gcl', 'fortran',
-                                                  'GCL.f'))),
+                                                  'GCL.f')),
+                          **openmp),
                 Extension('noj.fortran',
                            glob.glob(os.path.join('fusedwake', 'noj', 'fortran',
-                                                  'NOJ.f'))),
+                                                  'NOJ.f')),
+                          **openmp),
                 Extension('noj.fortran_mod',
                            glob.glob(os.path.join('fusedwake', 'noj', 'fortran',
-                                                  'Mod_NOJ.f'))),
+                                                  'Mod_NOJ.f')),
+                          **openmp),
                 Extension('gau.fortran',
                            glob.glob(os.path.join('fusedwake', 'gau', 'fortran',
-                                                  'GAU.f')))],
+                                                  'GAU.f')),
+                          **openmp)],
 )